@@ -0,0 +1,112 @@
+"""Range-partition run_events by created_at
+
+Replaces run_events with a table partitioned into hourly ranges of
+created_at, so retention drops whole partitions instead of running large
+DELETEs. Hourly partitions are created ahead of time by the event store;
+a default partition catches anything outside them. The primary key must
+include the partition key and becomes (id, created_at).
+
+Revision ID: 4c2d8e7f9a1b
+Revises: aee821a02fc8
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "4c2d8e7f9a1b"
+down_revision = "aee821a02fc8"
+branch_labels = None
+depends_on = None
+
+# Hourly partitions created up front; the event store keeps creating more
+PARTITIONS_AHEAD = 3
+
+
+def upgrade() -> None:
+    """Move run_events into an hourly range-partitioned table."""
+    op.execute("ALTER TABLE run_events RENAME TO run_events_unpartitioned")
+    op.execute("ALTER TABLE run_events_unpartitioned RENAME CONSTRAINT run_events_pkey TO run_events_unpartitioned_pkey")
+    op.drop_index("idx_run_events_run_id", table_name="run_events_unpartitioned")
+    op.drop_index("idx_run_events_seq", table_name="run_events_unpartitioned")
+
+    op.execute(
+        """
+        CREATE TABLE run_events (
+            id TEXT NOT NULL,
+            run_id TEXT NOT NULL,
+            seq INTEGER NOT NULL,
+            event TEXT NOT NULL,
+            data JSONB,
+            created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+            CONSTRAINT run_events_pkey PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at)
+        """
+    )
+    op.execute("CREATE TABLE run_events_default PARTITION OF run_events DEFAULT")
+    # Partitions named run_events_pYYYYMMDDHH, matching EventStore
+    op.execute(
+        f"""
+        DO $$
+        DECLARE
+            bucket TIMESTAMPTZ;
+        BEGIN
+            FOR i IN 0..{PARTITIONS_AHEAD} LOOP
+                bucket := date_trunc('hour', now() AT TIME ZONE 'UTC') AT TIME ZONE 'UTC' + make_interval(hours => i);
+                EXECUTE format(
+                    'CREATE TABLE IF NOT EXISTS %I PARTITION OF run_events FOR VALUES FROM (%L) TO (%L)',
+                    'run_events_p' || to_char(bucket AT TIME ZONE 'UTC', 'YYYYMMDDHH24'),
+                    bucket,
+                    bucket + interval '1 hour'
+                );
+            END LOOP;
+        END $$
+        """
+    )
+
+    op.create_index("idx_run_events_run_id", "run_events", ["run_id"])
+    op.create_index("idx_run_events_seq", "run_events", ["run_id", "seq"])
+    op.create_index("idx_run_events_created_at", "run_events", ["created_at"])
+
+    op.execute(
+        """
+        INSERT INTO run_events (id, run_id, seq, event, data, created_at)
+        SELECT id, run_id, seq, event, data, created_at FROM run_events_unpartitioned
+        """
+    )
+    op.drop_table("run_events_unpartitioned")
+
+
+def downgrade() -> None:
+    """Restore the plain run_events table, keeping its rows."""
+    op.execute("ALTER TABLE run_events RENAME TO run_events_partitioned")
+    op.execute("ALTER TABLE run_events_partitioned RENAME CONSTRAINT run_events_pkey TO run_events_partitioned_pkey")
+    op.drop_index("idx_run_events_run_id", table_name="run_events_partitioned")
+    op.drop_index("idx_run_events_seq", table_name="run_events_partitioned")
+    op.drop_index("idx_run_events_created_at", table_name="run_events_partitioned")
+
+    op.execute(
+        """
+        CREATE TABLE run_events (
+            id TEXT NOT NULL,
+            run_id TEXT NOT NULL,
+            seq INTEGER NOT NULL,
+            event TEXT NOT NULL,
+            data JSONB,
+            created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+            CONSTRAINT run_events_pkey PRIMARY KEY (id)
+        )
+        """
+    )
+    op.execute(
+        """
+        INSERT INTO run_events (id, run_id, seq, event, data, created_at)
+        SELECT id, run_id, seq, event, data, created_at FROM run_events_partitioned
+        ON CONFLICT (id) DO NOTHING
+        """
+    )
+    op.create_index("idx_run_events_run_id", "run_events", ["run_id"])
+    op.create_index("idx_run_events_seq", "run_events", ["run_id", "seq"])
+
+    # Dropping the parent drops all of its partitions
+    op.drop_table("run_events_partitioned")
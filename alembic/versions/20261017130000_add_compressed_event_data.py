@@ -0,0 +1,27 @@
+"""Add data_compressed column to run_events
+
+Holds zstd-compressed event JSON when EVENT_STORE_COMPRESSION=zstd; data
+is NULL for those rows.
+
+Revision ID: 9e5b3a6c1d20
+Revises: 4c2d8e7f9a1b
+Create Date: 2026-10-17 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "9e5b3a6c1d20"
+down_revision = "4c2d8e7f9a1b"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("run_events", sa.Column("data_compressed", sa.LargeBinary(), nullable=True))
+
+
+def downgrade() -> None:
+    # Replay history of rows stored compressed is lost; it expires anyway
+    op.drop_column("run_events", "data_compressed")
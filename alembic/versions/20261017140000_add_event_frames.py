@@ -0,0 +1,28 @@
+"""Add frame column to run_events
+
+Holds the event's SSE wire frame (zstd-compressed when data_compressed is
+used) when EVENT_STORE_FRAMES=true, so replay can send it without
+re-encoding.
+
+Revision ID: 3a8e1f0b7c42
+Revises: 9e5b3a6c1d20
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "3a8e1f0b7c42"
+down_revision = "9e5b3a6c1d20"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("run_events", sa.Column("frame", sa.LargeBinary(), nullable=True))
+
+
+def downgrade() -> None:
+    # Replay falls back to rebuilding frames from data
+    op.drop_column("run_events", "frame")
@@ -0,0 +1,35 @@
+"""Add kwargs column and queue index to runs
+
+kwargs holds the execution arguments of runs queued for worker processes
+(RUN_EXECUTION_MODE=queue); it is NULL for runs executed by the API
+process itself. The partial index serves the workers' claim query.
+
+Revision ID: 6f4d2b9e8a13
+Revises: 3a8e1f0b7c42
+Create Date: 2026-10-17 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "6f4d2b9e8a13"
+down_revision = "3a8e1f0b7c42"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("runs", sa.Column("kwargs", postgresql.JSONB(astext_type=sa.Text()), nullable=True))
+    op.create_index(
+        "idx_runs_queue",
+        "runs",
+        ["created_at"],
+        postgresql_where=sa.text("status IN ('pending', 'streaming') AND kwargs IS NOT NULL"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("idx_runs_queue", table_name="runs")
+    op.drop_column("runs", "kwargs")
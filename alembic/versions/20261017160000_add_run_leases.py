@@ -0,0 +1,37 @@
+"""Add worker leases to queued runs
+
+A worker that claims a run records itself in claimed_by and keeps
+lease_expires_at in the future while the run executes. Runs whose lease
+expired (their worker crashed) are claimed again. Runs claimed before this
+revision have no lease and are never reclaimed.
+
+Revision ID: 9c1e7a5d3b20
+Revises: 6f4d2b9e8a13
+Create Date: 2026-10-17 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "9c1e7a5d3b20"
+down_revision = "6f4d2b9e8a13"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("runs", sa.Column("claimed_by", sa.Text(), nullable=True))
+    op.add_column("runs", sa.Column("lease_expires_at", sa.TIMESTAMP(timezone=True), nullable=True))
+    op.create_index(
+        "idx_runs_lease",
+        "runs",
+        ["lease_expires_at"],
+        postgresql_where=sa.text("status = 'running' AND kwargs IS NOT NULL"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("idx_runs_lease", table_name="runs")
+    op.drop_column("runs", "lease_expires_at")
+    op.drop_column("runs", "claimed_by")
@@ -0,0 +1,54 @@
+import asyncio
+
+import pytest
+from e2e._utils import get_e2e_client, elog
+
+
+@pytest.mark.e2e
+@pytest.mark.asyncio
+async def test_concurrent_streams_across_workers_e2e():
+    """
+    Several clients join the stream of one background run at the same time.
+
+    Run the server with multiple workers and the Postgres broker so the
+    stream requests land on workers other than the one executing the run:
+
+        BROKER_BACKEND=postgres uvicorn src.agent_server.main:app --workers 4
+
+    Every viewer must see live values events and the end of the run, not just
+    replayed history or a share of the events.
+    """
+    client = get_e2e_client()
+
+    assistant = await client.assistants.create(
+        graph_id="agent",
+        config={"tags": ["chat", "multi-worker"]},
+        if_exists="do_nothing",
+    )
+    thread = await client.threads.create()
+    run = await client.runs.create(
+        thread_id=thread["thread_id"],
+        assistant_id=assistant["assistant_id"],
+        input={"messages": [{"role": "user", "content": "Tell me a 100 word story."}]},
+        stream_mode=["values"],
+    )
+    elog("Runs.create (background)", run)
+
+    async def watch() -> list[str]:
+        events = []
+        async for chunk in client.runs.join_stream(
+            thread_id=thread["thread_id"],
+            run_id=run["run_id"],
+            stream_mode=["values"],
+        ):
+            events.append(chunk.event)
+        return events
+
+    results = await asyncio.gather(*(watch() for _ in range(8)))
+    elog("Per-viewer event types", results)
+
+    for events in results:
+        assert "values" in events
+
+    final_state = await client.runs.join(thread["thread_id"], run["run_id"])
+    assert isinstance(final_state, dict)
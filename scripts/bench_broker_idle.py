@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""Microbenchmark: CPU cost of idle SSE subscribers on the run broker.
+
+Opens N subscribers that sit on an idle run (no events) for a fixed window
+and reports the process CPU time burned while waiting, then measures how long
+it takes for every subscriber to observe the end of the run.
+
+Compares the previous polling implementation (100 ms ``wait_for`` loop) with
+the current event-driven ``RunBroker``.
+
+Usage:
+  python scripts/bench_broker_idle.py [--subscribers 5000] [--idle 3.0]
+"""
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+from typing import Any, AsyncIterator, Tuple
+
+# Add src to the Python path so the benchmark runs from a plain checkout
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root / "src"))
+
+from agent_server.services.broker import RunBroker  # noqa: E402
+
+
+class PollingRunBroker:
+    """Replica of the previous broker that polled its queue every 100 ms"""
+
+    def __init__(self, run_id: str):
+        self.run_id = run_id
+        self.queue: asyncio.Queue[Tuple[str, Any]] = asyncio.Queue()
+        self.finished = asyncio.Event()
+
+    async def put(self, event_id: str, payload: Any) -> None:
+        await self.queue.put((event_id, payload))
+
+    async def aiter(self) -> AsyncIterator[Tuple[str, Any]]:
+        while True:
+            try:
+                event_id, payload = await asyncio.wait_for(self.queue.get(), timeout=0.1)
+                yield event_id, payload
+            except asyncio.TimeoutError:
+                if self.finished.is_set() and self.queue.empty():
+                    break
+                continue
+
+    def mark_finished(self) -> None:
+        self.finished.set()
+
+
+async def _consume(broker) -> float:
+    async for _ in broker.aiter():
+        pass
+    return time.perf_counter()
+
+
+async def run_case(name: str, broker_cls, subscribers: int, idle: float) -> None:
+    # One broker per subscriber mirrors N open streams on N idle runs
+    brokers = [broker_cls(f"run-{i}") for i in range(subscribers)]
+    tasks = [asyncio.create_task(_consume(b)) for b in brokers]
+    await asyncio.sleep(0.2)  # let all consumers reach their wait
+
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    await asyncio.sleep(idle)
+    cpu_used = time.process_time() - cpu_start
+    wall_used = time.perf_counter() - wall_start
+
+    finish_at = time.perf_counter()
+    for b in brokers:
+        b.mark_finished()
+    done_times = await asyncio.gather(*tasks)
+    latencies = sorted(t - finish_at for t in done_times)
+
+    print(
+        f"{name:<14} subscribers={subscribers:<6} "
+        f"idle_cpu={cpu_used:.3f}s ({100 * cpu_used / wall_used:.1f}% of one core) "
+        f"end_latency_p50={1000 * latencies[len(latencies) // 2]:.1f}ms "
+        f"end_latency_max={1000 * latencies[-1]:.1f}ms"
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--subscribers", type=int, default=5000)
+    parser.add_argument("--idle", type=float, default=3.0, help="Idle window in seconds")
+    args = parser.parse_args()
+
+    await run_case("polling (old)", PollingRunBroker, args.subscribers, args.idle)
+    await run_case("event-driven", RunBroker, args.subscribers, args.idle)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""Benchmark: bytes on disk and replay throughput of compressed event storage.
+
+Writes the same synthetic run (a growing tool-calling conversation streamed
+in ``values`` mode plus token-by-token ``messages`` events) through the event
+store as JSONB, as zstd, and as zstd with a dictionary trained on a different
+synthetic run. Then reports the table footprint of each copy and how fast it
+replays. Requires DATABASE_URL with the run_events migrations applied.
+
+Usage:
+  python scripts/bench_event_compression.py [--turns 60] [--tokens 40]
+"""
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+# Add src to the Python path so the benchmark runs from a plain checkout
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root / "src"))
+
+import zstandard  # noqa: E402
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage  # noqa: E402
+from sqlalchemy import text  # noqa: E402
+
+from agent_server.core.database import db_manager  # noqa: E402
+from agent_server.services import event_compression  # noqa: E402
+from agent_server.services.event_compression import EventCodec  # noqa: E402
+from agent_server.services.event_converter import EventConverter  # noqa: E402
+from agent_server.services.event_store import event_store  # noqa: E402
+
+
+def synthetic_run(turns: int, tokens: int, seed: str) -> list[tuple[str, str]]:
+    """Return (event, stored JSON) pairs as the streaming path would store them"""
+    converter = EventConverter()
+    events, messages = [], []
+    for turn in range(turns):
+        messages = messages + [HumanMessage(content=f"{seed} question {turn}: " + "please explain " * 15, id=f"h{turn}")]
+        words = [f"word{(turn * tokens + i) % 97} " for i in range(tokens)]
+        for i, word in enumerate(words):
+            chunk = AIMessageChunk(content=word, id=f"run-{seed}-{turn}")
+            metadata = {"langgraph_step": turn, "langgraph_node": "agent", "ls_model_name": "gpt-4o-mini"}
+            events.append(("messages", (chunk, metadata)))
+        messages = messages + [AIMessage(content="".join(words), id=f"a{turn}")]
+        events.append(("values", {"messages": messages}))
+
+    stored = []
+    for seq, raw_event in enumerate(events, start=1):
+        encoded = converter.encode_raw_event(f"bench_event_{seq}", raw_event)
+        stored.append((encoded.stored_event, encoded.stored_data))
+    return stored
+
+
+async def write_and_replay(run_id: str, codec: EventCodec, events: list[tuple[str, str]]) -> tuple[int, float, float]:
+    event_compression.event_codec = codec
+    for seq, (event_type, data) in enumerate(events, start=1):
+        event_store.enqueue_encoded(run_id, f"{run_id}_event_{seq}", event_type, data)
+    await event_store.flush()
+
+    async with db_manager.get_engine().begin() as conn:
+        size = await conn.scalar(
+            text("SELECT SUM(pg_column_size(e.*)) FROM run_events e WHERE run_id = :run_id"),
+            {"run_id": run_id},
+        )
+
+    # Best of three replays
+    best = None
+    for _ in range(3):
+        start = time.perf_counter()
+        count = 0
+        async for _ in event_store.iter_events_since(run_id):
+            count += 1
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return int(size), count / best, best
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, default=60)
+    parser.add_argument("--tokens", type=int, default=40, help="Streamed tokens per answer")
+    args = parser.parse_args()
+
+    events = synthetic_run(args.turns, args.tokens, seed="bench")
+    training = [data.encode("utf-8") for _, data in synthetic_run(20, args.tokens, seed="train")]
+    dictionary = zstandard.train_dictionary(64 * 1024, training).as_bytes()
+    raw_bytes = sum(len(data.encode("utf-8")) for _, data in events)
+    print(f"{len(events)} events, {raw_bytes / 1e6:.1f} MB of JSON")
+
+    await db_manager.initialize()
+    cases = [
+        ("jsonb", EventCodec("none")),
+        ("zstd", EventCodec("zstd")),
+        ("zstd+dict", EventCodec("zstd", dictionary=dictionary)),
+    ]
+    try:
+        for name, codec in cases:
+            run_id = f"bench-compression-{name}"
+            await event_store.cleanup_events(run_id)
+            size, rate, elapsed = await write_and_replay(run_id, codec, events)
+            print(
+                f"{name:<10} on_disk={size / 1e6:7.2f} MB  "
+                f"replay={rate:9.0f} events/s ({1000 * elapsed:6.1f} ms)"
+            )
+            await event_store.cleanup_events(run_id)
+    finally:
+        await db_manager.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
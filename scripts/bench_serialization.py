@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""Microbenchmark: CPU cost of encoding streamed events.
+
+Encodes realistic LangChain payloads the way the streaming path does:
+``values`` events carrying a whole conversation state and ``messages``
+events carrying a single token chunk with its metadata. Compares the stdlib
+``json.dumps(default=GeneralSerializer.serialize)`` encoder with
+``GeneralSerializer.dumps`` (orjson), and the cached per-type
+dispatch of ``GeneralSerializer`` with the previous if/elif chain.
+
+Usage:
+  python scripts/bench_serialization.py [--messages 200] [--iterations 200]
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable
+
+# Add src to the Python path so the benchmark runs from a plain checkout
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root / "src"))
+
+from langchain_core.messages import (  # noqa: E402
+    AIMessage,
+    AIMessageChunk,
+    HumanMessage,
+    ToolMessage,
+)
+
+from agent_server.core.serializers import GeneralSerializer  # noqa: E402
+
+
+def build_state(messages: int) -> dict[str, Any]:
+    """A tool-using conversation of the given length"""
+    history: list[Any] = []
+    for i in range(messages):
+        turn = i % 3
+        if turn == 0:
+            history.append(HumanMessage(content=f"Question {i}: " + "lorem ipsum " * 20, id=f"h{i}"))
+        elif turn == 1:
+            history.append(
+                AIMessage(
+                    content="",
+                    id=f"a{i}",
+                    tool_calls=[{"name": "search", "args": {"query": f"q{i}"}, "id": f"call_{i}"}],
+                    response_metadata={"model_name": "gpt-4o-mini", "finish_reason": "tool_calls"},
+                    usage_metadata={"input_tokens": 812, "output_tokens": 24, "total_tokens": 836},
+                )
+            )
+        else:
+            history.append(ToolMessage(content="result " * 40, tool_call_id=f"call_{i - 1}", id=f"t{i}"))
+    return {"messages": history}
+
+
+def build_token_event() -> tuple[Any, dict[str, Any]]:
+    """A single streamed token with the metadata LangGraph attaches to it"""
+    chunk = AIMessageChunk(content="Hello", id="run-42")
+    metadata = {
+        "langgraph_step": 3,
+        "langgraph_node": "agent",
+        "langgraph_triggers": ["branch:to:agent"],
+        "langgraph_path": ["__pregel_pull", "agent"],
+        "langgraph_checkpoint_ns": "agent:8a4b1c2d-0000-0000-0000-000000000000",
+        "ls_provider": "openai",
+        "ls_model_name": "gpt-4o-mini",
+        "ls_temperature": 0.0,
+    }
+    return chunk, metadata
+
+
+class ChainSerializer(GeneralSerializer):
+    """Replica of the previous serializer that probed every object's attributes"""
+
+    def _serialize_object(self, obj: Any) -> Any:
+        if hasattr(obj, "model_dump") and callable(obj.model_dump):
+            return obj.model_dump()
+        elif hasattr(obj, "dict") and callable(obj.dict):
+            return obj.dict()
+        elif obj.__class__.__name__ == "Interrupt" and hasattr(obj, "value") and hasattr(obj, "id"):
+            return {"value": self._serialize_object(obj.value), "id": obj.id}
+        elif hasattr(obj, "_asdict") and callable(obj._asdict):
+            return {k: self._serialize_object(v) for k, v in obj._asdict().items()}
+        elif isinstance(obj, (set, frozenset)):
+            return list(obj)
+        elif isinstance(obj, (tuple, list)):
+            return [self._serialize_object(item) for item in obj]
+        elif isinstance(obj, dict):
+            return {k: self._serialize_object(v) for k, v in obj.items()}
+        elif isinstance(obj, (str, int, float, bool, type(None))):
+            return obj
+        else:
+            return str(obj)
+
+
+def measure(encode: Callable[[Any], str], payload: Any, iterations: int) -> float:
+    """Return CPU microseconds per encode"""
+    encode(payload)  # warm up
+    start = time.process_time()
+    for _ in range(iterations):
+        encode(payload)
+    return 1e6 * (time.process_time() - start) / iterations
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=200, help="Messages in the values state")
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    serializer = GeneralSerializer()
+
+    def stdlib(obj: Any) -> str:
+        return json.dumps(obj, default=serializer.serialize, separators=(",", ":"))
+
+    fast_name = "orjson"
+    cases = [
+        (f"values ({args.messages} messages)", build_state(args.messages)),
+        ("messages (token)", list(build_token_event())),
+    ]
+    for name, payload in cases:
+        baseline = measure(stdlib, payload, args.iterations)
+        fast = measure(serializer.dumps, payload, args.iterations)
+        print(
+            f"{name:<26} stdlib={baseline:8.1f}us  {fast_name}={fast:8.1f}us  "
+            f"speedup={baseline / fast:4.1f}x"
+        )
+
+    # Dispatch cost alone: serialize() walks the whole state, as it does
+    # for nested payloads that reach it through the JSON encoder's default
+    state = build_state(args.messages)
+    chain = measure(ChainSerializer().serialize, state, args.iterations)
+    cached = measure(serializer.serialize, state, args.iterations)
+    print(
+        f"{'serialize (dispatch)':<26} chain={chain:9.1f}us  cached={cached:8.1f}us  "
+        f"speedup={chain / cached:4.1f}x"
+    )
+
+
+if __name__ == "__main__":
+    main()
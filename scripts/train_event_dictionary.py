@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""Train a zstd dictionary for compressed event storage.
+
+Samples recent payloads from run_events and writes a dictionary to use with
+EVENT_STORE_COMPRESSION=zstd and EVENT_STORE_ZSTD_DICTIONARY=<output>.
+
+Usage:
+  python scripts/train_event_dictionary.py [--samples 5000] [--size 65536] [--output event_dict.zstd]
+"""
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+# Add src to the Python path so the script runs from a plain checkout
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root / "src"))
+
+import zstandard  # noqa: E402
+from sqlalchemy import text  # noqa: E402
+
+from agent_server.core.database import db_manager  # noqa: E402
+from agent_server.services.event_compression import event_codec  # noqa: E402
+
+
+async def load_samples(limit: int) -> list[bytes]:
+    await db_manager.initialize()
+    try:
+        async with db_manager.get_engine().begin() as conn:
+            rs = await conn.execute(
+                text(
+                    """
+                    SELECT data::text AS data, data_compressed
+                    FROM run_events
+                    ORDER BY created_at DESC
+                    LIMIT :limit
+                    """
+                ),
+                {"limit": limit},
+            )
+            rows = rs.fetchall()
+    finally:
+        await db_manager.close()
+
+    samples = []
+    for row in rows:
+        if row.data_compressed is not None:
+            samples.append(event_codec.decompress_raw(row.data_compressed))
+        elif row.data is not None:
+            samples.append(row.data.encode("utf-8"))
+    return samples
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--samples", type=int, default=5000, help="Recent events to train on")
+    parser.add_argument("--size", type=int, default=64 * 1024, help="Dictionary size in bytes")
+    parser.add_argument("--output", default="event_dict.zstd")
+    args = parser.parse_args()
+
+    samples = asyncio.run(load_samples(args.samples))
+    if len(samples) < 10:
+        sys.exit(f"Need at least 10 stored events to train a dictionary, found {len(samples)}")
+    dictionary = zstandard.train_dictionary(args.size, samples)
+    Path(args.output).write_bytes(dictionary.as_bytes())
+    print(f"Trained {len(dictionary.as_bytes())}-byte dictionary on {len(samples)} events -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,29 +1,54 @@
 """Run endpoints for Agent Protocol"""
 import asyncio
+from functools import partial
 from uuid import uuid4
 from datetime import datetime, UTC
-from typing import Dict, Optional, Union, List, Any
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Union
 from fastapi import APIRouter, HTTPException, Depends, Header, Query
 import logging
-from sqlalchemy import select, update, delete
+from sqlalchemy import bindparam, case, exists, select, text, update, delete
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.ext.asyncio import AsyncSession
 from ..core.orm import (
     Assistant as AssistantORM, 
     Thread as ThreadORM, 
     Run as RunORM,
     get_session, 
+    get_read_session,
     _get_session_maker
 )
 from fastapi.responses import StreamingResponse
 from langgraph.types import Command, Send
 
-from ..models import Run, RunCreate, RunList, RunStatus, User
+from ..models import Run, RunBatchCreate, RunCreate, RunList, RunStatus, User
 from ..core.auth_deps import get_current_user
-from ..core.sse import get_sse_headers, create_end_event
+from ..core.sse import get_sse_headers, create_end_event, create_error_event, create_metadata_event
 from ..core.auth_ctx import with_auth_ctx
 from ..core.serializers import GeneralSerializer
 from ..services.langgraph_service import get_langgraph_service, create_run_config
 from ..services.streaming_service import streaming_service
+from ..services.run_queue import get_stopped_runs, notify_run_queued, queue_enabled, run_was_requeued
+from ..services.run_admission import (
+    RETRY_AFTER_SECONDS,
+    RunAdmissionRejected,
+    RunTicket,
+    run_admission,
+)
+from ..services.multitask import (
+    ACTIVE_RUN_STATUSES,
+    RUN_ENQUEUE_POLL_INTERVAL,
+    RUN_STOP_POLL_INTERVAL,
+    RUN_STOP_TIMEOUT,
+    delete_run_checkpoints,
+    get_thread_turn,
+    resolve_multitask_strategy,
+    thread_locks,
+)
+from ..services.event_store import event_store
+from ..services.run_completion import TERMINAL_RUN_STATUSES, run_completion
+from ..services.run_batch import RUN_BATCH_MAX_ITEMS, batch_concurrency, iter_batch_results
+from ..services.stateless_runs import get_stateless_run, invoke_stateless
+from ..utils import generate_event_id
 from ..utils.assistants import resolve_assistant_id
 
 router = APIRouter()
@@ -36,6 +61,10 @@ serializer = GeneralSerializer()
 # NOTE: We keep only an in-memory task registry for asyncio.Task handles.
 # All run metadata/state is persisted via ORM.
 active_runs: Dict[str, asyncio.Task] = {}
+# Statuses requested for local executions being stopped, and the runs past
+# the point where stopping them makes a difference
+_stopping: Dict[str, str] = {}
+_finishing: Set[str] = set()
 
 # Default stream modes for background run execution
 DEFAULT_STREAM_MODES = ["values"]
@@ -68,35 +97,313 @@ def map_command_to_langgraph(cmd: Dict[str, Any]) -> Command:
     )
 
 
-async def set_thread_status(session: AsyncSession, thread_id: str, status: str):
-    """Update the status column of a thread."""
-    await session.execute(
-        update(ThreadORM)
-        .where(ThreadORM.thread_id == thread_id)
-        .values(status=status, updated_at=datetime.now(UTC))
+def queued_run_kwargs(graph_id: Optional[str], user: User, request: RunCreate) -> Dict[str, Any]:
+    """Arguments a worker process needs to execute the run (see services.run_queue)"""
+    return {
+        "graph_id": graph_id,
+        "user": user.model_dump(),
+        "stream_mode": request.stream_mode,
+        "checkpoint": request.checkpoint,
+        "command": request.command,
+        "interrupt_before": request.interrupt_before,
+        "interrupt_after": request.interrupt_after,
+        "multitask_strategy": request.multitask_strategy,
+        "stream_subgraphs": request.stream_subgraphs,
+    }
+
+
+def reserve_run_slot(run_id: str, user: User, assistant_id: str) -> Optional[RunTicket]:
+    """Reserve execution capacity in this process, or reject the run with 429.
+
+    Returns None when queue workers execute runs instead.
+    """
+    if queue_enabled():
+        return None
+    try:
+        return run_admission.reserve(run_id, user.identity, assistant_id)
+    except RunAdmissionRejected as e:
+        raise HTTPException(429, str(e), headers={"Retry-After": str(RETRY_AFTER_SECONDS)})
+
+
+def start_run_task(
+    ticket: RunTicket,
+    run_id: str,
+    thread_id: str,
+    graph_id: str,
+    request: RunCreate,
+    user: User,
+    multitask_strategy: str,
+) -> asyncio.Task:
+    """Execute a run created by :func:`insert_run` in the background once the admission controller lets it start"""
+    execute = partial(
+        execute_run_async,
+        run_id,
+        thread_id,
+        graph_id,
+        request.input or {},
+        user,
+        config=request.config,
+        context=request.context,
+        stream_mode=request.stream_mode,
+        checkpoint=request.checkpoint,
+        command=request.command,
+        interrupt_before=request.interrupt_before,
+        interrupt_after=request.interrupt_after,
+        multitask_strategy=multitask_strategy,
+        subgraphs=request.stream_subgraphs,
     )
+    task = asyncio.create_task(
+        _execute_admitted(ticket, run_id, thread_id, execute, wait_for_thread=multitask_strategy == "enqueue")
+    )
+
+    def _unregister(done: asyncio.Task) -> None:
+        # execute_run_async unregisters itself, but never runs if cancelled while queued
+        if active_runs.get(run_id) is done:
+            active_runs.pop(run_id, None)
+
+    task.add_done_callback(_unregister)
+    active_runs[run_id] = task
+    return task
+
+
+async def _execute_admitted(
+    ticket: RunTicket, run_id: str, thread_id: str, execute: Callable[[], Awaitable[Any]], wait_for_thread: bool
+) -> Any:
+    """Wait for the run's turn on its thread (multitask_strategy=enqueue), then for a free slot"""
+    try:
+        if wait_for_thread:
+            with run_completion.watch_thread(thread_id) as watch:
+                status, blocked = await get_thread_turn(thread_id, run_id)
+                if blocked:
+                    # Don't hold an execution slot while earlier runs finish
+                    run_admission.release(ticket)
+                    while blocked and status in ACTIVE_RUN_STATUSES:
+                        await watch.wait(RUN_ENQUEUE_POLL_INTERVAL)
+                        watch.clear()
+                        status, blocked = await get_thread_turn(thread_id, run_id)
+                    ticket = run_admission.reserve(run_id, ticket.user_id, ticket.assistant_id, bounded=False)
+            if status not in ACTIVE_RUN_STATUSES:
+                # Cancelled or deleted while waiting
+                run_admission.release(ticket)
+                return None
+    except BaseException:
+        run_admission.release(ticket)
+        raise
+    return await run_admission.run(ticket, execute)
+
+
+def _stop_requested(run_id: str, status: str) -> bool:
+    """Cancel the run if it executes (or waits for a slot) in this process.
+
+    Called for stop requests from any process. Returns whether the run is
+    here; it records ``status`` itself once its execution let go.
+    """
+    task = active_runs.get(run_id)
+    if task is None or task.done():
+        return False
+    if run_id not in _stopping and run_id not in _finishing:
+        _stopping[run_id] = status
+        task.cancel()
+    return True
+
+
+run_completion.on_stop_request(_stop_requested)
+
+
+async def _stop_local_run(run_id: str, status: str = "cancelled") -> None:
+    """Stop a run executing (or queued) in this process and wait until it settled"""
+    run_admission.cancel_queued(run_id)
+    task = active_runs.get(run_id)
+    if _stop_requested(run_id, status):
+        await asyncio.wait([task])
+
+
+async def stop_run(session: AsyncSession, run_id: str, status: str = "cancelled") -> None:
+    """Stop a run wherever it executes and record ``status``, unless it already ended.
+
+    An executing run records the status itself once it let go of its thread,
+    so runs enqueued behind it only start then. The status is recorded here
+    for runs that never started, and for runs whose process does not answer
+    within ``RUN_STOP_TIMEOUT``; those stop once they see it.
+    """
+    with run_completion.watch_run(run_id) as watch:
+        current = await session.scalar(select(RunORM.status).where(RunORM.run_id == run_id))
+        if current not in ACTIVE_RUN_STATUSES:
+            return
+        if current == "running" and run_id not in active_runs:
+            run_completion.request_stop(run_id, status)
+            await watch.wait(RUN_STOP_TIMEOUT)
+        await _stop_local_run(run_id, status)
+        if await update_run_status(run_id, status, session=session):
+            await streaming_service.signal_run_stopped(run_id, status)
+
+
+async def cancel_run_if_active(run_id: str) -> None:
+    """Stop a run wherever it executes and mark it cancelled, unless it already ended"""
+    async with _get_session_maker()() as session:
+        await stop_run(session, run_id)
+
+
+async def watch_stopped_runs() -> None:
+    """Stop local executions of runs stopped by a process they did not hear from.
+
+    Stop requests normally arrive through the run completion notifier; this
+    covers those missed while its connection was down.
+    """
+    while True:
+        await asyncio.sleep(RUN_STOP_POLL_INTERVAL)
+        try:
+            for run_id, status in (await get_stopped_runs(list(active_runs))).items():
+                if run_id not in _stopping and _stop_requested(run_id, status or "cancelled"):
+                    logger.info(f"Stopping run {run_id}, stopped through another process")
+        except Exception as e:
+            logger.error(f"Error checking for stopped runs: {e}")
+
+
+async def apply_multitask_strategy(session: AsyncSession, thread_id: str, strategy: str) -> None:
+    """Make way for a new run on the thread according to its multitask strategy.
+
+    Must be called while holding the thread's lock. Returns once the active
+    runs let go of the thread, wherever they execute (see :func:`stop_run`).
+    """
+    active = (
+        await session.scalars(
+            select(RunORM.run_id).where(
+                RunORM.thread_id == thread_id,
+                RunORM.status.in_(ACTIVE_RUN_STATUSES),
+            )
+        )
+    ).all()
+    if not active or strategy == "enqueue":
+        return
+    if strategy == "reject":
+        raise HTTPException(
+            409,
+            f"Thread '{thread_id}' already has an active run '{active[0]}'. "
+            "Use multitask_strategy 'enqueue', 'interrupt' or 'rollback' to run anyway.",
+        )
+
+    for run_id in active:
+        logger.info(f"Stopping run {run_id} on thread {thread_id} (multitask_strategy={strategy})")
+        await stop_run(session, run_id, "interrupted" if strategy == "interrupt" else "cancelled")
+    if strategy != "rollback":
+        return
+    for run_id in active:
+        await session.execute(delete(RunORM).where(RunORM.run_id == run_id))
+        await delete_run_checkpoints(thread_id, run_id)
+        await event_store.cleanup_events(run_id)
     await session.commit()
+    for run_id in active:
+        run_completion.publish(run_id, thread_id)
 
 
-async def update_thread_metadata(session: AsyncSession, thread_id: str, assistant_id: str, graph_id: str):
-    """Update thread metadata with assistant and graph information (dialect agnostic)."""
-    # Read-modify-write to avoid DB-specific JSON concat operators
-    thread = await session.scalar(
-        select(ThreadORM).where(ThreadORM.thread_id == thread_id)
+# Validates the assistant and the thread, marks the thread busy, records the
+# assistant/graph in its metadata and inserts the run, in one statement. The
+# thread is only updated (and the run only inserted) when every check passes;
+# the final row says which one failed.
+INSERT_RUN_SQL = text(
+    """
+    WITH assistant AS (
+        SELECT assistant_id, graph_id FROM assistant WHERE assistant_id = :assistant_id
+    ), thread_before AS (
+        SELECT status FROM thread WHERE thread_id = :thread_id
+    ), active AS (
+        SELECT run_id FROM runs
+        WHERE thread_id = :thread_id AND status IN ('pending', 'running', 'streaming')
+        LIMIT 1
+    ), busy_thread AS (
+        UPDATE thread t
+        SET status = 'busy',
+            metadata_json = COALESCE(t.metadata_json, '{}'::jsonb)
+                || jsonb_build_object('assistant_id', a.assistant_id, 'graph_id', a.graph_id),
+            updated_at = :now
+        FROM assistant a
+        WHERE t.thread_id = :thread_id
+          AND a.graph_id = ANY(CAST(:graph_ids AS text[]))
+          AND (NOT :require_interrupted OR t.status = 'interrupted')
+          AND (:allow_active OR NOT EXISTS (SELECT 1 FROM active))
+        RETURNING t.thread_id, a.assistant_id, a.graph_id
+    ), run AS (
+        INSERT INTO runs (
+            run_id, thread_id, assistant_id, status, input, config, context, kwargs,
+            user_id, created_at, updated_at
+        )
+        SELECT :run_id, b.thread_id, b.assistant_id, :status, :input, :config, :context,
+               :kwargs || jsonb_build_object('graph_id', b.graph_id),
+               :user_id, :now, :now
+        FROM busy_thread b
+        RETURNING run_id
     )
-    if not thread:
-        raise HTTPException(404, f"Thread '{thread_id}' not found for metadata update")
-    md = dict(getattr(thread, "metadata_json", {}) or {})
-    md.update({
-        "assistant_id": str(assistant_id),
-        "graph_id": graph_id,
-    })
-    await session.execute(
-        update(ThreadORM)
-        .where(ThreadORM.thread_id == thread_id)
-        .values(metadata_json=md, updated_at=datetime.now(UTC))
+    SELECT
+        (SELECT graph_id FROM assistant) AS graph_id,
+        (SELECT status FROM thread_before) AS thread_status,
+        (SELECT run_id FROM active) AS active_run_id,
+        EXISTS (SELECT 1 FROM run) AS created
+    """
+).bindparams(
+    bindparam("input", type_=JSONB),
+    bindparam("config", type_=JSONB),
+    bindparam("context", type_=JSONB),
+    bindparam("kwargs", type_=JSONB),
+)
+
+
+async def insert_run(
+    session: AsyncSession,
+    run_id: str,
+    thread_id: str,
+    assistant_id: str,
+    status: str,
+    request: RunCreate,
+    user: User,
+    multitask_strategy: str,
+    now: datetime,
+) -> str:
+    """Persist a new run on a thread and mark the thread busy; returns the run's graph ID.
+
+    Must be called while holding the thread's lock, after the strategy made
+    way for the run (see apply_multitask_strategy). Does not commit.
+    """
+    available_graphs = get_langgraph_service().list_graphs()
+    resume = bool(request.command and request.command.get("resume") is not None)
+    # Completed with the graph ID in SQL once the assistant is known
+    kwargs = queued_run_kwargs(None, user, request) if queue_enabled() else None
+    row = (
+        await session.execute(
+            INSERT_RUN_SQL,
+            {
+                "run_id": run_id,
+                "thread_id": thread_id,
+                "assistant_id": assistant_id,
+                "graph_ids": list(available_graphs),
+                "require_interrupted": resume,
+                # reject is enforced here; the other strategies were applied already
+                "allow_active": multitask_strategy != "reject",
+                "status": status,
+                "input": request.input or {},
+                "config": request.config,
+                "context": request.context,
+                "kwargs": kwargs,
+                "user_id": user.identity,
+                "now": now,
+            },
+        )
+    ).one()
+    if row.created:
+        return row.graph_id
+    if row.graph_id is None:
+        raise HTTPException(404, f"Assistant '{request.assistant_id}' not found")
+    if row.graph_id not in available_graphs:
+        raise HTTPException(404, f"Graph '{row.graph_id}' not found for assistant")
+    if row.thread_status is None:
+        raise HTTPException(404, f"Thread '{thread_id}' not found")
+    if resume and row.thread_status != "interrupted":
+        raise HTTPException(400, "Cannot resume: thread is not in interrupted state")
+    raise HTTPException(
+        409,
+        f"Thread '{thread_id}' already has an active run '{row.active_run_id}'. "
+        "Use multitask_strategy 'enqueue', 'interrupt' or 'rollback' to run anyway.",
     )
-    await session.commit()
 
 
 
@@ -109,68 +416,38 @@ async def create_run(
 ):
     """Create and execute a new run (persisted)."""
 
-    # Validate resume command requirements early
-    if request.command and request.command.get("resume") is not None:
-        # Check if thread exists and is in interrupted state
-        thread_stmt = select(ThreadORM).where(ThreadORM.thread_id == thread_id)
-        thread = await session.scalar(thread_stmt)
-        if not thread:
-            raise HTTPException(404, f"Thread '{thread_id}' not found")
-        if thread.status != "interrupted":
-            raise HTTPException(400, "Cannot resume: thread is not in interrupted state")
+    try:
+        multitask_strategy = resolve_multitask_strategy(request.multitask_strategy)
+    except ValueError as e:
+        raise HTTPException(422, str(e))
 
     run_id = str(uuid4())
 
-    # Get LangGraph service
-    langgraph_service = get_langgraph_service()
-    print(f"create_run: scheduling background task run_id={run_id} thread_id={thread_id} user={user.identity}")
     print(f"[create_run] scheduling background task run_id={run_id} thread_id={thread_id} user={user.identity}")
 
-    # Validate assistant exists and get its graph_id. If a graph_id was provided
-    # instead of an assistant UUID, map it deterministically and fall back to the
-    # default assistant created at startup.
-    requested_id = str(request.assistant_id)
-    available_graphs = langgraph_service.list_graphs()
-    resolved_assistant_id = resolve_assistant_id(requested_id, available_graphs)
+    # If a graph_id was provided instead of an assistant UUID, map it
+    # deterministically to the default assistant created at startup.
+    resolved_assistant_id = resolve_assistant_id(str(request.assistant_id), get_langgraph_service().list_graphs())
 
     config = request.config
     context = request.context
 
-
-    assistant_stmt = select(AssistantORM).where(
-        AssistantORM.assistant_id == resolved_assistant_id,
-    )
-    assistant = await session.scalar(assistant_stmt)
-    if not assistant:
-        raise HTTPException(404, f"Assistant '{request.assistant_id}' not found")
-
-    # Validate the assistant's graph exists
-    available_graphs = langgraph_service.list_graphs()
-    if assistant.graph_id not in available_graphs:
-        raise HTTPException(404, f"Graph '{assistant.graph_id}' not found for assistant")
-
-    # Mark thread as busy and update metadata with assistant/graph info
-    await set_thread_status(session, thread_id, "busy")
-    await update_thread_metadata(session, thread_id, assistant.assistant_id, assistant.graph_id)
-
-    # Persist run record via ORM model in core.orm (Run table)
-    now = datetime.now(UTC)
-    run_orm = RunORM(
-        run_id=run_id,  # explicitly set (DB can also default-generate if omitted)
-        thread_id=thread_id,
-        assistant_id=resolved_assistant_id,
-        status="pending",
-        input=request.input or {},
-        config=config,
-        context=context,
-        user_id=user.identity,
-        created_at=now,
-        updated_at=now,
-        output=None,
-        error_message=None,
-    )
-    session.add(run_orm)
-    await session.commit()
+    async with thread_locks.hold(thread_id):
+        if multitask_strategy in ("interrupt", "rollback"):
+            await apply_multitask_strategy(session, thread_id, multitask_strategy)
+        ticket = reserve_run_slot(run_id, user, resolved_assistant_id)
+        try:
+            now = datetime.now(UTC)
+            graph_id = await insert_run(
+                session, run_id, thread_id, resolved_assistant_id, "pending", request, user, multitask_strategy, now
+            )
+            if queue_enabled():
+                await notify_run_queued(session, run_id)
+            await session.commit()
+        except BaseException:
+            if ticket is not None:
+                run_admission.release(ticket)
+            raise
 
     # Build response from ORM -> Pydantic
     run = Run(
@@ -188,29 +465,13 @@ async def create_run(
         error_message=None,
     )
 
-    # Start execution asynchronously
-    # Don't pass the session to avoid transaction conflicts
-    task = asyncio.create_task(
-        execute_run_async(
-            run_id,
-            thread_id,
-            assistant.graph_id,
-            request.input or {},
-            user,
-            config,
-            context,
-            request.stream_mode,
-            None,  # Don't pass session to avoid conflicts
-            request.checkpoint,
-            request.command,
-            request.interrupt_before,
-            request.interrupt_after,
-            request.multitask_strategy,
-            request.stream_subgraphs,
-        )
-    )
+    if queue_enabled():
+        # A worker process claims and executes the run
+        return run
+
+    # Start execution asynchronously; it opens its own session
+    task = start_run_task(ticket, run_id, thread_id, graph_id, request, user, multitask_strategy)
     print(f"[create_run] background task created task_id={id(task)} for run_id={run_id}")
-    active_runs[run_id] = task
 
     return run
 
@@ -223,68 +484,38 @@ async def create_and_stream_run(
     session: AsyncSession = Depends(get_session)
 ):
     """Create a new run and stream its execution - persisted + SSE."""
-    
-    # Validate resume command requirements early
-    if request.command and request.command.get("resume") is not None:
-        # Check if thread exists and is in interrupted state
-        thread_stmt = select(ThreadORM).where(ThreadORM.thread_id == thread_id)
-        thread = await session.scalar(thread_stmt)
-        if not thread:
-            raise HTTPException(404, f"Thread '{thread_id}' not found")
-        if thread.status != "interrupted":
-            raise HTTPException(400, "Cannot resume: thread is not in interrupted state")
+
+    try:
+        multitask_strategy = resolve_multitask_strategy(request.multitask_strategy)
+    except ValueError as e:
+        raise HTTPException(422, str(e))
 
     run_id = str(uuid4())
 
-    # Get LangGraph service
-    langgraph_service = get_langgraph_service()
     print(f"[create_and_stream_run] scheduling background task run_id={run_id} thread_id={thread_id} user={user.identity}")
 
-    # Validate assistant exists and get its graph_id. Allow passing a graph_id
-    # by mapping it to a deterministic assistant ID.
-    requested_id = str(request.assistant_id)
-    available_graphs = langgraph_service.list_graphs()
-
-    resolved_assistant_id = resolve_assistant_id(requested_id, available_graphs)
+    # Allow passing a graph_id by mapping it to a deterministic assistant ID.
+    resolved_assistant_id = resolve_assistant_id(str(request.assistant_id), get_langgraph_service().list_graphs())
 
     config = request.config
     context = request.context
 
-
-    assistant_stmt = select(AssistantORM).where(
-        AssistantORM.assistant_id == resolved_assistant_id,
-    )
-    assistant = await session.scalar(assistant_stmt)
-    if not assistant:
-        raise HTTPException(404, f"Assistant '{request.assistant_id}' not found")
-
-    # Validate the assistant's graph exists
-    available_graphs = langgraph_service.list_graphs()
-    if assistant.graph_id not in available_graphs:
-        raise HTTPException(404, f"Graph '{assistant.graph_id}' not found for assistant")
-
-    # Mark thread as busy and update metadata with assistant/graph info
-    await set_thread_status(session, thread_id, "busy")
-    await update_thread_metadata(session, thread_id, assistant.assistant_id, assistant.graph_id)
-
-    # Persist run record
-    now = datetime.now(UTC)
-    run_orm = RunORM(
-        run_id=run_id,
-        thread_id=thread_id,
-        assistant_id=resolved_assistant_id,
-        status="streaming",
-        input=request.input or {},
-        config=config,
-        context=context,
-        user_id=user.identity,
-        created_at=now,
-        updated_at=now,
-        output=None,
-        error_message=None,
-    )
-    session.add(run_orm)
-    await session.commit()
+    async with thread_locks.hold(thread_id):
+        if multitask_strategy in ("interrupt", "rollback"):
+            await apply_multitask_strategy(session, thread_id, multitask_strategy)
+        ticket = reserve_run_slot(run_id, user, resolved_assistant_id)
+        try:
+            now = datetime.now(UTC)
+            graph_id = await insert_run(
+                session, run_id, thread_id, resolved_assistant_id, "streaming", request, user, multitask_strategy, now
+            )
+            if queue_enabled():
+                await notify_run_queued(session, run_id)
+            await session.commit()
+        except BaseException:
+            if ticket is not None:
+                run_admission.release(ticket)
+            raise
 
     # Build response model for stream context
     run = Run(
@@ -302,29 +533,12 @@ async def create_and_stream_run(
         error_message=None,
     )
 
-    # Start background execution that will populate the broker
-    # Don't pass the session to avoid transaction conflicts
-    task = asyncio.create_task(
-        execute_run_async(
-            run_id,
-            thread_id,
-            assistant.graph_id,
-            request.input or {},
-            user,
-            config,
-            context,
-            request.stream_mode,
-            None,  # Don't pass session to avoid conflicts
-            request.checkpoint,
-            request.command,
-            request.interrupt_before,
-            request.interrupt_after,
-            request.multitask_strategy,
-            request.stream_subgraphs,
-        )
-    )
-    print(f"[create_and_stream_run] background task created task_id={id(task)} for run_id={run_id}")
-    active_runs[run_id] = task
+    # Start background execution that will populate the broker, unless a
+    # worker process claims the run (its events arrive via the broker)
+    if not queue_enabled():
+        # It opens its own session, avoiding transaction conflicts
+        task = start_run_task(ticket, run_id, thread_id, graph_id, request, user, multitask_strategy)
+        print(f"[create_and_stream_run] background task created task_id={id(task)} for run_id={run_id}")
 
     # Extract requested stream mode(s)
     stream_mode = request.stream_mode
@@ -349,6 +563,226 @@ async def create_and_stream_run(
     )
 
 
+async def get_run_assistant(session: AsyncSession, assistant_id: str) -> AssistantORM:
+    """Resolve an assistant ID (or graph ID) to an assistant whose graph is available"""
+    available_graphs = get_langgraph_service().list_graphs()
+    resolved_assistant_id = resolve_assistant_id(str(assistant_id), available_graphs)
+    assistant = await session.scalar(
+        select(AssistantORM).where(AssistantORM.assistant_id == resolved_assistant_id)
+    )
+    if not assistant:
+        raise HTTPException(404, f"Assistant '{assistant_id}' not found")
+    if assistant.graph_id not in available_graphs:
+        raise HTTPException(404, f"Graph '{assistant.graph_id}' not found for assistant")
+    return assistant
+
+
+async def prepare_stateless_run(request: RunCreate, user: User, session: AsyncSession) -> AssistantORM:
+    """Validate a run without a thread; returns its assistant"""
+    if request.command is not None or request.checkpoint is not None:
+        raise HTTPException(422, "Runs without a thread cannot resume: 'command' and 'checkpoint' need a thread")
+    if request.interrupt_before is not None or request.interrupt_after is not None:
+        raise HTTPException(422, "Runs without a thread cannot be interrupted")
+    assistant = await get_run_assistant(session, request.assistant_id)
+    # Nothing else to read; release the connection before executing
+    await session.commit()
+    return assistant
+
+
+class AdmittedStreamingResponse(StreamingResponse):
+    """Streams a run holding an admission ticket, released however the response ends.
+
+    The body may never be iterated (the client left before it started), so
+    its generator cannot be relied on to give the ticket up.
+    """
+
+    def __init__(self, ticket: RunTicket, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.ticket = ticket
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            run_admission.release(self.ticket)
+
+
+@router.post("/runs/wait")
+async def create_stateless_run_wait(
+    request: RunCreate,
+    user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_session),
+):
+    """Execute a run without a thread and return its final values.
+
+    Nothing is persisted: no thread, run or checkpoint is written.
+    """
+    assistant = await prepare_stateless_run(request, user, session)
+    try:
+        ticket = run_admission.reserve(str(uuid4()), user.identity, assistant.assistant_id)
+    except RunAdmissionRejected as e:
+        raise HTTPException(429, str(e), headers={"Retry-After": str(RETRY_AFTER_SECONDS)})
+    try:
+        output = await invoke_stateless(
+            ticket, assistant.graph_id, request.input or {}, user, request.config, request.context
+        )
+    except Exception as e:
+        logger.warning(f"Stateless run {ticket.run_id} failed: {e}")
+        raise HTTPException(500, f"Run failed: {e}")
+    return serializer.serialize(output)
+
+
+@router.post("/runs/stream")
+async def create_stateless_run_stream(
+    request: RunCreate,
+    user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_session),
+):
+    """Execute a run without a thread and stream its events with SSE.
+
+    Events are delivered straight to this response without the broker or the
+    event store, so the stream cannot be resumed; disconnecting cancels the run.
+    """
+    assistant = await prepare_stateless_run(request, user, session)
+    run_id = str(uuid4())
+    try:
+        ticket = run_admission.reserve(run_id, user.identity, assistant.assistant_id)
+    except RunAdmissionRejected as e:
+        raise HTTPException(429, str(e), headers={"Retry-After": str(RETRY_AFTER_SECONDS)})
+    stream_modes = request.stream_mode or DEFAULT_STREAM_MODES
+    stream_modes = [stream_modes] if isinstance(stream_modes, str) else list(stream_modes)
+    # Accept "messages-tuple" as an alias of "messages"
+    stream_modes = ["messages" if mode == "messages-tuple" else mode for mode in stream_modes]
+
+    async def generate():
+        try:
+            yield create_metadata_event(run_id, generate_event_id(run_id, 0))
+            async with run_admission.hold(ticket):
+                graph, run_config = await get_stateless_run(run_id, assistant.graph_id, user, request.config)
+                event_counter = 0
+                async with with_auth_ctx(user, []):
+                    async for raw_event in graph.astream(
+                        request.input or {},
+                        config=run_config,
+                        context=request.context,
+                        subgraphs=request.stream_subgraphs,
+                        stream_mode=stream_modes,
+                    ):
+                        if _should_skip_event(raw_event):
+                            continue
+                        event_counter += 1
+                        frame = streaming_service.event_converter.convert_raw_to_sse(
+                            generate_event_id(run_id, event_counter), raw_event
+                        )
+                        if frame:
+                            yield frame
+        except Exception as e:
+            logger.warning(f"Stateless run {run_id} failed: {e}")
+            yield create_error_event(str(e))
+
+    return AdmittedStreamingResponse(ticket, generate(), media_type="text/event-stream", headers=get_sse_headers())
+
+
+@router.post("/runs/batch")
+async def create_run_batch(
+    request: RunBatchCreate,
+    user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_session),
+):
+    """Execute one run per input and stream the results as NDJSON.
+
+    Each line is ``{"index", "run_id", "thread_id", "status", "output",
+    "error"}`` for one input, in completion order. With ``stateless`` no
+    thread, run or checkpoint is stored and ``thread_id`` is null; otherwise
+    every input gets its own thread and run, as if created one by one.
+    """
+    if len(request.inputs) > RUN_BATCH_MAX_ITEMS:
+        raise HTTPException(422, f"A batch accepts at most {RUN_BATCH_MAX_ITEMS} inputs")
+
+    assistant = await get_run_assistant(session, request.assistant_id)
+    resolved_assistant_id, graph_id = assistant.assistant_id, assistant.graph_id
+    # The items open their own sessions; don't keep this connection for the whole batch
+    await session.commit()
+
+    batch_id = str(uuid4())
+    logger.info(f"Batch {batch_id}: {len(request.inputs)} inputs for assistant {resolved_assistant_id}")
+
+    async def execute_stateless_item(index: int, item: Dict[str, Any]) -> Dict[str, Any]:
+        run_id = str(uuid4())
+        try:
+            # Already admitted as part of the batch; wait for a slot instead of failing
+            ticket = run_admission.reserve(run_id, user.identity, resolved_assistant_id, bounded=False)
+            output = await invoke_stateless(ticket, graph_id, item, user, request.config, request.context)
+        except Exception as e:
+            return {"index": index, "run_id": run_id, "thread_id": None, "status": "failed", "output": None, "error": str(e)}
+        return {"index": index, "run_id": run_id, "thread_id": None, "status": "completed", "output": output, "error": None}
+
+    async def execute_persistent_item(index: int, item: Dict[str, Any]) -> Dict[str, Any]:
+        run_id, thread_id = str(uuid4()), str(uuid4())
+        run_request = RunCreate(
+            assistant_id=resolved_assistant_id, input=item, config=request.config, context=request.context
+        )
+        now = datetime.now(UTC)
+        async with _get_session_maker()() as item_session:
+            item_session.add(
+                ThreadORM(
+                    thread_id=thread_id,
+                    status="idle",
+                    metadata_json={"batch_id": batch_id},
+                    user_id=user.identity,
+                    created_at=now,
+                    updated_at=now,
+                )
+            )
+            await item_session.flush()
+            # Nobody else knows the thread yet, so no lock or strategy to apply
+            await insert_run(
+                item_session, run_id, thread_id, resolved_assistant_id, "pending", run_request, user, "reject", now
+            )
+            if queue_enabled():
+                await notify_run_queued(item_session, run_id)
+            await item_session.commit()
+
+            with run_completion.watch_run(run_id) as watch:
+                if not queue_enabled():
+                    # Already admitted as part of the batch; wait for a slot instead of failing
+                    ticket = run_admission.reserve(run_id, user.identity, resolved_assistant_id, bounded=False)
+                    start_run_task(ticket, run_id, thread_id, graph_id, run_request, user, "reject")
+                try:
+                    while True:
+                        run_orm = await item_session.scalar(
+                            select(RunORM).where(RunORM.run_id == run_id).execution_options(populate_existing=True)
+                        )
+                        if run_orm is None or run_orm.status in TERMINAL_RUN_STATUSES:
+                            break
+                        await item_session.commit()
+                        await watch.wait()
+                        watch.clear()
+                except asyncio.CancelledError:
+                    # The batch was closed (client disconnect): don't leave the run behind
+                    await asyncio.shield(cancel_run_if_active(run_id))
+                    raise
+
+        if run_orm is None:
+            return {"index": index, "run_id": run_id, "thread_id": thread_id, "status": "deleted", "output": None, "error": None}
+        return {
+            "index": index,
+            "run_id": run_id,
+            "thread_id": thread_id,
+            "status": run_orm.status,
+            "output": run_orm.output,
+            "error": run_orm.error_message,
+        }
+
+    execute = execute_stateless_item if request.stateless else execute_persistent_item
+
+    async def generate_lines():
+        async for result in iter_batch_results(request.inputs, execute, batch_concurrency(request.concurrency)):
+            yield serializer.dumps(result) + "\n"
+
+    return StreamingResponse(generate_lines(), media_type="application/x-ndjson")
+
+
 @router.get("/threads/{thread_id}/runs/{run_id}", response_model=Run)
 async def get_run(
     thread_id: str,
@@ -379,7 +813,7 @@ async def get_run(
 async def list_runs(
     thread_id: str,
     user: User = Depends(get_current_user),
-    session: AsyncSession = Depends(get_session),
+    session: AsyncSession = Depends(get_read_session("runs.list")),
 ):
     """List runs for a specific thread (persisted)."""
     stmt = select(RunORM).where(
@@ -416,24 +850,10 @@ async def update_run(
 
     # Handle interruption/cancellation
 
-    if request.status == "cancelled":
-        print(f"[update_run] cancelling run_id={run_id} user={user.identity} thread_id={thread_id}")
-        await streaming_service.cancel_run(run_id)
-        print(f"[update_run] set DB status=cancelled run_id={run_id}")
-        await session.execute(
-            update(RunORM).where(RunORM.run_id == str(run_id)).values(status="cancelled", updated_at=datetime.now(UTC))
-        )
-        await session.commit()
-        print(f"[update_run] commit done (cancelled) run_id={run_id}")
-    elif request.status == "interrupted":
-        print(f"[update_run] interrupt run_id={run_id} user={user.identity} thread_id={thread_id}")
-        await streaming_service.interrupt_run(run_id)
-        print(f"[update_run] set DB status=interrupted run_id={run_id}")
-        await session.execute(
-            update(RunORM).where(RunORM.run_id == str(run_id)).values(status="interrupted", updated_at=datetime.now(UTC))
-        )
-        await session.commit()
-        print(f"[update_run] commit done (interrupted) run_id={run_id}")
+    if request.status in ("cancelled", "interrupted"):
+        print(f"[update_run] stopping run_id={run_id} status={request.status} user={user.identity} thread_id={thread_id}")
+        await stop_run(session, run_id, request.status)
+        print(f"[update_run] commit done ({request.status}) run_id={run_id}")
 
     # Return final run state
     run_orm = await session.scalar(select(RunORM).where(RunORM.run_id == run_id))
@@ -447,46 +867,45 @@ async def update_run(
 async def join_run(
     thread_id: str,
     run_id: str,
+    timeout: Optional[float] = Query(
+        None, ge=0, description="Seconds to wait for the run to end; waits until it ends if omitted"
+    ),
     user: User = Depends(get_current_user),
     session: AsyncSession = Depends(get_session),
 ):
-    """Join a run (wait for completion and return final output) - persisted."""
-    # Get run and validate it exists
-    run_orm = await session.scalar(
-        select(RunORM).where(
-            RunORM.run_id == str(run_id),
-            RunORM.thread_id == thread_id,
-            RunORM.user_id == user.identity,
-        )
-    )
-    if not run_orm:
-        raise HTTPException(404, f"Run '{run_id}' not found")
-
-    # If already completed, return output immediately
-    if run_orm.status in ["completed", "failed", "cancelled"]:
-        # Refresh to ensure we have the latest data
-        await session.refresh(run_orm)
-        output = getattr(run_orm, "output", None) or {}
-        return output
+    """Join a run (wait for completion and return final output) - persisted.
 
-    # Wait for background task to complete
-    task = active_runs.get(run_id)
-    if task:
-        try:
-            await asyncio.wait_for(task, timeout=30.0)
-        except asyncio.TimeoutError:
-            # Task is taking too long, but that's okay - we'll check DB status
-            pass
-        except asyncio.CancelledError:
-            # Task was cancelled, that's also okay
-            pass
-
-    # Return final output from database
-    run_orm = await session.scalar(select(RunORM).where(RunORM.run_id == run_id))
-    if run_orm:
-        await session.refresh(run_orm)  # Refresh to get latest data from DB
-    output = getattr(run_orm, "output", None) or {}
-    return output
+    Returns as soon as the run ends on any worker; once the timeout expires
+    the output stored so far is returned.
+    """
+    run_filter = (
+        RunORM.run_id == str(run_id),
+        RunORM.thread_id == thread_id,
+        RunORM.user_id == user.identity,
+    )
+    loop = asyncio.get_running_loop()
+    deadline = None if timeout is None else loop.time() + timeout
+
+    # Watch before checking so a run ending in between is not missed
+    with run_completion.watch_run(run_id) as watch:
+        status = await session.scalar(select(RunORM.status).where(*run_filter))
+        if status is None:
+            raise HTTPException(404, f"Run '{run_id}' not found")
+
+        while status not in TERMINAL_RUN_STATUSES:
+            # Don't hold a pooled connection while waiting
+            await session.commit()
+            remaining = None if deadline is None else deadline - loop.time()
+            if (remaining is not None and remaining <= 0) or not await watch.wait(remaining):
+                break
+            watch.clear()
+            status = await session.scalar(select(RunORM.status).where(*run_filter))
+            if status is None:
+                # Deleted while waiting
+                return {}
+
+    output = await session.scalar(select(RunORM.output).where(*run_filter))
+    return output or {}
 
 
 @router.get("/threads/{thread_id}/runs/{run_id}/stream")
@@ -561,6 +980,8 @@ async def cancel_run_endpoint(
     - action=cancel => hard cancel
     - action=interrupt => cooperative interrupt if supported
     - wait=1 => await background task to finish settling
+
+    Active runs are stopped wherever they execute before the response is sent.
     """
     print(f"[cancel_run] fetch run run_id={run_id} thread_id={thread_id} user={user.identity}")
     run_orm = await session.scalar(
@@ -574,22 +995,9 @@ async def cancel_run_endpoint(
         raise HTTPException(404, f"Run '{run_id}' not found")
 
 
-    if action == "interrupt":
-        print(f"[cancel_run] interrupt run_id={run_id} user={user.identity} thread_id={thread_id}")
-        await streaming_service.interrupt_run(run_id)
-        # Persist status as interrupted
-        await session.execute(
-            update(RunORM).where(RunORM.run_id == str(run_id)).values(status="interrupted", updated_at=datetime.now(UTC))
-        )
-        await session.commit()
-    else:
-        print(f"[cancel_run] cancel run_id={run_id} user={user.identity} thread_id={thread_id}")
-        await streaming_service.cancel_run(run_id)
-        # Persist status as cancelled
-        await session.execute(
-            update(RunORM).where(RunORM.run_id == str(run_id)).values(status="cancelled", updated_at=datetime.now(UTC))
-        )
-        await session.commit()
+    print(f"[cancel_run] {action} run_id={run_id} user={user.identity} thread_id={thread_id}")
+    # Persists status as cancelled/interrupted (thread included) once the run let go
+    await stop_run(session, run_id, "interrupted" if action == "interrupt" else "cancelled")
 
     # Optionally wait for background task
     if wait:
@@ -602,13 +1010,16 @@ async def cancel_run_endpoint(
             except Exception:
                 pass
 
-    # Reload and return updated Run (do NOT delete here; deletion is a separate endpoint)
+    # Reload and return updated Run (do NOT delete here; deletion is a separate endpoint).
+    # The status may have been recorded by the process that executed the run
     run_orm = await session.scalar(
-        select(RunORM).where(
+        select(RunORM)
+        .where(
             RunORM.run_id == run_id,
             RunORM.thread_id == thread_id,
             RunORM.user_id == user.identity,
         )
+        .execution_options(populate_existing=True)
     )
     if not run_orm:
         raise HTTPException(404, f"Run '{run_id}' not found after cancellation")
@@ -650,9 +1061,15 @@ async def execute_run_async(
     interrupt_after: Optional[Union[str, List[str]]] = None,
     multitask_strategy: Optional[str] = None,
     subgraphs: Optional[bool] = False,
+    recovered: bool = False,
 ):
     
-    """Execute run asynchronously in background using streaming to capture all events"""    # Use provided session or get a new one
+    """Execute run asynchronously in background using streaming to capture all events.
+
+    A ``recovered`` run was executed before by a worker that stopped; it
+    continues from the last checkpoint it wrote, if any.
+    """    # Use provided session or get a new one
+    owns_session = session is None
     if session is None:
         maker = _get_session_maker()
         session = maker()
@@ -667,7 +1084,9 @@ async def execute_run_async(
     
     try:
         # Update status
-        await update_run_status(run_id, "running", session=session)
+        if not await update_run_status(run_id, "running", session=session):
+            # Stopped or deleted before it started
+            return
         
         # Get graph and execute
         langgraph_service = get_langgraph_service()
@@ -698,6 +1117,12 @@ async def execute_run_async(
         
         # Execute using streaming to capture events for later replay
         event_counter = 0
+        if recovered:
+            # Number events after those the previous attempt stored
+            event_counter = await event_store.last_sequence(run_id)
+            streaming_service.resume_run(run_id, event_counter)
+            if await _run_wrote_checkpoint(graph, thread_id, run_id):
+                execution_input = None
         final_output = None
         has_interrupt = False
         
@@ -733,10 +1158,8 @@ async def execute_run_async(
                 event_counter += 1
                 event_id = f"{run_id}_event_{event_counter}"
                 
-                # Forward to broker for live consumers
-                await streaming_service.put_to_broker(run_id, event_id, raw_event, only_interrupt_updates=only_interrupt_updates)
-                # Store for replay
-                await streaming_service.store_event_from_raw(run_id, event_id, raw_event, only_interrupt_updates=only_interrupt_updates)
+                # Forward to live consumers and store for replay (serialized once)
+                await streaming_service.publish_event(run_id, event_id, raw_event, only_interrupt_updates=only_interrupt_updates)
                 
                 # Check for interrupt in this event
                 event_data = None
@@ -756,42 +1179,99 @@ async def execute_run_async(
                     # Non-tuple events are values mode
                     final_output = raw_event
         
+        # Recording its own end from here on
+        _finishing.add(run_id)
+        # Make replay history durable before publishing the final status
+        await streaming_service.flush_stored_events(run_id)
+        
+        # Update with results; the thread follows (interrupted or back to idle)
         if has_interrupt:
             await update_run_status(run_id, "interrupted", output=final_output or {}, session=session)
-            if not session:
-                raise RuntimeError(f"No database session available to update thread {thread_id} status")
-            await set_thread_status(session, thread_id, "interrupted")
-
         else:
-            # Update with results
             await update_run_status(run_id, "completed", output=final_output or {}, session=session)
-            # Mark thread back to idle
-            if not session:
-                raise RuntimeError(f"No database session available to update thread {thread_id} status")
-            await set_thread_status(session, thread_id, "idle")
-       
+
     except asyncio.CancelledError:
+        await streaming_service.flush_stored_events(run_id)
+        if run_was_requeued(run_id):
+            # Another worker takes the run over; it has not ended
+            raise
+        status = _stopping.get(run_id, "cancelled")
         # Store empty output to avoid JSON serialization issues
-        await update_run_status(run_id, "cancelled", output={}, session=session)
-        if not session:
-            raise RuntimeError(f"No database session available to update thread {thread_id} status")
-        await set_thread_status(session, thread_id, "idle")
+        if not await update_run_status(run_id, status, output={}, session=session):
+            # Already recorded by whoever stopped it; tell them the run let go
+            run_completion.publish(run_id, thread_id)
         # Signal cancellation to broker
-        await streaming_service.signal_run_cancelled(run_id)
+        await streaming_service.signal_run_stopped(run_id, status)
         raise
     except Exception as e:
+        await streaming_service.flush_stored_events(run_id)
         # Store empty output to avoid JSON serialization issues
         await update_run_status(run_id, "failed", output={}, error=str(e), session=session)
-        if not session:
-            raise RuntimeError(f"No database session available to update thread {thread_id} status")
-        await set_thread_status(session, thread_id, "idle")
         # Signal error to broker
         await streaming_service.signal_run_error(run_id, str(e))
         raise
     finally:
-        # Clean up broker
-        await streaming_service.cleanup_run(run_id)
+        # Clean up broker; viewers keep waiting for a run that was requeued
+        await streaming_service.cleanup_run(run_id, finished=not run_was_requeued(run_id))
         active_runs.pop(run_id, None)
+        _stopping.pop(run_id, None)
+        _finishing.discard(run_id)
+        if owns_session:
+            await session.close()
+
+
+async def _run_wrote_checkpoint(graph, thread_id: str, run_id: str) -> bool:
+    """Whether an earlier attempt of the run got as far as saving a checkpoint"""
+    checkpointer = getattr(graph, "checkpointer", None)
+    if not checkpointer:
+        return False
+    async for _ in checkpointer.alist(
+        {"configurable": {"thread_id": thread_id}}, filter={"run_id": run_id}, limit=1
+    ):
+        return True
+    return False
+
+
+# Thread status once one of its runs moves to the given status
+THREAD_STATUS_FOR_RUN = {
+    "running": "busy",
+    "completed": "idle",
+    "failed": "idle",
+    "cancelled": "idle",
+    "interrupted": "interrupted",
+}
+
+
+def run_transition_statement(run_id: str, status: str, values: Dict[str, Any]):
+    """Update a run and its thread's status in one statement, returning the thread ID.
+
+    Only active runs change status: once a run ended (or was stopped through
+    the API) later transitions leave the run and its thread alone and return
+    nothing. A thread stays busy while it has other active runs (enqueued
+    runs), so run and thread status are never observed out of sync.
+    """
+    run = (
+        update(RunORM)
+        .where(RunORM.run_id == run_id, RunORM.status.in_(ACTIVE_RUN_STATUSES))
+        .values(**values)
+        .returning(RunORM.thread_id)
+    )
+    thread_status = THREAD_STATUS_FOR_RUN.get(status)
+    if thread_status is None:
+        return run
+    run = run.cte("run")
+    other_active = exists().where(
+        RunORM.thread_id == ThreadORM.thread_id,
+        RunORM.run_id != run_id,
+        RunORM.status.in_(ACTIVE_RUN_STATUSES),
+    )
+    thread = (
+        update(ThreadORM)
+        .where(ThreadORM.thread_id == run.c.thread_id)
+        .values(status=case((other_active, "busy"), else_=thread_status), updated_at=values["updated_at"])
+        .cte("thread")
+    )
+    return select(run.c.thread_id).add_cte(thread)
 
 
 async def update_run_status(
@@ -800,8 +1280,11 @@ async def update_run_status(
     output=None,
     error: str = None,
     session: Optional[AsyncSession] = None,
-):
-    """Update run status in database (persisted). If session not provided, opens a short-lived session."""
+) -> bool:
+    """Update run status, and its thread's, in database (persisted). If session not provided, opens a short-lived session.
+
+    Returns False if the run was not active anymore (see :func:`run_transition_statement`).
+    """
     owns_session = False
     if session is None:
         maker = _get_session_maker()
@@ -820,9 +1303,12 @@ async def update_run_status(
         if error is not None:
             values["error_message"] = error
         print(f"[update_run_status] updating DB run_id={run_id} status={status}")
-        await session.execute(update(RunORM).where(RunORM.run_id == str(run_id)).values(**values))  # type: ignore[arg-type]
+        thread_id = await session.scalar(run_transition_statement(str(run_id), status, values))
         await session.commit()
         print(f"[update_run_status] commit done run_id={run_id}")
+        if status in TERMINAL_RUN_STATUSES and thread_id is not None:
+            run_completion.publish(run_id, thread_id)
+        return thread_id is not None
     finally:
         # Close only if we created it here
         if owns_session:
@@ -866,16 +1352,7 @@ async def delete_run(
     # If forcing and active, cancel first
     if force and run_orm.status in ["pending", "running", "streaming"]:
         print(f"[delete_run] force-cancelling active run run_id={run_id}")
-        await streaming_service.cancel_run(run_id)
-        # Best-effort: wait for bg task to settle
-        task = active_runs.get(run_id)
-        if task:
-            try:
-                await task
-            except asyncio.CancelledError:
-                pass
-            except Exception:
-                pass
+        await stop_run(session, run_id)
 
     # Delete the record
     await session.execute(
@@ -886,6 +1363,7 @@ async def delete_run(
         )
     )
     await session.commit()
+    run_completion.publish(run_id, thread_id)
 
     # Clean up active task if exists
     task = active_runs.pop(run_id, None)
@@ -1,5 +1,4 @@
 """Thread endpoints for Agent Protocol"""
-import asyncio
 from uuid import uuid4
 from datetime import datetime, UTC
 from typing import List, Optional, Dict, Any
@@ -12,11 +11,10 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..models import Thread, ThreadCreate, ThreadList, ThreadSearchRequest, ThreadSearchResponse, ThreadState, ThreadHistoryRequest, User, ThreadCheckpoint
 from ..core.auth_deps import get_current_user
-from ..core.orm import Thread as ThreadORM, Run as RunORM, get_session
+from ..core.orm import Thread as ThreadORM, Run as RunORM, get_read_session, get_session
 from ..core.database import db_manager
-from ..services.streaming_service import streaming_service
 from ..services.thread_state_service import ThreadStateService
-from ..api.runs import active_runs
+from ..api.runs import stop_run
 
 # TODO: adopt structured logging across all modules; replace print() and bare exceptions in:
 # - agent_server/api/*.py
@@ -112,7 +110,7 @@ async def create_thread(
 @router.get("/threads", response_model=ThreadList)
 async def list_threads(
     user: User = Depends(get_current_user),
-    session: AsyncSession = Depends(get_session)
+    session: AsyncSession = Depends(get_read_session("threads.list"))
 ):
     """List user's threads"""
     stmt = select(ThreadORM).where(ThreadORM.user_id == user.identity)
@@ -132,7 +130,7 @@ async def list_threads(
 async def get_thread(
     thread_id: str,
     user: User = Depends(get_current_user),
-    session: AsyncSession = Depends(get_session)
+    session: AsyncSession = Depends(get_read_session("threads.get"))
 ):
     """Get thread by ID"""
     stmt = select(ThreadORM).where(ThreadORM.thread_id == thread_id, ThreadORM.user_id == user.identity)
@@ -150,7 +148,7 @@ async def get_thread_history_post(
     thread_id: str,
     request: ThreadHistoryRequest,
     user: User = Depends(get_current_user),
-    session: AsyncSession = Depends(get_session)
+    session: AsyncSession = Depends(get_read_session("threads.history"))
 ):
     """Get thread checkpoint history (POST method - for SDK compatibility)"""
 
@@ -200,7 +198,10 @@ async def get_thread_history_post(
         from ..services.langgraph_service import get_langgraph_service, create_thread_config
         langgraph_service = get_langgraph_service()
         try:
-            agent = await langgraph_service.get_graph(graph_id)
+            if session.info.get("replica"):
+                agent = await langgraph_service.get_replica_graph(graph_id)
+            else:
+                agent = await langgraph_service.get_graph(graph_id)
         except Exception as e:
             logger.exception("Failed to load graph '%s' for history", graph_id)
             raise HTTPException(500, f"Failed to load graph '{graph_id}': {str(e)}")
@@ -264,7 +265,7 @@ async def get_thread_history_get(
     # Optional metadata filter for parity with POST (use JSON string to avoid FastAPI typing assertion on dict in query)
     metadata: Optional[str] = Query(None, description="JSON-encoded metadata filter"),
     user: User = Depends(get_current_user),
-    session: AsyncSession = Depends(get_session),
+    session: AsyncSession = Depends(get_read_session("threads.history")),
 ):
     """Get thread checkpoint history (GET method - SDK compatibility)"""
     # Reuse POST logic by constructing a ThreadHistoryRequest-like object
@@ -324,20 +325,8 @@ async def delete_thread(
             run_id = run.run_id
             logger.debug(f"Cancelling run {run_id}")
             
-            # Cancel via streaming service
-            await streaming_service.cancel_run(run_id)
-            
-            # Clean up background task if exists
-            task = active_runs.pop(run_id, None)
-            if task and not task.done():
-                task.cancel()
-                # Best-effort: wait for task to settle
-                try:
-                    await task
-                except asyncio.CancelledError:
-                    pass
-                except Exception as e:
-                    logger.warning(f"Error waiting for task {run_id} to settle: {e}")
+            # Stops it wherever it executes, waiting until it let go
+            await stop_run(session, run_id)
 
     # Delete thread (CASCADE DELETE will automatically remove all runs)
     await session.delete(thread)
@@ -351,7 +340,7 @@ async def delete_thread(
 async def search_threads(
     request: ThreadSearchRequest,
     user: User = Depends(get_current_user),
-    session: AsyncSession = Depends(get_session)
+    session: AsyncSession = Depends(get_read_session("threads.search"))
 ):
     """Search threads with filters"""
     
@@ -129,6 +129,25 @@ async def readiness_check():
     return {"status": "ready"}
 
 
+@router.get("/metrics")
+async def metrics():
+    """Runtime metrics for streaming internals"""
+    from ..services.broker import broker_manager
+    from ..services.event_cache import event_cache
+    from ..services.run_admission import run_admission
+    from ..services.run_completion import run_completion
+    from .database import db_manager
+    from .read_routing import read_router
+
+    return {
+        "broker": broker_manager.get_metrics(),
+        "event_cache": event_cache.get_metrics(),
+        "runs": run_admission.get_metrics(),
+        "run_completion": run_completion.get_metrics(),
+        "database": {**read_router.get_metrics(), "pools": db_manager.get_pool_stats()},
+    }
+
+
 @router.get("/live")
 async def liveness_check():
     """Kubernetes liveness probe endpoint"""
@@ -14,8 +14,9 @@ from __future__ import annotations
 
 import uuid
 from datetime import datetime
-from typing import AsyncIterator
+from typing import AsyncIterator, Callable
 
+from fastapi import Depends, Request
 from sqlalchemy import (
     JSON,
     TIMESTAMP,
@@ -27,6 +28,7 @@ from sqlalchemy import (
     text,
     Index,
     Integer,
+    LargeBinary,
 )
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
@@ -121,6 +123,11 @@ class Run(Base):
     context: Mapped[dict | None] = mapped_column(JSONB, nullable=True)
     output: Mapped[dict | None] = mapped_column(JSONB)
     error_message: Mapped[str | None] = mapped_column(Text)
+    # Execution arguments of a run queued for worker processes (RUN_EXECUTION_MODE=queue)
+    kwargs: Mapped[dict | None] = mapped_column(JSONB, nullable=True)
+    # Worker executing a queued run, and until when it is known to be alive
+    claimed_by: Mapped[str | None] = mapped_column(Text, nullable=True)
+    lease_expires_at: Mapped[datetime | None] = mapped_column(TIMESTAMP(timezone=True), nullable=True)
     user_id: Mapped[str] = mapped_column(Text, nullable=False)
     created_at: Mapped[datetime] = mapped_column(
         TIMESTAMP(timezone=True), server_default=text("now()")
@@ -136,25 +143,41 @@ class Run(Base):
         Index('idx_runs_status', 'status'),
         Index('idx_runs_assistant_id', 'assistant_id'),
         Index('idx_runs_created_at', 'created_at'),
+        Index(
+            'idx_runs_queue', 'created_at',
+            postgresql_where=text("status IN ('pending', 'streaming') AND kwargs IS NOT NULL"),
+        ),
+        Index(
+            'idx_runs_lease', 'lease_expires_at',
+            postgresql_where=text("status = 'running' AND kwargs IS NOT NULL"),
+        ),
     )
 
 
 class RunEvent(Base):
     __tablename__ = "run_events"
 
+    # Range-partitioned by created_at (hourly), so the partition key is part
+    # of the primary key; partitions are managed by the event store
     id: Mapped[str] = mapped_column(Text, primary_key=True)
     run_id: Mapped[str] = mapped_column(Text, nullable=False)
     seq: Mapped[int] = mapped_column(Integer, nullable=False)
     event: Mapped[str] = mapped_column(Text, nullable=False)
     data: Mapped[dict | None] = mapped_column(JSONB, nullable=True)
+    # zstd-compressed JSON, used instead of data when compression is enabled
+    data_compressed: Mapped[bytes | None] = mapped_column(LargeBinary, nullable=True)
+    # SSE frame sent on replay as is, stored when EVENT_STORE_FRAMES is enabled
+    frame: Mapped[bytes | None] = mapped_column(LargeBinary, nullable=True)
     created_at: Mapped[datetime] = mapped_column(
-        TIMESTAMP(timezone=True), server_default=text("now()")
+        TIMESTAMP(timezone=True), primary_key=True, server_default=text("now()")
     )
 
     # Indexes for performance
     __table_args__ = (
         Index('idx_run_events_run_id', 'run_id'),
         Index('idx_run_events_seq', 'run_id', 'seq'),
+        Index('idx_run_events_created_at', 'created_at'),
+        {"postgresql_partition_by": "RANGE (created_at)"},
     )
 
 
@@ -180,3 +203,41 @@ async def get_session() -> AsyncIterator[AsyncSession]:
     maker = _get_session_maker()
     async with maker() as session:
         yield session
+
+
+replica_session_maker: async_sessionmaker[AsyncSession] | None = None
+
+
+def _get_replica_session_maker() -> async_sessionmaker[AsyncSession]:
+    """Return a cached async_sessionmaker bound to the read replica (or primary)."""
+    global replica_session_maker
+    if replica_session_maker is None:
+        from .database import db_manager
+        replica_session_maker = async_sessionmaker(db_manager.get_read_engine(), expire_on_commit=False)
+    return replica_session_maker
+
+
+def get_read_session(route: str) -> Callable[..., AsyncIterator[AsyncSession]]:
+    """FastAPI dependency factory for read-only endpoints.
+
+    Yields a session on the read replica when the routing policy allows it
+    for ``route`` and the user has not just written (through this process,
+    or another one per the write cookie), otherwise the regular session.
+    ``session.info["replica"]`` is set on replica sessions.
+    """
+    from .read_routing import WRITE_COOKIE, read_router
+
+    async def dependency(request: Request, session: AsyncSession = Depends(get_session)) -> AsyncIterator[AsyncSession]:
+        # A read, even when sent as POST (search, history)
+        request.state.read_only = True
+        user = request.scope.get("user")
+        user_id = user.identity if user is not None and getattr(user, "is_authenticated", False) else None
+        if not read_router.use_replica(route, user_id, request.cookies.get(WRITE_COOKIE)):
+            # Sessions connect lazily, so the unused one costs nothing otherwise
+            yield session
+            return
+        async with _get_replica_session_maker()() as replica:
+            replica.info["replica"] = True
+            yield replica
+
+    return dependency
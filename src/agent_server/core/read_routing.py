@@ -0,0 +1,107 @@
+"""Routing of read-only endpoints to the read replica.
+
+With ``DATABASE_REPLICA_URL`` set, the endpoints named in
+``DATABASE_REPLICA_ROUTES`` read from the replica (metadata tables and
+checkpoints). To keep read-your-writes semantics, a user who made a write
+request reads from the primary for ``DATABASE_REPLICA_STICKY_SECONDS``
+afterwards, which should exceed the replica's usual lag.
+
+A write is remembered by the process that served it and, for reads that land
+on another process, by a cookie holding its wall-clock time which the client
+sends back. Clients that drop cookies only get the per-process guarantee.
+"""
+import math
+import os
+import time
+from typing import Dict, Optional
+
+from .database import db_manager
+
+# Endpoints that may read from the replica
+REPLICA_ROUTES = ("threads.list", "threads.get", "threads.search", "threads.history", "runs.list")
+DATABASE_REPLICA_ROUTES = frozenset(
+    route.strip()
+    for route in os.getenv("DATABASE_REPLICA_ROUTES", ",".join(REPLICA_ROUTES)).split(",")
+    if route.strip()
+)
+# Seconds after a write during which the writer reads from the primary
+DATABASE_REPLICA_STICKY_SECONDS = float(os.getenv("DATABASE_REPLICA_STICKY_SECONDS", "5"))
+
+# Cookie carrying the time of the client's last write to the other processes
+WRITE_COOKIE = "aegra_wrote_at"
+
+# Prune expired write markers once this many users are tracked
+PRUNE_THRESHOLD = 10_000
+
+
+class ReadRouter:
+    """Decides per request whether a read may be served by the replica"""
+
+    def __init__(
+        self,
+        routes: frozenset = DATABASE_REPLICA_ROUTES,
+        sticky_seconds: float = DATABASE_REPLICA_STICKY_SECONDS,
+    ):
+        self.routes = routes
+        self.sticky_seconds = sticky_seconds
+        self._last_write: Dict[str, float] = {}
+        self.replica_reads = 0
+        self.primary_reads = 0
+
+    def note_write(self, user_id: str) -> None:
+        now = time.monotonic()
+        self._last_write[user_id] = now
+        if len(self._last_write) > PRUNE_THRESHOLD:
+            cutoff = now - self.sticky_seconds
+            self._last_write = {u: t for u, t in self._last_write.items() if t > cutoff}
+
+    def write_cookie(self) -> str:
+        """Set-Cookie value marking a write made now, for reads on any process"""
+        return (
+            f"{WRITE_COOKIE}={time.time():.3f}; Max-Age={math.ceil(self.sticky_seconds)}; "
+            "Path=/; HttpOnly; SameSite=Lax"
+        )
+
+    def use_replica(self, route: str, user_id: Optional[str], wrote_at: Optional[str] = None) -> bool:
+        """Whether this read goes to the replica; counts the decision.
+
+        ``wrote_at`` is the client's ``WRITE_COOKIE`` value, if it sent one.
+        """
+        use = (
+            db_manager.has_replica()
+            and route in self.routes
+            and not self._wrote_recently(user_id)
+            and not self._cookie_recent(wrote_at)
+        )
+        if use:
+            self.replica_reads += 1
+        else:
+            self.primary_reads += 1
+        return use
+
+    def get_metrics(self) -> Dict[str, object]:
+        return {
+            "replica": db_manager.has_replica(),
+            "replica_reads": self.replica_reads,
+            "primary_reads": self.primary_reads,
+        }
+
+    def _wrote_recently(self, user_id: Optional[str]) -> bool:
+        if user_id is None:
+            return False
+        last = self._last_write.get(user_id)
+        return last is not None and time.monotonic() - last < self.sticky_seconds
+
+    def _cookie_recent(self, wrote_at: Optional[str]) -> bool:
+        if not wrote_at:
+            return False
+        try:
+            age = time.time() - float(wrote_at)
+        except ValueError:
+            return False
+        # Other hosts' clocks may run slightly ahead of ours
+        return abs(age) < self.sticky_seconds
+
+
+# Global read routing policy
+read_router = ReadRouter()
@@ -1,12 +1,26 @@
 """General-purpose object serialization based on LangGraph's approach"""
 
-from typing import Any
+import dataclasses
+import json
+import math
+from datetime import date, datetime, time
+from enum import Enum
+from typing import Any, Callable, Dict
+from uuid import UUID
+
+import orjson
+
 from .base import Serializer, SerializationError
 
 
 class GeneralSerializer(Serializer):
     """Simple object serializer using LangGraph's proven approach"""
     
+    # Handler resolved per class, shared by all instances; bounded in case
+    # classes are created dynamically
+    _handlers: Dict[type, Callable[["GeneralSerializer", Any], Any]] = {}
+    _MAX_CACHED_TYPES = 1024
+    
     def serialize(self, obj: Any) -> Any:
         """Serialize any object to JSON-compatible format using LangGraph's logic"""
         try:
@@ -18,43 +32,122 @@ class GeneralSerializer(Serializer):
                 e
             )
     
+    def dumps(self, obj: Any) -> str:
+        """Serialize to a compact JSON string.
+
+        orjson encodes dataclasses, datetimes, UUIDs and enums natively and
+        only calls back into :meth:`serialize` for other types
+        (pydantic/LangChain objects, Interrupts, ...). Values it rejects, such
+        as integers beyond 64 bits, are written by the stdlib encoder in the
+        same format.
+        """
+        try:
+            return orjson.dumps(obj, default=self.serialize, option=orjson.OPT_NON_STR_KEYS).decode()
+        except orjson.JSONEncodeError:
+            return json.dumps(self._orjson_compatible(obj), ensure_ascii=False, separators=(",", ":"))
+
+    def _orjson_compatible(self, obj: Any) -> Any:
+        """Convert obj to plain JSON types the way orjson would encode it"""
+        if isinstance(obj, str) or obj is None or isinstance(obj, (bool, int)):
+            return obj
+        if isinstance(obj, float):
+            return obj if math.isfinite(obj) else None
+        if isinstance(obj, dict):
+            return {self._orjson_key(k): self._orjson_compatible(v) for k, v in obj.items()}
+        if isinstance(obj, (list, tuple)):
+            return [self._orjson_compatible(item) for item in obj]
+        if isinstance(obj, (datetime, date, time)):
+            return obj.isoformat()
+        if isinstance(obj, UUID):
+            return str(obj)
+        if isinstance(obj, Enum):
+            return self._orjson_compatible(obj.value)
+        if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+            return {f.name: self._orjson_compatible(getattr(obj, f.name)) for f in dataclasses.fields(obj)}
+        return self._orjson_compatible(self.serialize(obj))
+
+    def _orjson_key(self, key: Any) -> str:
+        """A dict key as OPT_NON_STR_KEYS writes it"""
+        if isinstance(key, str):
+            return key
+        if isinstance(key, (bool, int, float)) or key is None:
+            return json.dumps(key)
+        value = self._orjson_compatible(key)
+        return value if isinstance(value, str) else json.dumps(value)
+    
     def _serialize_object(self, obj: Any) -> Any:
         """Core serialization logic based on LangGraph SDK's _orjson_default"""
+        handler = self._handlers.get(obj.__class__)
+        if handler is None:
+            handler = self._resolve_handler(obj)
+            if len(self._handlers) < self._MAX_CACHED_TYPES:
+                self._handlers[obj.__class__] = handler
+        return handler(self, obj)
+    
+    def _resolve_handler(self, obj: Any) -> Callable[["GeneralSerializer", Any], Any]:
+        """Pick the handler for obj's class; the checks run once per class"""
         # Handle Pydantic v2 models (model_dump method)
         if hasattr(obj, "model_dump") and callable(obj.model_dump):
-            return obj.model_dump()
+            return GeneralSerializer._serialize_model_dump
         
         # Handle LangChain objects and Pydantic v1 models (dict method)
         elif hasattr(obj, "dict") and callable(obj.dict):
-            return obj.dict()
+            return GeneralSerializer._serialize_dict_method
         
         # Handle LangGraph Interrupt objects (they don't have .dict() method)
         elif obj.__class__.__name__ == 'Interrupt' and hasattr(obj, 'value') and hasattr(obj, 'id'):
-            return {
-                'value': self._serialize_object(obj.value),
-                'id': obj.id
-            }
+            return GeneralSerializer._serialize_interrupt
         
         # Handle NamedTuples (like PregelTask) - they have _asdict() method
         elif hasattr(obj, '_asdict') and callable(obj._asdict):
-            return {k: self._serialize_object(v) for k, v in obj._asdict().items()}
+            return GeneralSerializer._serialize_namedtuple
         
         # Handle sets and frozensets
         elif isinstance(obj, (set, frozenset)):
-            return list(obj)
+            return GeneralSerializer._serialize_set
         
         # Handle tuples and lists recursively
         elif isinstance(obj, (tuple, list)):
-            return [self._serialize_object(item) for item in obj]
+            return GeneralSerializer._serialize_sequence
         
         # Handle dictionaries recursively
         elif isinstance(obj, dict):
-            return {k: self._serialize_object(v) for k, v in obj.items()}
+            return GeneralSerializer._serialize_mapping
         
         # Handle basic JSON-serializable types
         elif isinstance(obj, (str, int, float, bool, type(None))):
-            return obj
+            return GeneralSerializer._serialize_basic
         
         # Fallback to string representation for unknown types
         else:
-            return str(obj)
+            return GeneralSerializer._serialize_str
+    
+    def _serialize_model_dump(self, obj: Any) -> Any:
+        return obj.model_dump()
+    
+    def _serialize_dict_method(self, obj: Any) -> Any:
+        return obj.dict()
+    
+    def _serialize_interrupt(self, obj: Any) -> Any:
+        return {
+            'value': self._serialize_object(obj.value),
+            'id': obj.id
+        }
+    
+    def _serialize_namedtuple(self, obj: Any) -> Any:
+        return {k: self._serialize_object(v) for k, v in obj._asdict().items()}
+    
+    def _serialize_set(self, obj: Any) -> Any:
+        return list(obj)
+    
+    def _serialize_sequence(self, obj: Any) -> Any:
+        return [self._serialize_object(item) for item in obj]
+    
+    def _serialize_mapping(self, obj: Any) -> Any:
+        return {k: self._serialize_object(v) for k, v in obj.items()}
+    
+    def _serialize_basic(self, obj: Any) -> Any:
+        return obj
+    
+    def _serialize_str(self, obj: Any) -> Any:
+        return str(obj)
@@ -17,7 +17,7 @@ class LangGraphSerializer(Serializer):
     
     def serialize(self, obj: Any) -> Any:
         """Main serialization entry point"""
-        return json.loads(json.dumps(obj, default=self.general_serializer.serialize))
+        return json.loads(self.general_serializer.dumps(obj))
     
     def serialize_task(self, task: Any) -> Dict[str, Any]:
         """Serialize a LangGraph task to ThreadTask format"""
@@ -22,6 +22,28 @@ def get_sse_headers() -> Dict[str, str]:
     }
 
 
+def encode_json(data: Any, serializer: Optional[Callable[[Any], Any]] = None) -> str:
+    """Serialize data to compact JSON, handling complex objects with our serializer"""
+    if serializer is None:
+        return _serializer.dumps(data)
+    return json.dumps(data, default=serializer, separators=(',', ':'))
+
+
+def format_sse_frame(event: str, data_str: str, event_id: Optional[str] = None) -> str:
+    """Build an SSE frame around an already JSON-encoded payload"""
+    lines = []
+    
+    lines.append(f"event: {event}")
+    lines.append(f"data: {data_str}")
+    
+    if event_id:
+        lines.append(f"id: {event_id}")
+    
+    lines.append("")  # Empty line to end the event
+    
+    return "\n".join(lines) + "\n"
+
+
 def format_sse_message(
     event: str, 
     data: Any, 
@@ -36,26 +58,9 @@ def format_sse_message(
         event_id: Optional event ID
         serializer: Optional custom serializer function
     """
-    lines = []
-    
-    lines.append(f"event: {event}")
-    
     # Convert data to JSON string
-    if data is None:
-        data_str = ""
-    else:
-        # Use our general serializer by default to handle complex objects
-        default_serializer = serializer or _serializer.serialize
-        data_str = json.dumps(data, default=default_serializer, separators=(',', ':'))
-    
-    lines.append(f"data: {data_str}")
-    
-    if event_id:
-        lines.append(f"id: {event_id}")
-    
-    lines.append("")  # Empty line to end the event
-    
-    return "\n".join(lines) + "\n"
+    data_str = "" if data is None else encode_json(data, serializer)
+    return format_sse_frame(event, data_str, event_id)
 
 
 def create_metadata_event(run_id: str, event_id: Optional[str] = None, attempt: int = 1) -> str:
@@ -175,6 +180,19 @@ def create_messages_event(messages_data: Any, event_type: str = "messages", even
         return format_sse_message(event_type, messages_data, event_id)
 
 
+@dataclass(frozen=True)
+class EncodedEvent:
+    """A stream event serialized exactly once.
+
+    ``frame`` is the SSE wire frame sent to live consumers; ``stored_data`` is
+    the JSON document persisted for replay (``None`` if the event is not
+    stored). Both embed the same encoded payload.
+    """
+    frame: Optional[str]
+    stored_event: Optional[str] = None
+    stored_data: Optional[str] = None
+
+
 # Legacy compatibility functions (deprecated)
 @dataclass
 class SSEEvent:
@@ -183,6 +201,8 @@ class SSEEvent:
     event: str
     data: Dict[str, Any]
     timestamp: datetime = None
+    # Stored wire frame, replayed instead of formatting data again
+    frame: Optional[str] = None
 
     def __post_init__(self):
         if self.timestamp is None:
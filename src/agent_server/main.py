@@ -30,7 +30,7 @@ from .api.runs import router as runs_router
 from .api.store import router as store_router
 from .models.errors import AgentProtocolError, get_error_type
 from .core.auth_middleware import get_auth_backend, on_auth_error
-from .middleware import DoubleEncodedJSONMiddleware
+from .middleware import DoubleEncodedJSONMiddleware, ReadYourWritesMiddleware
 
 # Task management for run cancellation
 active_runs: Dict[str, asyncio.Task] = {}
@@ -53,6 +53,21 @@ async def lifespan(app: FastAPI):
     from .services.event_store import event_store
     await event_store.start_cleanup_task()
     
+    # Start broker background work (cleanup, cross-worker relay)
+    from .services.broker import broker_manager
+    await broker_manager.start()
+    
+    # Wake /join waiters when runs end, in this or any other process
+    from .services.run_completion import run_completion
+    await run_completion.start()
+    
+    # Stop runs executing here that another process stopped without reaching us
+    from .api.runs import watch_stopped_runs
+    stopped_runs_task = asyncio.create_task(watch_stopped_runs())
+    
+    from .services.run_queue import check_queue_config
+    check_queue_config()
+    
     yield
     
     # Shutdown: Clean up connections and cancel active runs
@@ -60,8 +75,12 @@ async def lifespan(app: FastAPI):
         if not task.done():
             task.cancel()
     
-    # Stop event store cleanup task
+    # Stop broker and event store background tasks
+    stopped_runs_task.cancel()
+    await broker_manager.stop()
+    await run_completion.stop()
     await event_store.stop_cleanup_task()
+    await event_store.stop_writer()
     
     await db_manager.close()
 
@@ -85,6 +104,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Record writers so their next reads skip the read replica (runs inside auth)
+app.add_middleware(ReadYourWritesMiddleware)
+
 # Add middleware to handle double-encoded JSON from frontend
 app.add_middleware(DoubleEncodedJSONMiddleware)
 
@@ -113,7 +135,8 @@ async def agent_protocol_exception_handler(request: Request, exc: HTTPException)
             error=get_error_type(exc.status_code),
             message=exc.detail,
             details=getattr(exc, 'details', None)
-        ).model_dump()
+        ).model_dump(),
+        headers=exc.headers,
     )
 
 
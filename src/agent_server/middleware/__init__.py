@@ -1,3 +1,4 @@
 from .double_encoded_json import DoubleEncodedJSONMiddleware
+from .read_your_writes import ReadYourWritesMiddleware
 
-__all__ = ["DoubleEncodedJSONMiddleware"]
+__all__ = ["DoubleEncodedJSONMiddleware", "ReadYourWritesMiddleware"]
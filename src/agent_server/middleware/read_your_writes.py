@@ -0,0 +1,43 @@
+import logging
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Send, Scope
+
+from ..core.database import db_manager
+from ..core.read_routing import read_router
+
+logger = logging.getLogger(__name__)
+
+WRITE_METHODS = ("POST", "PUT", "PATCH", "DELETE")
+
+
+class ReadYourWritesMiddleware:
+    """Middleware to record which users just wrote, for read replica routing.
+
+    Every POST/PUT/PATCH/DELETE counts as a write unless its endpoint took a
+    read session (e.g. ``POST /threads/search``). The write is recorded once
+    the response starts, when the endpoint has committed, both in this process
+    and in a cookie the client sends to whichever process serves its next
+    read. Must run inside the authentication middleware so ``scope["user"]``
+    is set.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["method"] not in WRITE_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        state = scope.setdefault("state", {})
+
+        async def send_wrapper(message: Message):
+            if message["type"] == "http.response.start" and not state.get("read_only"):
+                user = scope.get("user")
+                if user is not None and getattr(user, "is_authenticated", False):
+                    read_router.note_write(user.identity)
+                    if db_manager.has_replica():
+                        MutableHeaders(scope=message).append("set-cookie", read_router.write_cookie())
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
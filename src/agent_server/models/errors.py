@@ -19,6 +19,7 @@ def get_error_type(status_code: int) -> str:
         404: "not_found",
         409: "conflict",
         422: "validation_error",
+        429: "too_many_requests",
         500: "internal_error",
         501: "not_implemented",
         503: "service_unavailable"
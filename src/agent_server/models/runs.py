@@ -64,6 +64,23 @@ class RunCreate(BaseModel):
         return self
 
 
+class RunBatchCreate(BaseModel):
+    """Request model for executing many single-shot inputs of one assistant"""
+    assistant_id: str = Field(..., description="Assistant to execute")
+    inputs: List[Dict[str, Any]] = Field(..., min_length=1, description="One input per run")
+    config: Optional[Dict[str, Any]] = Field({}, description="LangGraph execution config, shared by all runs")
+    context: Optional[Dict[str, Any]] = Field({}, description="LangGraph execution context, shared by all runs")
+    concurrency: Optional[int] = Field(
+        None,
+        ge=1,
+        description="Runs executed at the same time (capped by the server)",
+    )
+    stateless: bool = Field(
+        False,
+        description="Execute without creating threads, runs or checkpoints; results are only streamed back",
+    )
+
+
 class Run(BaseModel):
     """Run entity model"""
     run_id: str
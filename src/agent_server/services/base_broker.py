@@ -3,6 +3,23 @@ from abc import ABC, abstractmethod
 from typing import Any, AsyncIterator, Tuple
 
 
+class BrokerOverflowError(Exception):
+    """Raised to a subscriber that fell behind a bounded broker buffer"""
+
+    def __init__(self, run_id: str, last_event_id: str | None):
+        super().__init__(f"Subscriber of run {run_id} fell behind after event {last_event_id}")
+        self.run_id = run_id
+        self.last_event_id = last_event_id
+
+
+class BrokerResyncRequired(BrokerOverflowError):
+    """Unread events were dropped; the subscriber must replay them from the event store"""
+
+
+class SlowConsumerDisconnected(BrokerOverflowError):
+    """The subscriber was disconnected for being too slow"""
+
+
 class BaseRunBroker(ABC):
     """Abstract base class for a run-specific event broker"""
 
@@ -12,8 +29,23 @@ class BaseRunBroker(ABC):
         pass
 
     @abstractmethod
-    async def aiter(self) -> AsyncIterator[Tuple[str, Any]]:
-        """Async iterator yielding (event_id, payload) pairs"""
+    def subscribe(self, after_sequence: int | None = None) -> int:
+        """Register a subscriber now; events are retained for it from this point"""
+        pass
+
+    @abstractmethod
+    def unsubscribe(self, subscriber_id: int) -> None:
+        """Release a subscriber that will not be iterated (idempotent)"""
+        pass
+
+    @abstractmethod
+    async def aiter(self, subscriber_id: int | None = None) -> AsyncIterator[Tuple[str, Any]]:
+        """Async iterator yielding (event_id, payload) pairs.
+
+        Every subscriber (from ``subscribe``, or registered by the call) is
+        independent and sees the full event sequence; concurrent subscribers
+        must not steal events from each other.
+        """
         # Abstract async generator method; must be implemented by subclass
         raise NotImplementedError("aiter method must be implemented by subclass")
 
@@ -54,4 +86,12 @@ class BaseBrokerManager(ABC):
     @abstractmethod
     async def stop_cleanup_task(self) -> None:
         """Stop background cleanup task"""
-        pass 
\ No newline at end of file
+        pass
+
+    async def start(self) -> None:
+        """Start background work owned by the manager"""
+        await self.start_cleanup_task()
+
+    async def stop(self) -> None:
+        """Stop background work owned by the manager"""
+        await self.stop_cleanup_task()
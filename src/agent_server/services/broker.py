@@ -1,54 +1,248 @@
-"""Event broker for managing run-specific event queues"""
+"""Event broker for fanning out run-specific events to live subscribers"""
 import asyncio
+import os
+from collections import Counter, deque
 from typing import Any, AsyncIterator, Tuple
 import logging
 
-from .base_broker import BaseRunBroker, BaseBrokerManager
+from .base_broker import (
+    BaseRunBroker,
+    BaseBrokerManager,
+    BrokerResyncRequired,
+    SlowConsumerDisconnected,
+)
+from ..utils import extract_event_sequence
 logger = logging.getLogger(__name__)
 
+# Number of already-delivered events each broker keeps for late subscribers
+BROKER_REPLAY_WINDOW = int(os.getenv("BROKER_REPLAY_WINDOW", "256"))
+# Maximum number of events buffered per run before the overflow policy applies
+BROKER_MAX_BUFFER = int(os.getenv("BROKER_MAX_BUFFER", "2048"))
+# What to do when a subscriber lags by BROKER_MAX_BUFFER events:
+#   block      - producer waits for the slowest subscriber (up to BROKER_BLOCK_TIMEOUT)
+#   resync     - drop the oldest events; lagging subscribers resync from the event store
+#   disconnect - drop the oldest events and disconnect lagging subscribers
+BROKER_OVERFLOW_POLICY = os.getenv("BROKER_OVERFLOW_POLICY", "resync").lower()
+BROKER_BLOCK_TIMEOUT = float(os.getenv("BROKER_BLOCK_TIMEOUT", "30"))
+
+OVERFLOW_POLICIES = ("block", "resync", "disconnect")
+
+# Cursor value marking a subscriber that was disconnected for being too slow
+_EVICTED = -1
+
+
+def _is_end_event(payload: Any) -> bool:
+    """Check whether a broker payload is the terminal ``end`` event"""
+    return isinstance(payload, tuple) and len(payload) >= 1 and payload[0] == "end"
+
 
 class RunBroker(BaseRunBroker):
-    """Manages event queuing and distribution for a specific run"""
+    """Fans out events for a specific run to any number of subscribers.
+
+    Events live once in a shared buffer; every subscriber only keeps a cursor
+    into it, so N viewers of the same run each see the full sequence without
+    N copies of every payload. Entries are trimmed once all subscribers have
+    read them, keeping the last ``replay_window`` entries for late joiners.
+    A subscriber registered with :meth:`subscribe` pins the buffer from the
+    moment it subscribes, even before it starts iterating.
+
+    The buffer never grows past ``max_buffer`` entries; when the slowest
+    subscriber falls that far behind, ``overflow_policy`` decides whether the
+    producer blocks, the subscriber resyncs from the event store, or the
+    subscriber is disconnected.
+    """
     
-    def __init__(self, run_id: str):
+    def __init__(
+        self,
+        run_id: str,
+        replay_window: int | None = None,
+        max_buffer: int | None = None,
+        overflow_policy: str | None = None,
+        metrics: Counter | None = None,
+    ):
         self.run_id = run_id
-        self.queue: asyncio.Queue[Tuple[str, Any]] = asyncio.Queue()
+        self._buffer: deque[Tuple[str, Any]] = deque()
+        # Absolute position of _buffer[0]; cursors are absolute positions too
+        self._offset = 0
+        self._cursors: dict[int, int] = {}
+        # Sequence of the newest event dropped from the buffer so far
+        self._dropped_sequence = -1
+        self._next_subscriber_id = 0
+        self._max_buffer = max(1, BROKER_MAX_BUFFER if max_buffer is None else max_buffer)
+        self._replay_window = min(
+            BROKER_REPLAY_WINDOW if replay_window is None else replay_window,
+            self._max_buffer,
+        )
+        self._overflow_policy = overflow_policy or BROKER_OVERFLOW_POLICY
+        if self._overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown broker overflow policy: {self._overflow_policy}")
+        self.metrics = metrics if metrics is not None else Counter()
+        # Single wakeup signal shared by "new item" and "finished" so that idle
+        # consumers block on one wait and never poll.
+        self._wakeup = asyncio.Event()
+        # Signalled whenever a subscriber advances, for producers under "block"
+        self._space = asyncio.Event()
         self.finished = asyncio.Event()
         self._created_at = asyncio.get_event_loop().time()
     
     async def put(self, event_id: str, payload: Any) -> None:
-        """Put an event into the broker queue"""
+        """Append an event to the shared buffer and wake all subscribers"""
         if self.finished.is_set():
             logger.warning(f"Attempted to put event {event_id} into finished broker for run {self.run_id}")
             return
         
-        await self.queue.put((event_id, payload))
+        if len(self._buffer) >= self._max_buffer:
+            await self._handle_overflow()
+        
+        self._buffer.append((event_id, payload))
+        self._trim()
+        self._notify()
         
         # Check if this is an end event
-        if isinstance(payload, tuple) and len(payload) >= 1 and payload[0] == "end":
+        if _is_end_event(payload):
             self.mark_finished()
     
-    async def aiter(self) -> AsyncIterator[Tuple[str, Any]]:
-        """Async iterator yielding (event_id, payload) pairs"""
-        while True:
-            try:
-                # Use timeout to check if run is finished
-                event_id, payload = await asyncio.wait_for(self.queue.get(), timeout=0.1)
-                yield event_id, payload
-                
-                # Check if this is an end event
-                if isinstance(payload, tuple) and len(payload) >= 1 and payload[0] == "end":
+    def subscribe(self, after_sequence: int | None = None) -> int:
+        """Register a subscriber positioned at the oldest retained event.
+
+        Events are retained for it from now on, so a caller can replay history
+        first and iterate with :meth:`aiter` afterwards without losing the
+        events published meanwhile. When ``after_sequence`` is given and
+        events after it were already dropped, the subscription starts out
+        requiring a resync.
+        """
+        subscriber_id = self._next_subscriber_id
+        self._next_subscriber_id += 1
+        self._cursors[subscriber_id] = self._offset
+        if after_sequence is not None and after_sequence < self._dropped_sequence:
+            # A cursor before the buffer makes aiter raise BrokerResyncRequired
+            self._cursors[subscriber_id] = self._offset - 1
+        return subscriber_id
+    
+    def unsubscribe(self, subscriber_id: int) -> None:
+        """Release a subscriber so it no longer pins the buffer (idempotent)"""
+        if self._cursors.pop(subscriber_id, None) is not None:
+            self._trim()
+            self._space.set()
+    
+    async def aiter(self, subscriber_id: int | None = None) -> AsyncIterator[Tuple[str, Any]]:
+        """Async iterator yielding (event_id, payload) pairs for one subscriber.
+
+        Iterates the subscriber from :meth:`subscribe`, or registers a new one
+        starting at the oldest retained event; callers de-duplicate against
+        replayed history by event sequence. The subscriber is released when
+        the iteration ends.
+
+        Raises:
+            BrokerResyncRequired: events this subscriber had not read yet were
+                dropped; the caller must replay them from the event store.
+            SlowConsumerDisconnected: this subscriber fell too far behind
+                under the ``disconnect`` policy.
+        """
+        if subscriber_id is None:
+            subscriber_id = self.subscribe()
+        last_event_id: str | None = None
+        try:
+            while True:
+                cursor = self._cursors.get(subscriber_id)
+                if cursor is None:
+                    # Released by unsubscribe()
                     break
+                if cursor == _EVICTED:
+                    raise SlowConsumerDisconnected(self.run_id, last_event_id)
+                if cursor < self._offset:
+                    raise BrokerResyncRequired(self.run_id, last_event_id)
+                if cursor < self._offset + len(self._buffer):
+                    event_id, payload = self._buffer[cursor - self._offset]
+                    self._cursors[subscriber_id] = cursor + 1
+                    self._trim()
+                    self._space.set()
+                    last_event_id = event_id
+                    yield event_id, payload
                     
-            except asyncio.TimeoutError:
-                # Check if run is finished and queue is empty
-                if self.finished.is_set() and self.queue.empty():
+                    if _is_end_event(payload):
+                        break
+                    continue
+                
+                if self.finished.is_set():
                     break
-                continue
+                
+                # Wait until either a new item arrives or the broker is finished
+                await self._wakeup.wait()
+        finally:
+            self.unsubscribe(subscriber_id)
+    
+    def _active_cursors(self) -> list[int]:
+        return [cursor for cursor in self._cursors.values() if cursor != _EVICTED]
+    
+    def _trim(self) -> None:
+        """Drop entries every subscriber has read, beyond the replay window"""
+        droppable = len(self._buffer) - self._replay_window
+        cursors = self._active_cursors()
+        if cursors:
+            droppable = min(droppable, min(cursors) - self._offset)
+        self._drop_oldest(droppable)
+    
+    def _drop_oldest(self, count: int) -> None:
+        for _ in range(max(min(count, len(self._buffer)), 0)):
+            event_id, _payload = self._buffer.popleft()
+            self._offset += 1
+            self._dropped_sequence = extract_event_sequence(event_id)
+    
+    def _slow_subscribers(self) -> list[int]:
+        """Subscribers that have not yet read the oldest buffered event"""
+        return [sid for sid, cursor in self._cursors.items() if cursor == self._offset]
+    
+    async def _handle_overflow(self) -> None:
+        """Make room for one more event according to the overflow policy"""
+        policy = self._overflow_policy
+        if policy == "block" and self._slow_subscribers():
+            self.metrics["block"] += 1
+            if not await self._wait_for_space():
+                logger.warning(
+                    f"Broker for run {self.run_id} blocked for {BROKER_BLOCK_TIMEOUT}s; "
+                    "disconnecting slow subscribers"
+                )
+                policy = "disconnect"
+        
+        excess = len(self._buffer) - self._max_buffer + 1
+        if excess <= 0:
+            return
+        
+        slow = self._slow_subscribers()
+        if slow and policy == "disconnect":
+            for sid in slow:
+                self._cursors[sid] = _EVICTED
+            self.metrics["disconnect"] += len(slow)
+        elif slow:
+            self.metrics["resync"] += len(slow)
+        self._drop_oldest(excess)
+        self._notify()
+    
+    async def _wait_for_space(self) -> bool:
+        """Wait for slow subscribers to free buffer space; False on timeout"""
+        loop = asyncio.get_event_loop()
+        deadline = loop.time() + BROKER_BLOCK_TIMEOUT
+        while len(self._buffer) >= self._max_buffer and self._slow_subscribers():
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return False
+            self._space.clear()
+            try:
+                await asyncio.wait_for(self._space.wait(), timeout=remaining)
+            except asyncio.TimeoutError:
+                pass
+        return True
+    
+    def _notify(self) -> None:
+        """Wake up all consumers currently waiting on this broker"""
+        wakeup, self._wakeup = self._wakeup, asyncio.Event()
+        wakeup.set()
     
     def mark_finished(self) -> None:
         """Mark this broker as finished"""
         self.finished.set()
+        self._notify()
         logger.debug(f"Broker for run {self.run_id} marked as finished")
     
     def is_finished(self) -> bool:
@@ -56,8 +250,17 @@ class RunBroker(BaseRunBroker):
         return self.finished.is_set()
     
     def is_empty(self) -> bool:
-        """Check if the queue is empty"""
-        return self.queue.empty()
+        """Check if every subscriber has consumed all buffered events"""
+        end = self._offset + len(self._buffer)
+        return all(cursor >= end for cursor in self._active_cursors())
+    
+    def subscriber_count(self) -> int:
+        """Number of subscribers currently attached to this broker"""
+        return len(self._cursors)
+    
+    def buffered_count(self) -> int:
+        """Number of events currently held in the shared buffer"""
+        return len(self._buffer)
     
     def get_age(self) -> float:
         """Get the age of this broker in seconds"""
@@ -70,11 +273,13 @@ class BrokerManager(BaseBrokerManager):
     def __init__(self):
         self._brokers: dict[str, RunBroker] = {}
         self._cleanup_task: asyncio.Task | None = None
+        # Overflow policy trigger counts shared by all brokers of this manager
+        self._overflow_counts: Counter = Counter()
     
     def get_or_create_broker(self, run_id: str) -> RunBroker:
         """Get or create a broker for a run"""
         if run_id not in self._brokers:
-            self._brokers[run_id] = RunBroker(run_id)
+            self._brokers[run_id] = RunBroker(run_id, metrics=self._overflow_counts)
             logger.debug(f"Created new broker for run {run_id}")
         return self._brokers[run_id]
     
@@ -96,6 +301,17 @@ class BrokerManager(BaseBrokerManager):
             del self._brokers[run_id]
             logger.debug(f"Removed broker for run {run_id}")
     
+    def get_metrics(self) -> dict[str, Any]:
+        """Snapshot of broker buffer usage and overflow policy triggers"""
+        return {
+            "active_brokers": len(self._brokers),
+            "subscribers": sum(b.subscriber_count() for b in self._brokers.values()),
+            "buffered_events": sum(b.buffered_count() for b in self._brokers.values()),
+            "max_buffer": BROKER_MAX_BUFFER,
+            "overflow_policy": BROKER_OVERFLOW_POLICY,
+            "overflow": {policy: self._overflow_counts[policy] for policy in OVERFLOW_POLICIES},
+        }
+    
     async def start_cleanup_task(self) -> None:
         """Start background cleanup task for old brokers"""
         if self._cleanup_task is None or self._cleanup_task.done():
@@ -134,5 +350,16 @@ class BrokerManager(BaseBrokerManager):
                 logger.error(f"Error in broker cleanup task: {e}")
 
 
+def create_broker_manager() -> BrokerManager:
+    """Build the broker manager selected by BROKER_BACKEND (memory or postgres)"""
+    backend = os.getenv("BROKER_BACKEND", "memory").lower()
+    if backend == "postgres":
+        from .pg_broker import PostgresBrokerManager
+        return PostgresBrokerManager()
+    if backend != "memory":
+        logger.warning(f"Unknown BROKER_BACKEND '{backend}', falling back to in-memory broker")
+    return BrokerManager()
+
+
 # Global broker manager instance
-broker_manager = BrokerManager() 
\ No newline at end of file
+broker_manager = create_broker_manager() 
\ No newline at end of file
@@ -0,0 +1,102 @@
+"""In-process hot tier for SSE replay.
+
+Keeps the SSE frames of recently produced run events in memory so that a
+client reconnecting with ``Last-Event-ID`` to a run executing (or just
+finished) on this worker is served without querying Postgres. Runs that
+were evicted, or that executed on another worker, fall back to the event
+store.
+"""
+import logging
+import os
+from collections import OrderedDict, deque
+from typing import Any, Optional
+
+logger = logging.getLogger(__name__)
+
+EVENT_CACHE_MAX_BYTES = int(os.getenv("EVENT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+EVENT_CACHE_MAX_RUN_BYTES = int(os.getenv("EVENT_CACHE_MAX_RUN_BYTES", str(8 * 1024 * 1024)))
+
+
+class _RunFrames:
+    """Recent frames of one run; complete for every sequence after evicted_through"""
+
+    __slots__ = ("frames", "size", "evicted_through")
+
+    def __init__(self, evicted_through: int):
+        self.frames: deque[tuple[int, str]] = deque()
+        self.size = 0
+        self.evicted_through = evicted_through
+
+
+class EventFrameCache:
+    """Bounded LRU of per-run SSE frames, sized by total frame length"""
+
+    def __init__(self, max_bytes: int = EVENT_CACHE_MAX_BYTES, max_run_bytes: int = EVENT_CACHE_MAX_RUN_BYTES):
+        self.max_bytes = max_bytes
+        self.max_run_bytes = max_run_bytes
+        self._runs: OrderedDict[str, _RunFrames] = OrderedDict()
+        self._size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def start_run(self, run_id: str) -> None:
+        """Begin caching a run whose every event will be appended here"""
+        self.discard(run_id)
+        self._runs[run_id] = _RunFrames(evicted_through=-1)
+
+    def append(self, run_id: str, seq: int, frame: Optional[str]) -> None:
+        """Cache the frame of a stored event.
+
+        A frame of None means the event is stored but cannot be served from
+        memory, so the cache stops covering everything up to it.
+        """
+        run = self._runs.get(run_id)
+        if run is None:
+            # Earlier events of this run were never cached (or were evicted)
+            run = self._runs[run_id] = _RunFrames(evicted_through=seq - 1)
+        self._runs.move_to_end(run_id)
+        if frame is None:
+            self._evict_frames(run, through=seq)
+            return
+        run.frames.append((seq, frame))
+        run.size += len(frame)
+        self._size += len(frame)
+        while run.size > self.max_run_bytes and run.frames:
+            self._evict_frames(run, through=run.frames[0][0])
+        while self._size > self.max_bytes and self._runs:
+            self.discard(next(iter(self._runs)))
+
+    def get_since(self, run_id: str, last_seq: int) -> Optional[list[tuple[int, str]]]:
+        """Return (seq, frame) pairs after last_seq, or None if not fully cached"""
+        run = self._runs.get(run_id)
+        if run is None or last_seq < run.evicted_through:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._runs.move_to_end(run_id)
+        return [(seq, frame) for seq, frame in run.frames if seq > last_seq]
+
+    def discard(self, run_id: str) -> None:
+        run = self._runs.pop(run_id, None)
+        if run is not None:
+            self._size -= run.size
+
+    def get_metrics(self) -> dict[str, Any]:
+        return {
+            "runs": len(self._runs),
+            "bytes": self._size,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+    def _evict_frames(self, run: _RunFrames, through: int) -> None:
+        while run.frames and run.frames[0][0] <= through:
+            _, frame = run.frames.popleft()
+            run.size -= len(frame)
+            self._size -= len(frame)
+        run.evicted_through = max(run.evicted_through, through)
+
+
+# Global frame cache instance
+event_cache = EventFrameCache()
@@ -0,0 +1,82 @@
+"""Optional zstd compression of stored event payloads.
+
+With ``EVENT_STORE_COMPRESSION=zstd`` new events are stored as zstd frames
+in ``run_events.data_compressed`` instead of JSONB in ``run_events.data``.
+Reads handle both columns, so the setting can be changed at any time.
+
+A dictionary trained on typical payloads (see
+``scripts/train_event_dictionary.py``) makes small events such as single
+message tokens compress well too. Keep serving with the old dictionary until
+events compressed with it have expired.
+"""
+import json
+import logging
+import os
+from typing import Any, Optional
+
+try:
+    import zstandard
+except ImportError:  # optional, see EventCodec
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+EVENT_STORE_COMPRESSION = os.getenv("EVENT_STORE_COMPRESSION", "none").lower()
+EVENT_STORE_ZSTD_LEVEL = int(os.getenv("EVENT_STORE_ZSTD_LEVEL", "3"))
+EVENT_STORE_ZSTD_DICTIONARY = os.getenv("EVENT_STORE_ZSTD_DICTIONARY")
+
+
+class EventCodec:
+    """Compresses event JSON for storage and restores it on replay"""
+
+    def __init__(
+        self,
+        compression: str = EVENT_STORE_COMPRESSION,
+        level: int = EVENT_STORE_ZSTD_LEVEL,
+        dictionary: Optional[bytes] = None,
+    ):
+        self.enabled = False
+        self._compressor = None
+        self._decompressor = None
+        if compression not in ("none", "zstd"):
+            raise ValueError(f"Unknown event store compression '{compression}', expected 'none' or 'zstd'")
+        if zstandard is None:
+            if compression == "zstd":
+                logger.warning(
+                    "EVENT_STORE_COMPRESSION is 'zstd', but 'zstandard' is not installed. "
+                    "Please run 'pip install zstandard' to enable compression."
+                )
+            return
+
+        dict_data = zstandard.ZstdCompressionDict(dictionary) if dictionary else None
+        # Always able to read compressed rows, even when writing JSONB
+        self._decompressor = zstandard.ZstdDecompressor(dict_data=dict_data)
+        if compression == "zstd":
+            self._compressor = zstandard.ZstdCompressor(level=level, dict_data=dict_data)
+            self.enabled = True
+
+    @classmethod
+    def from_env(cls) -> "EventCodec":
+        dictionary = None
+        if EVENT_STORE_ZSTD_DICTIONARY:
+            with open(EVENT_STORE_ZSTD_DICTIONARY, "rb") as f:
+                dictionary = f.read()
+        return cls(dictionary=dictionary)
+
+    def compress(self, data: str) -> bytes:
+        """Compress an event's JSON text"""
+        return self._compressor.compress(data.encode("utf-8"))
+
+    def decompress(self, blob: bytes) -> Any:
+        """Restore the JSON document of a compressed event"""
+        return json.loads(self.decompress_raw(blob))
+
+    def decompress_raw(self, blob: bytes) -> bytes:
+        """Restore the JSON text (UTF-8) of a compressed event"""
+        if self._decompressor is None:
+            raise RuntimeError("Found a compressed event, but 'zstandard' is not installed")
+        return self._decompressor.decompress(blob)
+
+
+# Global codec used by the event store
+event_codec = EventCodec.from_env()
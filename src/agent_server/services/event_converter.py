@@ -1,12 +1,18 @@
 """Event converter for SSE streaming"""
+import logging
 from typing import Optional, Any
 from ..core.sse import (
+    EncodedEvent, encode_json, format_sse_frame,
     create_metadata_event, create_values_event, create_updates_event,
     create_end_event, create_error_event, create_events_event,
     create_messages_event, create_state_event, create_logs_event,
     create_tasks_event, create_subgraphs_event, create_debug_event,
     create_checkpoints_event, create_custom_event
 )
+from ..utils import extract_event_sequence
+from .values_delta import DELTA_TYPE, ValuesDeltaDecoder, ValuesDeltaEncoder
+
+logger = logging.getLogger(__name__)
 
 
 class EventConverter:
@@ -14,11 +20,88 @@ class EventConverter:
     
     def convert_raw_to_sse(self, event_id: str, raw_event: Any) -> Optional[str]:
         """Convert raw event to SSE format"""
+        if isinstance(raw_event, EncodedEvent):
+            return raw_event.frame
         stream_mode, payload = self._parse_raw_event(raw_event)
         return self._create_sse_event(stream_mode, payload, event_id)
     
-    def convert_stored_to_sse(self, stored_event, run_id: str = None) -> Optional[str]:
-        """Convert stored event to SSE format"""
+    def encode_raw_event(
+        self, event_id: str, raw_event: Any, values_encoder: Optional[ValuesDeltaEncoder] = None
+    ) -> Optional[EncodedEvent]:
+        """Serialize a raw event once into its SSE frame and stored document.
+
+        The payload JSON is spliced into both outputs so token-heavy streams
+        pay for serialization a single time per event. With a values_encoder,
+        root-graph values are stored as deltas against the previous state.
+        """
+        node_path = None
+        if isinstance(raw_event, tuple) and len(raw_event) == 3:
+            node_path = raw_event[0]
+        stream_mode, payload = self._parse_raw_event(raw_event)
+        
+        try:
+            if stream_mode == "messages" and isinstance(payload, tuple) and len(payload) == 2:
+                chunk_str = encode_json(payload[0])
+                metadata_str = encode_json(payload[1])
+                return EncodedEvent(
+                    frame=format_sse_frame("messages", f"[{chunk_str},{metadata_str}]", event_id),
+                    stored_event="messages",
+                    stored_data=(
+                        f'{{"type":"messages_stream","message_chunk":{chunk_str},'
+                        f'"metadata":{metadata_str},"node_path":{encode_json(node_path)}}}'
+                    ),
+                )
+            if (
+                values_encoder is not None
+                and stream_mode == "values"
+                and node_path is None
+                and not (isinstance(payload, dict) and "__interrupt__" in payload)
+            ):
+                payload_str, stored_data = values_encoder.encode(extract_event_sequence(event_id), payload)
+                return EncodedEvent(
+                    frame=format_sse_frame("values", payload_str, event_id),
+                    stored_event="values",
+                    stored_data=stored_data,
+                )
+            if stream_mode in ("values", "updates"):
+                payload_str = encode_json(payload)
+                event = "values"
+                if stream_mode == "updates" and not (isinstance(payload, dict) and "__interrupt__" in payload):
+                    event = "updates"
+                return EncodedEvent(
+                    frame=format_sse_frame(event, "" if payload is None else payload_str, event_id),
+                    stored_event="values",
+                    stored_data=f'{{"type":"execution_values","chunk":{payload_str}}}',
+                )
+        except Exception as e:
+            # Fall through to the generic path, which degrades gracefully
+            logger.warning(f"Could not encode event {event_id} in a single pass: {e}")
+        
+        try:
+            frame = self._create_sse_event(stream_mode, payload, event_id)
+        except Exception as e:
+            # Never fail the run over a payload live consumers cannot receive
+            logger.error(f"Could not encode event {event_id} for streaming: {e}")
+            frame = None
+        stored = self._create_stored_data(stream_mode, payload, node_path)
+        if stored is None:
+            return EncodedEvent(frame=frame) if frame else None
+        stored_event, data = stored
+        try:
+            stored_data = encode_json(data)
+        except Exception:
+            # Fallback to stringifying as a last resort to avoid crashing the run
+            stored_data = encode_json({"raw": str(data)})
+        return EncodedEvent(frame=frame, stored_event=stored_event, stored_data=stored_data)
+    
+    def convert_stored_to_sse(
+        self, stored_event, run_id: str = None, values_decoder: Optional[ValuesDeltaDecoder] = None
+    ) -> Optional[str]:
+        """Convert stored event to SSE format
+
+        Delta-encoded values events are rebuilt with values_decoder, which
+        must have been fed every values event since the last snapshot.
+        """
         event_type = stored_event.event
         data = stored_event.data
         event_id = stored_event.id
@@ -31,7 +114,13 @@ class EventConverter:
             message_data = (message_chunk, metadata) if metadata is not None else message_chunk
             return create_messages_event(message_data, event_id=event_id)
         elif event_type == "values":
-            return create_values_event(data.get("chunk"), event_id)
+            if values_decoder is not None:
+                chunk = values_decoder.feed(extract_event_sequence(event_id), data)
+            elif data.get("type") == DELTA_TYPE:
+                chunk = None
+            else:
+                return create_values_event(data.get("chunk"), event_id)
+            return create_values_event(chunk, event_id) if chunk is not None else None
         elif event_type == "metadata":
             return create_metadata_event(run_id, event_id)
         elif event_type == "state":
@@ -52,6 +141,26 @@ class EventConverter:
             return create_error_event(data.get("error"), event_id)
         return None
     
+    def _create_stored_data(self, stream_mode: str, payload: Any, node_path: Any) -> Optional[tuple[str, dict]]:
+        """Build the (event, data) document persisted for replay, if the mode is stored"""
+        if stream_mode == "messages":
+            return "messages", {
+                "type": "messages_stream",
+                "message_chunk": payload[0] if isinstance(payload, tuple) and len(payload) >= 1 else payload,
+                "metadata": payload[1] if isinstance(payload, tuple) and len(payload) >= 2 else None,
+                "node_path": node_path,
+            }
+        elif stream_mode in ("values", "updates"):
+            return "values", {"type": "execution_values", "chunk": payload}
+        elif stream_mode == "end":
+            return "end", {
+                "type": "run_complete",
+                "status": payload.get("status", "completed"),
+                "final_output": payload.get("final_output"),
+            }
+        # Add other stream modes as needed
+        return None
+    
     def _parse_raw_event(self, raw_event: Any) -> tuple[str, Any]:
         """Parse raw event into (stream_mode, payload)"""
         if isinstance(raw_event, tuple):
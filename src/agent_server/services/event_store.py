@@ -1,26 +1,77 @@
 """Persistent event store for SSE replay functionality (Postgres-backed)."""
 import asyncio
-from typing import Dict, List, Optional
+import logging
+import os
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, NamedTuple, Optional
 from datetime import datetime, timedelta, UTC
 
-from sqlalchemy import text, bindparam
-from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy import text
 
 from ..core.sse import SSEEvent
-from ..core.serializers import GeneralSerializer
-import json
 from ..core.database import db_manager
+from . import event_compression
+from .event_cache import event_cache
+from ..utils import extract_event_sequence
+
+logger = logging.getLogger(__name__)
+
+# Buffered events are written once this many are pending...
+EVENT_STORE_BATCH_SIZE = int(os.getenv("EVENT_STORE_BATCH_SIZE", "100"))
+# ...or this many seconds after the first one was buffered
+EVENT_STORE_FLUSH_INTERVAL = float(os.getenv("EVENT_STORE_FLUSH_INTERVAL", "0.05"))
+# Rows fetched per query when replaying a run's history
+EVENT_STORE_REPLAY_PAGE_SIZE = int(os.getenv("EVENT_STORE_REPLAY_PAGE_SIZE", "500"))
+# Store each event's SSE frame too, so replay sends it without re-encoding
+EVENT_STORE_FRAMES = os.getenv("EVENT_STORE_FRAMES", "false").lower() == "true"
+# Replayed frames are joined into writes of about this many characters
+EVENT_STORE_REPLAY_CHUNK_SIZE = int(os.getenv("EVENT_STORE_REPLAY_CHUNK_SIZE", "65536"))
+# Events are kept at least this long; whole hourly partitions are dropped after
+EVENT_STORE_RETENTION_HOURS = float(os.getenv("EVENT_STORE_RETENTION_HOURS", "1"))
+# Hourly partitions created ahead of time
+EVENT_STORE_PARTITIONS_AHEAD = int(os.getenv("EVENT_STORE_PARTITIONS_AHEAD", "3"))
+
+PARTITION_PREFIX = "run_events_p"
+PARTITION_FORMAT = "%Y%m%d%H"
+
+
+class PendingEvent(NamedTuple):
+    """A buffered event whose data is already encoded as JSON text"""
+    id: str
+    event: str
+    data: str
+    timestamp: datetime
+    frame: Optional[str] = None
 
 
 class EventStore:
-    """Postgres-backed event store for SSE replay functionality"""
+    """Postgres-backed event store for SSE replay functionality.
+
+    Events from running graphs are buffered per run and written by a
+    background task as multi-row INSERTs, so graph execution never waits on
+    the database per event. Call :meth:`flush` to make a run's events durable
+    (e.g. before its final status is published).
+    """
 
     CLEANUP_INTERVAL = 300  # seconds
 
     def __init__(self) -> None:
         self._cleanup_task: Optional[asyncio.Task] = None
+        self._writer_task: Optional[asyncio.Task] = None
+        self._pending: Dict[str, List[PendingEvent]] = {}
+        self._pending_count = 0
+        self._has_pending = asyncio.Event()
+        self._batch_full = asyncio.Event()
+        # Held while a batch is being written so flush() can wait for it
+        self._write_lock = asyncio.Lock()
+        # Tells the writer to exit once nothing is pending
+        self._stopping = False
 
     async def start_cleanup_task(self) -> None:
+        # Make sure the current hour has a partition before events arrive
+        try:
+            await self._maintain_partitions()
+        except Exception as e:
+            logger.error(f"Error maintaining run_events partitions: {e}")
         if self._cleanup_task is None or self._cleanup_task.done():
             self._cleanup_task = asyncio.create_task(self._cleanup_loop())
 
@@ -32,75 +83,234 @@ class EventStore:
             except asyncio.CancelledError:
                 pass
 
-    async def store_event(self, run_id: str, event: SSEEvent) -> None:
-        """Persist an event with sequence extracted from id suffix.
+    async def stop_writer(self) -> None:
+        """Stop the background writer after flushing everything buffered.
 
-        We expect event.id format: f"{run_id}_event_{seq}".
+        The writer is asked to exit instead of being cancelled, so a batch it
+        is writing is never abandoned.
         """
+        self._stopping = True
+        self._has_pending.set()
+        self._batch_full.set()
         try:
-            seq = int(str(event.id).split("_event_")[-1])
-        except Exception:
-            seq = 0
-        engine = db_manager.get_engine()
-        async with engine.begin() as conn:
-            stmt = text(
-                """
-                INSERT INTO run_events (id, run_id, seq, event, data, created_at)
-                VALUES (:id, :run_id, :seq, :event, :data, NOW())
-                ON CONFLICT (id) DO NOTHING
-                """
-            ).bindparams(bindparam("data", type_=JSONB))
-            await conn.execute(
-                stmt,
-                {
-                    "id": event.id,
-                    "run_id": run_id,
-                    "seq": seq,
-                    "event": event.event,
-                    "data": event.data,
-                },
-            )
+            if self._writer_task and not self._writer_task.done():
+                await self._writer_task
+        finally:
+            self._stopping = False
+        await self.flush()
+
+    def enqueue_encoded(
+        self, run_id: str, event_id: str, event_type: str, data: str, frame: Optional[str] = None
+    ) -> None:
+        """Buffer an event whose data was already serialized to JSON text.
+
+        ``frame`` is its SSE frame, persisted only when EVENT_STORE_FRAMES is set.
+        """
+        if not EVENT_STORE_FRAMES:
+            frame = None
+        self._enqueue(run_id, PendingEvent(event_id, event_type, data, datetime.now(UTC), frame))
+
+    def _enqueue(self, run_id: str, event: PendingEvent) -> None:
+        self._pending.setdefault(run_id, []).append(event)
+        self._pending_count += 1
+        self._has_pending.set()
+        if self._pending_count >= EVENT_STORE_BATCH_SIZE:
+            self._batch_full.set()
+        if self._writer_task is None or self._writer_task.done():
+            self._writer_task = asyncio.create_task(self._writer_loop())
+
+    async def flush(self, run_id: Optional[str] = None) -> None:
+        """Write buffered events for one run (or all runs) and wait until durable.
 
-    async def get_events_since(self, run_id: str, last_event_id: str) -> List[SSEEvent]:
-        """Fetch all events for run after last_event_id sequence."""
+        Also waits for a batch the background writer may be writing, so every
+        event enqueued before this call is persisted when it returns.
+        """
+        async with self._write_lock:
+            batch = self._take_pending(run_id)
+            try:
+                await self._write_batch(batch)
+            except asyncio.CancelledError:
+                # Keep the events for the next flush; one already written is
+                # skipped by ON CONFLICT, as its timestamp is unchanged
+                self._requeue(batch)
+                raise
+
+    def _take_pending(self, run_id: Optional[str] = None) -> List[tuple[str, PendingEvent]]:
+        if run_id is None:
+            runs, self._pending = self._pending, {}
+        else:
+            runs = {run_id: self._pending.pop(run_id, [])}
+        batch = [(rid, ev) for rid, events in runs.items() for ev in events]
+        self._pending_count -= len(batch)
+        if not self._pending:
+            self._has_pending.clear()
+        if self._pending_count < EVENT_STORE_BATCH_SIZE:
+            self._batch_full.clear()
+        return batch
+
+    def _requeue(self, batch: List[tuple[str, PendingEvent]]) -> None:
+        """Put taken events back in front of those buffered since"""
+        runs: Dict[str, List[PendingEvent]] = {}
+        for run_id, event in batch:
+            runs.setdefault(run_id, []).append(event)
+        for run_id, events in runs.items():
+            self._pending[run_id] = events + self._pending.get(run_id, [])
+        self._pending_count += len(batch)
+        if self._pending:
+            self._has_pending.set()
+        if self._pending_count >= EVENT_STORE_BATCH_SIZE:
+            self._batch_full.set()
+
+    async def _writer_loop(self) -> None:
+        while not self._stopping:
+            try:
+                await self._has_pending.wait()
+                if not self._stopping:
+                    try:
+                        await asyncio.wait_for(self._batch_full.wait(), timeout=EVENT_STORE_FLUSH_INTERVAL)
+                    except asyncio.TimeoutError:
+                        pass
+                await self.flush()
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Error in event store writer: {e}")
+
+    async def _write_batch(self, batch: List[tuple[str, PendingEvent]]) -> None:
+        """Persist events with a single multi-row INSERT.
+
+        Event data is bound as JSON text and cast server-side, so it is not
+        serialized again on the way to the database. With compression enabled
+        it is stored as a zstd frame in data_compressed instead, and so is
+        the event's SSE frame if one is kept.
+        """
+        if not batch:
+            return
+        stmt = text(
+            """
+            INSERT INTO run_events (id, run_id, seq, event, data, data_compressed, frame, created_at)
+            SELECT * FROM unnest(
+                CAST(:ids AS text[]), CAST(:run_ids AS text[]), CAST(:seqs AS integer[]),
+                CAST(:events AS text[]), CAST(CAST(:data AS text[]) AS jsonb[]),
+                CAST(:data_compressed AS bytea[]), CAST(:frames AS bytea[]), CAST(:created_at AS timestamptz[])
+            )
+            ON CONFLICT DO NOTHING
+            """
+        )
+        codec = event_compression.event_codec
+        if codec.enabled:
+            data = [None] * len(batch)
+            data_compressed = [codec.compress(event.data) for _, event in batch]
+            frames = [codec.compress(event.frame) if event.frame else None for _, event in batch]
+        else:
+            data = [event.data for _, event in batch]
+            data_compressed = [None] * len(batch)
+            frames = [event.frame.encode("utf-8") if event.frame else None for _, event in batch]
+        params = {
+            "ids": [event.id for _, event in batch],
+            "run_ids": [run_id for run_id, _ in batch],
+            "seqs": [extract_event_sequence(event.id) for _, event in batch],
+            "events": [event.event for _, event in batch],
+            "data": data,
+            "data_compressed": data_compressed,
+            "frames": frames,
+            "created_at": [event.timestamp for _, event in batch],
+        }
         try:
-            last_seq = int(str(last_event_id).split("_event_")[-1])
-        except Exception:
-            last_seq = -1
+            engine = db_manager.get_engine()
+            async with engine.begin() as conn:
+                await conn.execute(stmt, params)
+        except Exception as e:
+            # Losing replay history must not fail the run itself
+            logger.error(f"Failed to store {len(batch)} run events: {e}")
+
+    async def iter_events_since(self, run_id: str, last_seq: int = -1) -> AsyncIterator[SSEEvent]:
+        """Yield events after last_seq in order, one keyset-paginated page at a time.
+
+        Memory stays bounded by the page size however long the run is, and no
+        connection is held while the caller consumes a page. Events stored
+        with their SSE frame carry it in ``frame`` and their data is not
+        fetched.
+        """
+        engine = db_manager.get_engine()
+        while True:
+            async with engine.begin() as conn:
+                rs = await conn.execute(
+                    text(
+                        """
+                        SELECT id, seq, event, created_at, frame,
+                               data_compressed IS NOT NULL AS compressed,
+                               CASE WHEN frame IS NULL THEN data END AS data,
+                               CASE WHEN frame IS NULL THEN data_compressed END AS data_compressed
+                        FROM run_events
+                        WHERE run_id = :run_id AND seq > :last_seq
+                        ORDER BY seq ASC
+                        LIMIT :limit
+                        """
+                    ),
+                    {"run_id": run_id, "last_seq": last_seq, "limit": EVENT_STORE_REPLAY_PAGE_SIZE},
+                )
+                rows = rs.fetchall()
+            for r in rows:
+                # The partitioned primary key is (id, created_at), so an event
+                # written twice is not rejected; replay it once
+                if r.seq == last_seq:
+                    continue
+                last_seq = r.seq
+                if r.frame is not None:
+                    yield SSEEvent(
+                        id=r.id, event=r.event, data=None, timestamp=r.created_at,
+                        frame=self._decode_frame(r.frame, r.compressed),
+                    )
+                else:
+                    yield self._row_to_event(r)
+            if len(rows) < EVENT_STORE_REPLAY_PAGE_SIZE:
+                return
+
+    async def last_sequence(self, run_id: str) -> int:
+        """Highest stored sequence of a run, or 0 if none was stored"""
         engine = db_manager.get_engine()
         async with engine.begin() as conn:
-            rs = await conn.execute(
-                text(
-                    """
-                    SELECT id, event, data, created_at
-                    FROM run_events
-                    WHERE run_id = :run_id AND seq > :last_seq
-                    ORDER BY seq ASC
-                    """
-                ),
-                {"run_id": run_id, "last_seq": last_seq},
+            seq = await conn.scalar(
+                text("SELECT COALESCE(MAX(seq), 0) FROM run_events WHERE run_id = :run_id"),
+                {"run_id": run_id},
             )
-            rows = rs.fetchall()
-        return [SSEEvent(id=r.id, event=r.event, data=r.data, timestamp=r.created_at) for r in rows]
+        return int(seq)
 
-    async def get_all_events(self, run_id: str) -> List[SSEEvent]:
+    async def get_events_range(
+        self, run_id: str, first_seq: int, last_seq: int, event: Optional[str] = None
+    ) -> List[SSEEvent]:
+        """Fetch events with first_seq <= seq <= last_seq, optionally of one type."""
         engine = db_manager.get_engine()
         async with engine.begin() as conn:
             rs = await conn.execute(
                 text(
                     """
-                    SELECT id, event, data, created_at
+                    SELECT id, event, data, data_compressed, created_at
                     FROM run_events
-                    WHERE run_id = :run_id
+                    WHERE run_id = :run_id AND seq BETWEEN :first_seq AND :last_seq
+                      AND (CAST(:event AS text) IS NULL OR event = :event)
                     ORDER BY seq ASC
                     """
                 ),
-                {"run_id": run_id},
+                {"run_id": run_id, "first_seq": first_seq, "last_seq": last_seq, "event": event},
             )
             rows = rs.fetchall()
-        return [SSEEvent(id=r.id, event=r.event, data=r.data, timestamp=r.created_at) for r in rows]
+        return [self._row_to_event(r) for r in rows]
+
+    def _row_to_event(self, r) -> SSEEvent:
+        data = r.data
+        if r.data_compressed is not None:
+            data = event_compression.event_codec.decompress(r.data_compressed)
+        return SSEEvent(id=r.id, event=r.event, data=data, timestamp=r.created_at)
+
+    def _decode_frame(self, frame: bytes, compressed: bool) -> str:
+        if compressed:
+            return event_compression.event_codec.decompress_raw(frame).decode("utf-8")
+        return bytes(frame).decode("utf-8")
 
     async def cleanup_events(self, run_id: str) -> None:
+        event_cache.discard(run_id)
         engine = db_manager.get_engine()
         async with engine.begin() as conn:
             await conn.execute(text("DELETE FROM run_events WHERE run_id = :run_id"), {"run_id": run_id})
@@ -146,37 +356,116 @@ class EventStore:
         while True:
             try:
                 await asyncio.sleep(self.CLEANUP_INTERVAL)
-                await self._cleanup_old_runs()
+                await self._maintain_partitions()
             except asyncio.CancelledError:
                 break
             except Exception as e:
                 print(f"Error in event store cleanup: {e}")
 
-    async def _cleanup_old_runs(self) -> None:
-        # Retain events for 1 hour by default
+    async def _maintain_partitions(self) -> None:
+        """Create upcoming hourly partitions and drop expired ones.
+
+        run_events is range-partitioned by created_at, so retention drops
+        whole partitions instead of deleting rows. Only rows that landed in
+        the default partition are deleted individually. Every partition is
+        created or dropped in its own transaction, so one that fails does
+        not hold back the others (nor retention).
+        """
+        hour = datetime.now(UTC).replace(minute=0, second=0, microsecond=0)
+        cutoff = datetime.now(UTC) - timedelta(hours=EVENT_STORE_RETENTION_HOURS)
         engine = db_manager.get_engine()
-        async with engine.begin() as conn:
-            await conn.execute(
-                text(
-                    "DELETE FROM run_events WHERE created_at < NOW() - INTERVAL '1 hour'"
+        async with engine.connect() as conn:
+            # One worker at a time; the others skip this round
+            locked = await conn.scalar(text("SELECT pg_try_advisory_lock(hashtext('run_events_partitions'))"))
+            await conn.commit()
+            if not locked:
+                return
+            try:
+                for ahead in range(EVENT_STORE_PARTITIONS_AHEAD + 1):
+                    start = hour + timedelta(hours=ahead)
+                    name = f"{PARTITION_PREFIX}{start.strftime(PARTITION_FORMAT)}"
+                    await self._partition_step(
+                        conn, f"create {name}", lambda: self._create_partition(conn, name, start)
+                    )
+
+                rs = await conn.execute(
+                    text(
+                        """
+                        SELECT c.relname
+                        FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+                        WHERE i.inhparent = 'run_events'::regclass
+                        """
+                    )
+                )
+                names = [name for (name,) in rs.fetchall()]
+                await conn.commit()
+                for name in names:
+                    if not name.startswith(PARTITION_PREFIX):
+                        continue
+                    try:
+                        start = datetime.strptime(name[len(PARTITION_PREFIX):], PARTITION_FORMAT).replace(tzinfo=UTC)
+                    except ValueError:
+                        continue
+                    if start + timedelta(hours=1) <= cutoff:
+                        if await self._partition_step(
+                            conn, f"drop {name}", lambda: conn.execute(text(f"DROP TABLE IF EXISTS {name}"))
+                        ):
+                            logger.info(f"Dropped expired run_events partition {name}")
+
+                await self._partition_step(
+                    conn,
+                    "expire run_events_default rows",
+                    lambda: conn.execute(
+                        text("DELETE FROM run_events_default WHERE created_at < :cutoff"), {"cutoff": cutoff}
+                    ),
                 )
+            finally:
+                await conn.execute(text("SELECT pg_advisory_unlock(hashtext('run_events_partitions'))"))
+                await conn.commit()
+
+    async def _partition_step(self, conn, description: str, step: Callable[[], Awaitable[Any]]) -> bool:
+        """Run one maintenance step in its own transaction; False if it failed"""
+        try:
+            async with conn.begin():
+                await step()
+            return True
+        except Exception as e:
+            logger.error(f"run_events maintenance failed to {description}: {e}")
+            return False
+
+    async def _create_partition(self, conn, name: str, start: datetime) -> None:
+        """Create an hourly partition, moving rows for its hour out of the default one.
+
+        Postgres refuses to create a partition whose range has rows in the
+        default partition, so those rows are parked in a temporary table and
+        inserted again once the partition exists.
+        """
+        if await conn.scalar(text("SELECT to_regclass(:name) IS NOT NULL"), {"name": name}):
+            return
+        end = start + timedelta(hours=1)
+        columns = "id, run_id, seq, event, data, data_compressed, frame, created_at"
+        await conn.execute(text("CREATE TEMP TABLE run_events_moved (LIKE run_events) ON COMMIT DROP"))
+        await conn.execute(
+            text(
+                f"""
+                WITH moved AS (
+                    DELETE FROM run_events_default WHERE created_at >= :start AND created_at < :end
+                    RETURNING {columns}
+                )
+                INSERT INTO run_events_moved ({columns}) SELECT {columns} FROM moved
+                """
+            ),
+            {"start": start, "end": end},
+        )
+        await conn.execute(
+            text(
+                f"CREATE TABLE {name} PARTITION OF run_events FOR VALUES FROM ('{start.isoformat()}') "
+                f"TO ('{end.isoformat()}')"
             )
+        )
+        await conn.execute(text(f"INSERT INTO run_events ({columns}) SELECT {columns} FROM run_events_moved"))
 
 
 # Global event store instance
 event_store = EventStore()
 
-
-async def store_sse_event(run_id: str, event_id: str, event_type: str, data: Dict):
-    """Store SSE event with proper serialization"""
-    serializer = GeneralSerializer()
-    
-    # Ensure JSONB-safe data by serializing complex objects
-    try:
-        safe_data = json.loads(json.dumps(data, default=serializer.serialize))
-    except Exception:
-        # Fallback to stringifying as a last resort to avoid crashing the run
-        safe_data = {"raw": str(data)}
-    event = SSEEvent(id=event_id, event=event_type, data=safe_data, timestamp=datetime.now(UTC))
-    await event_store.store_event(run_id, event)
-    return event
\ No newline at end of file
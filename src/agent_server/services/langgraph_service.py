@@ -21,6 +21,8 @@ class LangGraphService:
         self.config: Optional[Dict[str, Any]] = None
         self._graph_registry: Dict[str, Any] = {}
         self._graph_cache: Dict[str, Any] = {}
+        self._stateless_cache: Dict[str, Any] = {}
+        self._replica_cache: Dict[str, Any] = {}
         
     async def initialize(self):
         """Load configuration file and setup graph registry.
@@ -155,6 +157,30 @@ class LangGraphService:
         
         return compiled_graph
     
+    async def get_stateless_graph(self, graph_id: str) -> StateGraph[Any]:
+        """Get a graph that keeps no checkpoints, for runs without a thread.
+
+        Shares the long-term store with the persistent graph; interrupts are
+        not available since they need a checkpointer.
+        """
+        if graph_id not in self._stateless_cache:
+            graph = await self.get_graph(graph_id)
+            self._stateless_cache[graph_id] = graph.copy(update={"checkpointer": None})
+        return self._stateless_cache[graph_id]
+    
+    async def get_replica_graph(self, graph_id: str) -> StateGraph[Any]:
+        """Get a graph whose checkpointer reads from the read replica.
+
+        For state and history reads only; runs must use :meth:`get_graph`.
+        """
+        if graph_id not in self._replica_cache:
+            from ..core.database import db_manager
+
+            graph = await self.get_graph(graph_id)
+            checkpointer = await db_manager.get_replica_checkpointer()
+            self._replica_cache[graph_id] = graph.copy(update={"checkpointer": checkpointer})
+        return self._replica_cache[graph_id]
+    
     async def _load_graph_from_file(self, graph_id: str, graph_info: Dict[str, str]):
         """Load graph from filesystem"""
         file_path = Path(graph_info["file_path"])
@@ -194,8 +220,12 @@ class LangGraphService:
         """Invalidate graph cache for hot-reload"""
         if graph_id:
             self._graph_cache.pop(graph_id, None)
+            self._stateless_cache.pop(graph_id, None)
+            self._replica_cache.pop(graph_id, None)
         else:
             self._graph_cache.clear()
+            self._stateless_cache.clear()
+            self._replica_cache.clear()
     
     def get_config(self) -> Optional[Dict[str, Any]]:
         """Get loaded configuration"""
@@ -0,0 +1,174 @@
+"""Per-thread run serialization (``multitask_strategy``).
+
+At most one run executes on a thread at a time. When a run is created while
+another one is pending or running on the same thread, the new run's
+strategy decides what happens:
+
+- ``reject`` (default): the new run is refused
+- ``interrupt``: the active run is stopped, keeping its checkpoints
+- ``rollback``: the active run is stopped and deleted with its checkpoints
+  (and the checkpoint blobs only they refer to)
+- ``enqueue``: the new run waits until the earlier runs are done
+
+Checking for active runs and creating the new one happen under a per-thread
+lock, so concurrent double-submits are serialized. The lock is an asyncio
+lock in this process, or a Postgres advisory lock with
+``MULTITASK_LOCK_BACKEND=postgres`` when several processes accept runs.
+
+A run executing in another process is stopped through the run completion
+notifier; the new run starts once that process let go of the thread, or
+after ``RUN_STOP_TIMEOUT`` seconds if it does not answer.
+"""
+import asyncio
+import logging
+import os
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional, Tuple
+
+from sqlalchemy import text
+
+from ..core.database import db_manager
+
+logger = logging.getLogger(__name__)
+
+MULTITASK_STRATEGIES = ("reject", "interrupt", "rollback", "enqueue")
+DEFAULT_MULTITASK_STRATEGY = "reject"
+ACTIVE_RUN_STATUSES = ("pending", "running", "streaming")
+
+# memory: lock per process; postgres: advisory lock shared by all processes
+MULTITASK_LOCK_BACKEND = os.getenv("MULTITASK_LOCK_BACKEND", "memory").lower()
+# Enqueued runs are woken when a run on their thread ends; this re-check
+# interval only guards against missed notifications
+RUN_ENQUEUE_POLL_INTERVAL = float(os.getenv("RUN_ENQUEUE_POLL_INTERVAL", "5.0"))
+# How long stopping a run waits for the process executing it to let go
+RUN_STOP_TIMEOUT = float(os.getenv("RUN_STOP_TIMEOUT", "10.0"))
+# Executing runs also check whether they were stopped at this interval, in
+# case the stop request was missed
+RUN_STOP_POLL_INTERVAL = float(os.getenv("RUN_STOP_POLL_INTERVAL", "10.0"))
+
+
+def resolve_multitask_strategy(strategy: Optional[str]) -> str:
+    """Validate a requested strategy; None means the default"""
+    if strategy is None:
+        return DEFAULT_MULTITASK_STRATEGY
+    if strategy not in MULTITASK_STRATEGIES:
+        raise ValueError(
+            f"Unknown multitask_strategy '{strategy}', expected one of: {', '.join(MULTITASK_STRATEGIES)}"
+        )
+    return strategy
+
+
+class ThreadLocks:
+    """Mutual exclusion of run creation per thread"""
+
+    def __init__(self, backend: str = MULTITASK_LOCK_BACKEND):
+        if backend not in ("memory", "postgres"):
+            logger.warning(f"Unknown MULTITASK_LOCK_BACKEND '{backend}', falling back to in-memory locks")
+            backend = "memory"
+        self.backend = backend
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._holders: Dict[str, int] = {}
+
+    @asynccontextmanager
+    async def hold(self, thread_id: str) -> AsyncIterator[None]:
+        if self.backend == "postgres":
+            async with self._hold_advisory(thread_id):
+                yield
+            return
+        lock = self._locks.setdefault(thread_id, asyncio.Lock())
+        self._holders[thread_id] = self._holders.get(thread_id, 0) + 1
+        try:
+            async with lock:
+                yield
+        finally:
+            self._holders[thread_id] -= 1
+            if not self._holders[thread_id]:
+                del self._holders[thread_id]
+                del self._locks[thread_id]
+
+    @asynccontextmanager
+    async def _hold_advisory(self, thread_id: str) -> AsyncIterator[None]:
+        # Session-level lock on a dedicated connection, so it survives the
+        # commits made while the run is created
+        key = {"key": f"thread_runs:{thread_id}"}
+        async with db_manager.get_engine().connect() as conn:
+            await conn.execute(text("SELECT pg_advisory_lock(hashtext(:key))"), key)
+            await conn.commit()
+            try:
+                yield
+            finally:
+                await conn.execute(text("SELECT pg_advisory_unlock(hashtext(:key))"), key)
+                await conn.commit()
+
+
+async def get_thread_turn(thread_id: str, run_id: str) -> Tuple[Optional[str], bool]:
+    """Return the run's status and whether runs created before it on the thread are still active"""
+    engine = db_manager.get_engine()
+    async with engine.begin() as conn:
+        row = (
+            await conn.execute(
+                text(
+                    """
+                    SELECT cur.status, EXISTS (
+                        SELECT 1 FROM runs r
+                        WHERE r.thread_id = :thread_id AND r.run_id <> cur.run_id
+                          AND r.status IN ('pending', 'running', 'streaming')
+                          AND (r.created_at, r.run_id) < (cur.created_at, cur.run_id)
+                    ) AS blocked
+                    FROM runs cur
+                    WHERE cur.run_id = :run_id
+                    """
+                ),
+                {"thread_id": thread_id, "run_id": run_id},
+            )
+        ).fetchone()
+    if row is None:
+        return None, False
+    return row.status, bool(row.blocked)
+
+
+async def delete_run_checkpoints(thread_id: str, run_id: str) -> None:
+    """Delete the checkpoints a run made on a thread, their pending writes and blobs.
+
+    Blobs hold channel values by version and are shared by every checkpoint
+    referring to that version, so only those no other checkpoint refers to go.
+    """
+    engine = db_manager.get_engine()
+    try:
+        async with engine.begin() as conn:
+            await conn.execute(
+                text(
+                    """
+                    WITH doomed AS (
+                        DELETE FROM checkpoints
+                        WHERE thread_id = :thread_id AND metadata->>'run_id' = :run_id
+                        RETURNING checkpoint_ns, checkpoint_id, checkpoint->'channel_versions' AS versions
+                    ), writes AS (
+                        DELETE FROM checkpoint_writes w USING doomed d
+                        WHERE w.thread_id = :thread_id
+                          AND w.checkpoint_ns = d.checkpoint_ns AND w.checkpoint_id = d.checkpoint_id
+                    )
+                    DELETE FROM checkpoint_blobs b USING doomed d, jsonb_each_text(d.versions) v
+                    WHERE b.thread_id = :thread_id AND b.checkpoint_ns = d.checkpoint_ns
+                      AND b.channel = v.key AND b.version = v.value
+                      AND NOT EXISTS (
+                          -- The statement still sees the deleted checkpoints
+                          SELECT 1 FROM checkpoints c
+                          WHERE c.thread_id = :thread_id AND c.checkpoint_ns = d.checkpoint_ns
+                            AND c.checkpoint->'channel_versions'->>v.key = v.value
+                            AND NOT EXISTS (
+                                SELECT 1 FROM doomed o
+                                WHERE o.checkpoint_ns = c.checkpoint_ns AND o.checkpoint_id = c.checkpoint_id
+                            )
+                      )
+                    """
+                ),
+                {"thread_id": thread_id, "run_id": run_id},
+            )
+    except Exception as e:
+        # The checkpoint tables only exist once LangGraph has set them up
+        logger.warning(f"Failed to delete checkpoints of run {run_id}: {e}")
+
+
+# Global per-thread locks for run creation
+thread_locks = ThreadLocks()
@@ -0,0 +1,349 @@
+"""Postgres LISTEN/NOTIFY broker for multi-worker deployments.
+
+Every worker keeps its normal in-memory brokers for local fan-out and, in
+addition, publishes the events of runs other workers watch on a Postgres
+channel. Workers that have live subscribers for a run they are *not* executing
+announce their interest periodically, receive the notifications and feed them
+into their local broker, so a stream request can land on any worker. They also
+poll the run's status, so a stream ends even if the run's finish notification
+was missed.
+
+If the listener connection cannot be established the manager degrades to the
+plain in-memory behaviour.
+"""
+import asyncio
+import json
+import logging
+import os
+from typing import Any
+from uuid import uuid4
+
+import asyncpg
+from sqlalchemy import text
+
+from ..core.database import db_manager
+from ..core.serializers import GeneralSerializer
+from ..core.sse import EncodedEvent
+from .broker import BrokerManager, RunBroker
+from .event_store import event_store
+from .run_completion import TERMINAL_RUN_STATUSES
+
+logger = logging.getLogger(__name__)
+
+NOTIFY_CHANNEL = os.getenv("BROKER_NOTIFY_CHANNEL", "aegra_run_events")
+# Postgres rejects NOTIFY payloads of 8000 bytes or more; leave room for the header
+NOTIFY_CHUNK_SIZE = 7000
+RECONNECT_DELAY = 1.0
+# Workers streaming a remote run announce it (and check its status) this often;
+# its events are published until three announcements in a row are missed
+BROKER_WATCH_INTERVAL = float(os.getenv("BROKER_WATCH_INTERVAL", "10"))
+WATCH_TTL = 3 * BROKER_WATCH_INTERVAL
+
+_serializer = GeneralSerializer()
+
+
+def encode_payload(payload: Any) -> Any:
+    """Make a broker payload JSON-safe while keeping tuples distinguishable.
+
+    Stream consumers rely on tuples (``(mode, chunk)``, ``(message, metadata)``)
+    so they are tagged and restored by :func:`decode_payload`. Pre-encoded
+    events only need their SSE frame on the receiving side.
+    """
+    if isinstance(payload, EncodedEvent):
+        return {"__frame__": payload.frame}
+    if isinstance(payload, tuple):
+        return {"__tuple__": [encode_payload(item) for item in payload]}
+    if isinstance(payload, list):
+        return [encode_payload(item) for item in payload]
+    if isinstance(payload, dict):
+        return {k: encode_payload(v) for k, v in payload.items()}
+    if isinstance(payload, (str, int, float, bool, type(None))):
+        return payload
+    return encode_payload(_serializer.serialize(payload))
+
+
+def decode_payload(data: Any) -> Any:
+    """Inverse of :func:`encode_payload`"""
+    if isinstance(data, dict):
+        if len(data) == 1 and "__tuple__" in data:
+            return tuple(decode_payload(item) for item in data["__tuple__"])
+        if len(data) == 1 and "__frame__" in data:
+            return EncodedEvent(frame=data["__frame__"])
+        return {k: decode_payload(v) for k, v in data.items()}
+    if isinstance(data, list):
+        return [decode_payload(item) for item in data]
+    return data
+
+
+class PostgresRunBroker(RunBroker):
+    """RunBroker that also publishes its events to the other workers"""
+
+    def __init__(self, run_id: str, manager: "PostgresBrokerManager", **kwargs):
+        super().__init__(run_id, **kwargs)
+        self._manager = manager
+        # Set once this worker produces the run's events
+        self.produced_here = False
+
+    async def put(self, event_id: str, payload: Any) -> None:
+        """Deliver to local subscribers and publish to the other workers"""
+        if self.finished.is_set():
+            logger.warning(f"Attempted to put event {event_id} into finished broker for run {self.run_id}")
+            return
+        self.produced_here = True
+        await super().put(event_id, payload)
+        self._manager.publish_event(self.run_id, event_id, payload)
+
+    async def deliver(self, event_id: str, payload: Any) -> None:
+        """Deliver an event received from another worker (not republished)"""
+        await super().put(event_id, payload)
+
+
+class PostgresBrokerManager(BrokerManager):
+    """Broker manager that relays run events across processes via LISTEN/NOTIFY"""
+
+    def __init__(self):
+        super().__init__()
+        # Identifies this process so it can ignore its own notifications
+        self._origin = uuid4().hex[:12]
+        self._outbox: asyncio.Queue[str] = asyncio.Queue()
+        # Remote (run_id, event_id, payload) items, delivered by a single task to
+        # preserve their order; an event_id of None means the run finished
+        self._inbox: asyncio.Queue[tuple[str, str | None, Any]] = asyncio.Queue()
+        self._publisher_task: asyncio.Task | None = None
+        self._listener_task: asyncio.Task | None = None
+        self._delivery_task: asyncio.Task | None = None
+        self._watch_task: asyncio.Task | None = None
+        self._listening = False
+        # Loop time the current LISTEN connection was established
+        self._listening_since = 0.0
+        # run_id -> loop time until which another worker is known to watch it
+        self._watchers: dict[str, float] = {}
+        # Runs whose events were published; their stored events were flushed first
+        self._published: set[str] = set()
+        # Set to announce interest and check statuses without waiting for the interval
+        self._watch_wakeup = asyncio.Event()
+        # (origin, event_id) -> received chunks of a split payload
+        self._partial: dict[tuple[str, str], list[str | None]] = {}
+
+    def get_or_create_broker(self, run_id: str) -> PostgresRunBroker:
+        """Get or create a publishing broker for a run"""
+        if run_id not in self._brokers:
+            self._brokers[run_id] = PostgresRunBroker(run_id, self, metrics=self._overflow_counts)
+            logger.debug(f"Created new broker for run {run_id}")
+            # A viewer of a remote run: announce it and check it has not ended yet
+            self._watch_wakeup.set()
+        return self._brokers[run_id]
+
+    def remove_broker(self, run_id: str) -> None:
+        super().remove_broker(run_id)
+        self._published.discard(run_id)
+
+    def cleanup_broker(self, run_id: str) -> None:
+        """Finish the broker locally and tell the other workers the run ended"""
+        super().cleanup_broker(run_id)
+        self._outbox.put_nowait(f"F|{self._origin}|{run_id}")
+
+    def has_remote_watchers(self, run_id: str) -> bool:
+        """Whether another worker may be streaming the run.
+
+        Until this worker has listened for a full announcement period it
+        cannot know, so every run counts as watched.
+        """
+        loop = asyncio.get_running_loop()
+        if not self._listening or loop.time() - self._listening_since < WATCH_TTL:
+            return True
+        return self._watchers.get(run_id, 0.0) > loop.time()
+
+    def publish_event(self, run_id: str, event_id: str, payload: Any) -> None:
+        """Queue an event for publication if anyone else watches; never blocks the producer"""
+        if not self.has_remote_watchers(run_id):
+            return
+        try:
+            data = json.dumps(encode_payload(payload), separators=(",", ":"))
+        except Exception as e:
+            logger.warning(f"Could not encode event {event_id} for cross-worker delivery: {e}")
+            return
+        # json.dumps escapes non-ASCII, so character count equals byte count
+        chunks = [data[i:i + NOTIFY_CHUNK_SIZE] for i in range(0, len(data), NOTIFY_CHUNK_SIZE)] or [""]
+        for index, chunk in enumerate(chunks):
+            self._outbox.put_nowait(
+                f"E|{self._origin}|{run_id}|{event_id}|{index}|{len(chunks)}|{chunk}"
+            )
+
+    def get_metrics(self) -> dict[str, Any]:
+        metrics = super().get_metrics()
+        metrics["backend"] = "postgres" if self._listening else "memory"
+        metrics["outbox"] = self._outbox.qsize()
+        metrics["remote_watched_runs"] = len(self._watchers)
+        return metrics
+
+    async def start(self) -> None:
+        await super().start()
+        if self._publisher_task is None or self._publisher_task.done():
+            self._publisher_task = asyncio.create_task(self._publish_loop())
+        if self._listener_task is None or self._listener_task.done():
+            self._listener_task = asyncio.create_task(self._listen_loop())
+        if self._delivery_task is None or self._delivery_task.done():
+            self._delivery_task = asyncio.create_task(self._delivery_loop())
+        if self._watch_task is None or self._watch_task.done():
+            self._watch_task = asyncio.create_task(self._watch_loop())
+
+    async def stop(self) -> None:
+        for task in (self._listener_task, self._publisher_task, self._delivery_task, self._watch_task):
+            if task and not task.done():
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        await super().stop()
+
+    async def _publish_loop(self) -> None:
+        """Drain the outbox, sending everything queued so far in one transaction.
+
+        Publishing does not depend on this worker's own LISTEN connection.
+        """
+        while True:
+            try:
+                messages = [await self._outbox.get()]
+                while not self._outbox.empty():
+                    messages.append(self._outbox.get_nowait())
+                for run_id in {m.split("|", 3)[2] for m in messages if m.startswith("E|")} - self._published:
+                    # A viewer that just joined refills the gap before its first
+                    # live event from the store, so the events before it must be there
+                    await event_store.flush(run_id)
+                    self._published.add(run_id)
+                async with db_manager.get_engine().begin() as conn:
+                    await conn.execute(
+                        text(
+                            "SELECT pg_notify(:channel, m) "
+                            "FROM unnest(CAST(:messages AS text[])) WITH ORDINALITY AS t(m, i)"
+                        ),
+                        {"channel": NOTIFY_CHANNEL, "messages": messages},
+                    )
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Error publishing broker events: {e}")
+
+    async def _listen_loop(self) -> None:
+        """Keep a dedicated LISTEN connection open, reconnecting on failure"""
+        dsn = db_manager.get_engine().url.set(drivername="postgresql").render_as_string(hide_password=False)
+        while True:
+            conn = None
+            try:
+                conn = await asyncpg.connect(dsn)
+                closed = asyncio.Event()
+                conn.add_termination_listener(lambda _conn: closed.set())
+                await conn.add_listener(NOTIFY_CHANNEL, self._on_notification)
+                self._listening = True
+                self._listening_since = asyncio.get_running_loop().time()
+                # Notifications sent while reconnecting are lost: announce the
+                # watched runs again and check whether any of them ended
+                self._watch_wakeup.set()
+                logger.info(f"Listening for broker events on channel '{NOTIFY_CHANNEL}'")
+                await closed.wait()
+                logger.warning("Broker LISTEN connection closed; reconnecting")
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.warning(f"Broker LISTEN connection unavailable, using in-memory delivery: {e}")
+            finally:
+                self._listening = False
+                if conn is not None and not conn.is_closed():
+                    await conn.close()
+            await asyncio.sleep(RECONNECT_DELAY)
+
+    async def _delivery_loop(self) -> None:
+        """Feed events received from other workers into local brokers, in order"""
+        while True:
+            try:
+                run_id, event_id, payload = await self._inbox.get()
+                broker = self._brokers.get(run_id)
+                if broker is None:
+                    continue
+                if event_id is None:
+                    broker.mark_finished()
+                else:
+                    await broker.deliver(event_id, payload)
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Error delivering remote broker event: {e}")
+
+    async def _watch_loop(self) -> None:
+        """Announce the remote runs streamed here and finish those that ended"""
+        while True:
+            try:
+                try:
+                    await asyncio.wait_for(self._watch_wakeup.wait(), timeout=BROKER_WATCH_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+                self._watch_wakeup.clear()
+                await self._refresh_watches()
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Error refreshing watched broker runs: {e}")
+
+    async def _refresh_watches(self) -> None:
+        now = asyncio.get_running_loop().time()
+        self._watchers = {run_id: until for run_id, until in self._watchers.items() if until > now}
+        watched = [
+            run_id for run_id, broker in self._brokers.items()
+            if not broker.produced_here and not broker.is_finished() and broker.subscriber_count() > 0
+        ]
+        if not watched:
+            return
+        async with db_manager.get_engine().begin() as conn:
+            rows = await conn.execute(
+                text("SELECT run_id, status FROM runs WHERE run_id = ANY(CAST(:run_ids AS text[]))"),
+                {"run_ids": watched},
+            )
+            statuses = dict(rows.all())
+        for run_id in watched:
+            broker = self._brokers.get(run_id)
+            if broker is None:
+                continue
+            if statuses.get(run_id) in TERMINAL_RUN_STATUSES:
+                # Its finish notification was missed; the stream refills the
+                # events it lacks from the event store
+                broker.mark_finished()
+            else:
+                self._outbox.put_nowait(f"W|{self._origin}|{run_id}")
+
+    def _on_notification(self, _conn, _pid: int, _channel: str, message: str) -> None:
+        """asyncpg listener callback; parses and routes one notification"""
+        try:
+            kind, origin, rest = message.split("|", 2)
+            if origin == self._origin:
+                return
+            if kind == "W":
+                self._watchers[rest] = asyncio.get_running_loop().time() + WATCH_TTL
+                return
+            if kind == "F":
+                self._inbox.put_nowait((rest, None, None))
+                for key in [k for k in self._partial if k[0] == origin and k[1].startswith(rest)]:
+                    del self._partial[key]
+                return
+            run_id, event_id, index, total, chunk = rest.split("|", 4)
+            if run_id not in self._brokers:
+                # Nobody on this worker is watching the run
+                return
+            data = self._reassemble(origin, event_id, int(index), int(total), chunk)
+            if data is not None:
+                self._inbox.put_nowait((run_id, event_id, decode_payload(json.loads(data))))
+        except Exception as e:
+            logger.error(f"Error handling broker notification: {e}")
+
+    def _reassemble(self, origin: str, event_id: str, index: int, total: int, chunk: str) -> str | None:
+        """Collect chunks of a split payload; returns the payload once complete"""
+        if total == 1:
+            return chunk
+        key = (origin, event_id)
+        parts = self._partial.setdefault(key, [None] * total)
+        parts[index] = chunk
+        if any(part is None for part in parts):
+            return None
+        del self._partial[key]
+        return "".join(parts)
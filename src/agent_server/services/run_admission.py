@@ -0,0 +1,184 @@
+"""Admission control for runs executed by this process.
+
+Caps how many runs execute at once, globally and per user / per assistant.
+Runs over a limit wait in a bounded FIFO queue (they stay ``pending``); once
+the queue is full new runs are rejected, which the API reports as 429.
+"""
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+# Runs executing at once in this process (0 = unlimited)
+RUN_MAX_CONCURRENT = int(os.getenv("RUN_MAX_CONCURRENT", "32"))
+RUN_MAX_CONCURRENT_PER_USER = int(os.getenv("RUN_MAX_CONCURRENT_PER_USER", "0"))
+RUN_MAX_CONCURRENT_PER_ASSISTANT = int(os.getenv("RUN_MAX_CONCURRENT_PER_ASSISTANT", "0"))
+# Runs waiting for a slot before new ones are rejected
+RUN_MAX_QUEUED = int(os.getenv("RUN_MAX_QUEUED", "256"))
+
+# Recent admissions the wait time metrics are computed over
+WAIT_SAMPLES = 256
+# Suggested client back-off when a run is rejected
+RETRY_AFTER_SECONDS = 5
+
+
+class RunAdmissionRejected(Exception):
+    """Raised when a run can neither start nor be queued"""
+
+
+class RunTicket:
+    """A run's place in the admission controller, from reservation to completion"""
+
+    __slots__ = ("run_id", "user_id", "assistant_id", "created", "admitted", "started")
+
+    def __init__(self, run_id: str, user_id: str, assistant_id: str):
+        self.run_id = run_id
+        self.user_id = user_id
+        self.assistant_id = assistant_id
+        self.created = time.monotonic()
+        # Resolved once the run may start
+        self.admitted: asyncio.Future = asyncio.get_running_loop().create_future()
+        self.started = False
+
+
+class RunAdmissionController:
+    """Global, per-user and per-assistant concurrency limits with a bounded queue"""
+
+    def __init__(
+        self,
+        max_concurrent: int = RUN_MAX_CONCURRENT,
+        max_per_user: int = RUN_MAX_CONCURRENT_PER_USER,
+        max_per_assistant: int = RUN_MAX_CONCURRENT_PER_ASSISTANT,
+        max_queued: int = RUN_MAX_QUEUED,
+    ):
+        self.max_concurrent = max_concurrent
+        self.max_per_user = max_per_user
+        self.max_per_assistant = max_per_assistant
+        self.max_queued = max_queued
+        self._running = 0
+        self._by_user: Dict[str, int] = {}
+        self._by_assistant: Dict[str, int] = {}
+        self._waiting: Dict[str, RunTicket] = {}
+        self._waits: deque[float] = deque(maxlen=WAIT_SAMPLES)
+        self.admitted = 0
+        self.rejected = 0
+
+    def reserve(self, run_id: str, user_id: str, assistant_id: str, bounded: bool = True) -> RunTicket:
+        """Start the run right away or queue it.
+
+        Raises RunAdmissionRejected when it is over a limit and the queue is
+        full, unless ``bounded`` is False (for runs that were already accepted).
+        """
+        ticket = RunTicket(run_id, user_id, assistant_id)
+        if self._can_start(ticket):
+            self._start(ticket)
+        elif len(self._waiting) < self.max_queued or not bounded:
+            self._waiting[run_id] = ticket
+            logger.info(f"Run {run_id} queued for admission ({len(self._waiting)} waiting)")
+        else:
+            self.rejected += 1
+            raise RunAdmissionRejected(
+                f"Too many runs in progress ({self._running} running, {len(self._waiting)} queued)"
+            )
+        return ticket
+
+    async def run(self, ticket: RunTicket, execute: Callable[[], Awaitable[Any]]) -> Any:
+        """Wait until the ticket is admitted, then execute while holding its slot"""
+        async with self.hold(ticket):
+            return await execute()
+
+    @asynccontextmanager
+    async def hold(self, ticket: RunTicket) -> AsyncIterator[None]:
+        """Wait until the ticket is admitted and hold its slot for the block"""
+        try:
+            await ticket.admitted
+        except asyncio.CancelledError:
+            self.release(ticket)
+            raise
+        try:
+            yield
+        finally:
+            self.release(ticket)
+
+    def cancel_queued(self, run_id: str) -> bool:
+        """Drop a run that is still waiting; its :meth:`run` raises CancelledError"""
+        ticket = self._waiting.pop(run_id, None)
+        if ticket is None:
+            return False
+        ticket.admitted.cancel()
+        return True
+
+    def release(self, ticket: RunTicket) -> None:
+        """Give up the ticket's slot or queue entry (idempotent)"""
+        if self._waiting.get(ticket.run_id) is ticket:
+            del self._waiting[ticket.run_id]
+        if not ticket.started:
+            return
+        ticket.started = False
+        self._running -= 1
+        self._decrement(self._by_user, ticket.user_id)
+        self._decrement(self._by_assistant, ticket.assistant_id)
+        self._dispatch()
+
+    def get_metrics(self) -> Dict[str, Any]:
+        waits = list(self._waits)
+        return {
+            "running": self._running,
+            "queued": len(self._waiting),
+            "max_concurrent": self.max_concurrent,
+            "max_queued": self.max_queued,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "wait_seconds_avg": sum(waits) / len(waits) if waits else 0.0,
+            "wait_seconds_max": max(waits, default=0.0),
+            "oldest_queued_seconds": (
+                time.monotonic() - min(t.created for t in self._waiting.values()) if self._waiting else 0.0
+            ),
+        }
+
+    def _can_start(self, ticket: RunTicket) -> bool:
+        return self._has_capacity(ticket.user_id, ticket.assistant_id)
+
+    def _has_capacity(self, user_id: str, assistant_id: str) -> bool:
+        if self.max_concurrent and self._running >= self.max_concurrent:
+            return False
+        if self.max_per_user and self._by_user.get(user_id, 0) >= self.max_per_user:
+            return False
+        if self.max_per_assistant and self._by_assistant.get(assistant_id, 0) >= self.max_per_assistant:
+            return False
+        return True
+
+    def _start(self, ticket: RunTicket) -> None:
+        ticket.started = True
+        self._running += 1
+        self._by_user[ticket.user_id] = self._by_user.get(ticket.user_id, 0) + 1
+        self._by_assistant[ticket.assistant_id] = self._by_assistant.get(ticket.assistant_id, 0) + 1
+        self.admitted += 1
+        self._waits.append(time.monotonic() - ticket.created)
+        ticket.admitted.set_result(None)
+
+    def _dispatch(self) -> None:
+        """Start waiting runs in FIFO order, skipping those still over a per-key limit"""
+        for run_id, ticket in list(self._waiting.items()):
+            if self.max_concurrent and self._running >= self.max_concurrent:
+                break
+            if self._can_start(ticket):
+                del self._waiting[run_id]
+                self._start(ticket)
+
+    @staticmethod
+    def _decrement(counts: Dict[str, int], key: str) -> None:
+        remaining = counts.get(key, 0) - 1
+        if remaining > 0:
+            counts[key] = remaining
+        else:
+            counts.pop(key, None)
+
+
+# Global admission controller for runs executed by this process
+run_admission = RunAdmissionController()
@@ -0,0 +1,69 @@
+"""Batch execution of many single-shot runs (``POST /runs/batch``).
+
+Items are executed with bounded parallelism and their results are yielded
+in completion order, so a client can consume them as NDJSON while the rest
+of the batch is still running. Every item also takes a slot of the run
+admission controller, so batches share the process's run capacity with
+regular runs instead of adding to it.
+"""
+import asyncio
+import logging
+import os
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+# Inputs accepted in one batch request
+RUN_BATCH_MAX_ITEMS = int(os.getenv("RUN_BATCH_MAX_ITEMS", "10000"))
+# Runs of one batch executing at the same time (also the default)
+RUN_BATCH_MAX_CONCURRENCY = int(os.getenv("RUN_BATCH_MAX_CONCURRENCY", "16"))
+
+BatchItemExecutor = Callable[[int, Dict[str, Any]], Awaitable[Dict[str, Any]]]
+
+
+def batch_concurrency(requested: Optional[int]) -> int:
+    """Effective parallelism of a batch, capped by RUN_BATCH_MAX_CONCURRENCY"""
+    if requested is None:
+        return RUN_BATCH_MAX_CONCURRENCY
+    return max(1, min(requested, RUN_BATCH_MAX_CONCURRENCY))
+
+
+async def iter_batch_results(
+    inputs: Sequence[Dict[str, Any]],
+    execute: BatchItemExecutor,
+    concurrency: int,
+) -> AsyncIterator[Dict[str, Any]]:
+    """Execute ``execute(index, input)`` for every input, at most ``concurrency``
+    at a time, yielding each result as soon as it is available.
+
+    A failing item yields an error result instead of stopping the batch.
+    Closing the iterator (client disconnect) cancels the ``execute`` calls
+    in flight and waits for them, so executors can stop the work they started.
+    """
+    pending: Dict[asyncio.Task, int] = {}
+    next_index = 0
+
+    def fill() -> None:
+        nonlocal next_index
+        while next_index < len(inputs) and len(pending) < concurrency:
+            task = asyncio.create_task(execute(next_index, inputs[next_index]))
+            pending[task] = next_index
+            next_index += 1
+
+    try:
+        fill()
+        while pending:
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                index = pending.pop(task)
+                try:
+                    yield task.result()
+                except Exception as e:
+                    logger.warning(f"Batch item {index} failed: {e}")
+                    yield {"index": index, "status": "failed", "output": None, "error": str(e)}
+            fill()
+    finally:
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
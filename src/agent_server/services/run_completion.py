@@ -0,0 +1,225 @@
+"""Run completion notifications.
+
+Lets requests wait for a run to end (``/join``, enqueued runs waiting for
+their thread) without polling the database. Whoever moves a run to a final
+state, or deletes it, calls :meth:`RunCompletionNotifier.publish` after
+committing: waiters in this process are woken right away and the other
+processes (API workers, queue workers) are told through Postgres
+``LISTEN/NOTIFY``.
+
+Waiters re-read the run after every wake-up, so notifications only need to
+be timely, not exact. When the LISTEN connection is re-established all
+waiters are woken to re-check, covering notifications missed meanwhile.
+
+Stopping a run travels the other way: :meth:`RunCompletionNotifier.request_stop`
+reaches the process executing the run (on the ``aegra_run_stop`` channel),
+which cancels it and records the requested status itself.
+"""
+import asyncio
+import logging
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, Optional, Set, Tuple
+from uuid import uuid4
+
+import asyncpg
+from sqlalchemy import text
+
+from ..core.database import db_manager
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_RUN_STATUSES = ("completed", "failed", "cancelled", "interrupted")
+
+RUN_DONE_CHANNEL = "aegra_run_done"
+RUN_STOP_CHANNEL = "aegra_run_stop"
+RECONNECT_DELAY = 1.0
+
+
+class RunWatch:
+    """Wake-up signal for one run or thread; clear it before each check"""
+
+    __slots__ = ("_event",)
+
+    def __init__(self):
+        self._event = asyncio.Event()
+
+    def clear(self) -> None:
+        self._event.clear()
+
+    def set(self) -> None:
+        self._event.set()
+
+    async def wait(self, timeout: Optional[float] = None) -> bool:
+        """Wait for a notification; False if the timeout expired first"""
+        try:
+            await asyncio.wait_for(self._event.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+
+class RunCompletionNotifier:
+    """Registry of local waiters plus cross-process relay of run completions"""
+
+    def __init__(self):
+        # Identifies this process so it can ignore its own notifications
+        self._origin = uuid4().hex[:12]
+        self._watches: Dict[str, Set[RunWatch]] = {}
+        # Called with (run_id, status) for stop requests from other processes
+        self._stop_handler: Optional[Callable[[str, str], bool]] = None
+        self._outbox: asyncio.Queue[Tuple[str, str]] = asyncio.Queue()
+        self._publisher_task: Optional[asyncio.Task] = None
+        self._listener_task: Optional[asyncio.Task] = None
+        self._listening = False
+
+    @contextmanager
+    def watch_run(self, run_id: str) -> Iterator[RunWatch]:
+        """Signal set whenever the run ends or is deleted"""
+        with self._watch(f"run:{run_id}") as watch:
+            yield watch
+
+    @contextmanager
+    def watch_thread(self, thread_id: str) -> Iterator[RunWatch]:
+        """Signal set whenever any run on the thread ends or is deleted"""
+        with self._watch(f"thread:{thread_id}") as watch:
+            yield watch
+
+    def publish(self, run_id: str, thread_id: str) -> None:
+        """Announce that a run ended or was deleted; call after committing"""
+        self._wake(run_id, thread_id)
+        if self._publisher_task is not None:
+            self._outbox.put_nowait((RUN_DONE_CHANNEL, f"{self._origin}|{run_id}|{thread_id}"))
+
+    def on_stop_request(self, handler: Callable[[str, str], bool]) -> None:
+        """Set the handler stopping runs executed by this process"""
+        self._stop_handler = handler
+
+    def request_stop(self, run_id: str, status: str) -> None:
+        """Ask the other processes to stop the run with ``status`` if they execute it.
+
+        Watch the run to learn when its execution let go.
+        """
+        if self._publisher_task is not None:
+            self._outbox.put_nowait((RUN_STOP_CHANNEL, f"{self._origin}|{run_id}|{status}"))
+
+    def get_metrics(self) -> Dict[str, object]:
+        return {
+            "listening": self._listening,
+            "waiters": sum(len(watches) for watches in self._watches.values()),
+        }
+
+    async def start(self) -> None:
+        if self._publisher_task is None or self._publisher_task.done():
+            self._publisher_task = asyncio.create_task(self._publish_loop())
+        if self._listener_task is None or self._listener_task.done():
+            self._listener_task = asyncio.create_task(self._listen_loop())
+
+    async def stop(self) -> None:
+        for task in (self._listener_task, self._publisher_task):
+            if task and not task.done():
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        # Runs finished during shutdown must still reach the other processes
+        messages = []
+        while not self._outbox.empty():
+            messages.append(self._outbox.get_nowait())
+        if messages:
+            try:
+                await self._send(messages)
+            except Exception as e:
+                logger.error(f"Error publishing run completions on shutdown: {e}")
+
+    @contextmanager
+    def _watch(self, key: str) -> Iterator[RunWatch]:
+        watch = RunWatch()
+        self._watches.setdefault(key, set()).add(watch)
+        try:
+            yield watch
+        finally:
+            watches = self._watches.get(key)
+            if watches is not None:
+                watches.discard(watch)
+                if not watches:
+                    del self._watches[key]
+
+    def _wake(self, run_id: str, thread_id: str) -> None:
+        for key in (f"run:{run_id}", f"thread:{thread_id}"):
+            for watch in self._watches.get(key, ()):
+                watch.set()
+
+    def _wake_all(self) -> None:
+        for watches in self._watches.values():
+            for watch in watches:
+                watch.set()
+
+    async def _publish_loop(self) -> None:
+        """Drain the outbox, sending everything queued so far in one transaction"""
+        while True:
+            try:
+                messages = [await self._outbox.get()]
+                while not self._outbox.empty():
+                    messages.append(self._outbox.get_nowait())
+                await self._send(messages)
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Error publishing run completions: {e}")
+
+    async def _send(self, messages: list[Tuple[str, str]]) -> None:
+        async with db_manager.get_engine().begin() as conn:
+            await conn.execute(
+                text(
+                    "SELECT pg_notify(c, m) "
+                    "FROM unnest(CAST(:channels AS text[]), CAST(:messages AS text[])) WITH ORDINALITY AS t(c, m, i)"
+                ),
+                {"channels": [c for c, _ in messages], "messages": [m for _, m in messages]},
+            )
+
+    async def _listen_loop(self) -> None:
+        """LISTEN for runs ended by other processes, reconnecting on failure"""
+        dsn = db_manager.get_engine().url.set(drivername="postgresql").render_as_string(hide_password=False)
+        while True:
+            conn = None
+            try:
+                conn = await asyncpg.connect(dsn)
+                closed = asyncio.Event()
+                conn.add_termination_listener(lambda _conn: closed.set())
+                await conn.add_listener(RUN_DONE_CHANNEL, self._on_notification)
+                await conn.add_listener(RUN_STOP_CHANNEL, self._on_stop_notification)
+                self._listening = True
+                # Completions may have been missed while disconnected
+                self._wake_all()
+                await closed.wait()
+                logger.warning("Run completion LISTEN connection closed; reconnecting")
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.warning(f"Run completion LISTEN connection unavailable, waking local waiters only: {e}")
+            finally:
+                self._listening = False
+                if conn is not None and not conn.is_closed():
+                    await conn.close()
+            await asyncio.sleep(RECONNECT_DELAY)
+
+    def _on_notification(self, _conn, _pid: int, _channel: str, message: str) -> None:
+        try:
+            origin, run_id, thread_id = message.split("|", 2)
+            if origin != self._origin:
+                self._wake(run_id, thread_id)
+        except Exception as e:
+            logger.error(f"Error handling run completion notification: {e}")
+
+    def _on_stop_notification(self, _conn, _pid: int, _channel: str, message: str) -> None:
+        try:
+            origin, run_id, status = message.split("|", 2)
+            if origin != self._origin and self._stop_handler is not None:
+                self._stop_handler(run_id, status)
+        except Exception as e:
+            logger.error(f"Error handling run stop request: {e}")
+
+
+# Global run completion notifier
+run_completion = RunCompletionNotifier()
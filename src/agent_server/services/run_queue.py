@@ -0,0 +1,354 @@
+"""Durable run queue backed by the runs table.
+
+With ``RUN_EXECUTION_MODE=queue`` API processes only persist new runs, with
+the arguments needed to execute them in ``runs.kwargs``, and notify the
+workers. Worker processes (``python -m src.agent_server.worker``) claim
+pending runs with ``FOR UPDATE SKIP LOCKED``, so any number of them can
+share one Postgres without executing a run twice. Runs survive API
+restarts and are spread over whichever workers have free capacity.
+
+A claimed run carries a lease that its worker renews while executing it. If
+the worker dies, the lease expires and another worker claims the run again;
+a worker that stops gracefully hands its unfinished runs back to the queue.
+Either way the run continues from its last checkpoint.
+
+Live streaming from a worker to the API process goes through the Postgres
+broker, so queue mode needs ``BROKER_BACKEND=postgres``.
+"""
+import asyncio
+import logging
+import os
+import socket
+from typing import Any, Dict, List, NamedTuple, Optional, Set
+from uuid import uuid4
+
+import asyncpg
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..core.database import db_manager
+from ..models import User
+
+logger = logging.getLogger(__name__)
+
+# inline: execute runs as tasks of the API process; queue: leave them to workers
+RUN_EXECUTION_MODE = os.getenv("RUN_EXECUTION_MODE", "inline").lower()
+# Runs executed at the same time by one worker process
+RUN_WORKER_CONCURRENCY = int(os.getenv("RUN_WORKER_CONCURRENCY", "4"))
+# Fallback polling interval when no queue notification arrives
+RUN_QUEUE_POLL_INTERVAL = float(os.getenv("RUN_QUEUE_POLL_INTERVAL", "1.0"))
+# Seconds a stopping worker waits for its runs before handing them back to the queue
+RUN_WORKER_SHUTDOWN_TIMEOUT = float(os.getenv("RUN_WORKER_SHUTDOWN_TIMEOUT", "30"))
+# A claimed run is claimed again if its worker did not renew the lease for
+# this many seconds; leases are renewed every third of it
+RUN_QUEUE_LEASE_SECONDS = float(os.getenv("RUN_QUEUE_LEASE_SECONDS", "30"))
+
+RUN_QUEUE_CHANNEL = "aegra_run_queue"
+RECONNECT_DELAY = 1.0
+
+# Runs whose execution is being cancelled only to hand them back to the queue
+_requeued_runs: Set[str] = set()
+
+
+def run_was_requeued(run_id: str) -> bool:
+    """Whether the run's local execution stops because another worker takes it over"""
+    return run_id in _requeued_runs
+
+
+def queue_enabled() -> bool:
+    return RUN_EXECUTION_MODE == "queue"
+
+
+def check_queue_config() -> None:
+    """Warn about settings under which queued runs cannot be streamed live"""
+    if queue_enabled() and os.getenv("BROKER_BACKEND", "memory").lower() != "postgres":
+        logger.warning(
+            "RUN_EXECUTION_MODE is 'queue' but BROKER_BACKEND is not 'postgres'; "
+            "live streams will not receive events from worker processes"
+        )
+
+
+class QueuedRun(NamedTuple):
+    """A claimed run and everything needed to execute it"""
+    run_id: str
+    thread_id: str
+    input: Dict[str, Any]
+    config: Optional[Dict[str, Any]]
+    context: Optional[Dict[str, Any]]
+    kwargs: Dict[str, Any]
+    # A worker executed the run before (and crashed or handed it back)
+    recovered: bool = False
+
+    @property
+    def user(self) -> User:
+        return User(**self.kwargs["user"])
+
+
+async def notify_run_queued(session: AsyncSession, run_id: str) -> None:
+    """Wake up idle workers once the session's transaction commits"""
+    await session.execute(text("SELECT pg_notify(:channel, :run_id)"), {"channel": RUN_QUEUE_CHANNEL, "run_id": run_id})
+
+
+async def claim_runs(worker_id: str, limit: int) -> List[QueuedRun]:
+    """Atomically lease up to ``limit`` queued runs to a worker and return them, oldest first.
+
+    Runs whose lease expired are claimed again, ahead of later runs on the
+    same thread.
+    """
+    if limit <= 0:
+        return []
+    engine = db_manager.get_engine()
+    async with engine.begin() as conn:
+        rs = await conn.execute(
+            text(
+                """
+                WITH claimable AS (
+                    SELECT run_id, claimed_by IS NOT NULL AS recovered FROM runs r
+                    WHERE kwargs IS NOT NULL
+                      -- Streaming runs are created as 'streaming' instead of 'pending'
+                      AND (status IN ('pending', 'streaming') OR (status = 'running' AND lease_expires_at < now()))
+                      -- One run per thread at a time, in creation order (multitask_strategy=enqueue)
+                      AND NOT EXISTS (
+                          SELECT 1 FROM runs e
+                          WHERE e.thread_id = r.thread_id AND e.run_id <> r.run_id
+                            AND (
+                                (e.status = 'running' AND (e.lease_expires_at IS NULL OR e.lease_expires_at >= now()))
+                                OR (e.status IN ('pending', 'streaming', 'running')
+                                    AND (e.created_at, e.run_id) < (r.created_at, r.run_id))
+                            )
+                      )
+                    ORDER BY created_at
+                    LIMIT :limit
+                    FOR UPDATE SKIP LOCKED
+                )
+                UPDATE runs SET
+                    status = 'running',
+                    claimed_by = :worker_id,
+                    lease_expires_at = now() + make_interval(secs => :lease_seconds),
+                    updated_at = now()
+                FROM claimable c
+                WHERE runs.run_id = c.run_id
+                RETURNING runs.run_id, thread_id, input, config, context, kwargs, created_at, c.recovered
+                """
+            ),
+            {"worker_id": worker_id, "limit": limit, "lease_seconds": RUN_QUEUE_LEASE_SECONDS},
+        )
+        rows = sorted(rs.fetchall(), key=lambda r: r.created_at)
+    return [
+        QueuedRun(r.run_id, r.thread_id, r.input or {}, r.config, r.context, r.kwargs, r.recovered)
+        for r in rows
+    ]
+
+
+async def renew_leases(worker_id: str, run_ids: List[str]) -> Set[str]:
+    """Extend the worker's leases on its running runs; returns the runs it still holds"""
+    if not run_ids:
+        return set()
+    engine = db_manager.get_engine()
+    async with engine.begin() as conn:
+        rs = await conn.execute(
+            text(
+                """
+                UPDATE runs SET lease_expires_at = now() + make_interval(secs => :lease_seconds)
+                WHERE run_id = ANY(CAST(:run_ids AS text[])) AND claimed_by = :worker_id AND status = 'running'
+                RETURNING run_id
+                """
+            ),
+            {"worker_id": worker_id, "run_ids": run_ids, "lease_seconds": RUN_QUEUE_LEASE_SECONDS},
+        )
+        return {r.run_id for r in rs.fetchall()}
+
+
+async def requeue_runs(worker_id: str, run_ids: List[str]) -> List[str]:
+    """Hand runs the worker still holds back to the queue; returns those requeued"""
+    if not run_ids:
+        return []
+    engine = db_manager.get_engine()
+    async with engine.begin() as conn:
+        rs = await conn.execute(
+            text(
+                """
+                UPDATE runs SET status = 'pending', lease_expires_at = NULL, updated_at = now()
+                WHERE run_id = ANY(CAST(:run_ids AS text[])) AND claimed_by = :worker_id AND status = 'running'
+                RETURNING run_id
+                """
+            ),
+            {"worker_id": worker_id, "run_ids": run_ids},
+        )
+        requeued = [r.run_id for r in rs.fetchall()]
+        if requeued:
+            await conn.execute(
+                text("SELECT pg_notify(:channel, run_id) FROM unnest(CAST(:run_ids AS text[])) AS t(run_id)"),
+                {"channel": RUN_QUEUE_CHANNEL, "run_ids": requeued},
+            )
+        return requeued
+
+
+async def get_stopped_runs(run_ids: List[str]) -> Dict[str, Optional[str]]:
+    """Return {run_id: status} for runs that were cancelled, interrupted or deleted through the API"""
+    if not run_ids:
+        return {}
+    engine = db_manager.get_engine()
+    async with engine.begin() as conn:
+        rs = await conn.execute(
+            text(
+                """
+                SELECT ids.run_id, runs.status
+                FROM unnest(CAST(:run_ids AS text[])) AS ids(run_id)
+                LEFT JOIN runs ON runs.run_id = ids.run_id
+                WHERE runs.run_id IS NULL OR runs.status IN ('cancelled', 'interrupted')
+                """
+            ),
+            {"run_ids": run_ids},
+        )
+        return {r.run_id: r.status for r in rs.fetchall()}
+
+
+class RunWorker:
+    """Claims queued runs and executes them, at most ``concurrency`` at a time"""
+
+    def __init__(self, concurrency: int = RUN_WORKER_CONCURRENCY):
+        self.concurrency = concurrency
+        # Recorded as claimed_by on the runs this worker executes
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid4().hex[:8]}"
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._wakeup = asyncio.Event()
+        self._stopping = asyncio.Event()
+        self._listener_task: Optional[asyncio.Task] = None
+        self._lease_task: Optional[asyncio.Task] = None
+
+    def stop(self) -> None:
+        """Stop claiming runs; :meth:`run` returns once in-flight runs settle"""
+        self._stopping.set()
+        self._wakeup.set()
+
+    async def run(self) -> None:
+        self._listener_task = asyncio.create_task(self._listen_loop())
+        # Renews leases until in-flight runs settle, draining included
+        self._lease_task = asyncio.create_task(self._lease_loop())
+        logger.info(f"Run worker {self.worker_id} started with concurrency {self.concurrency}")
+        try:
+            while not self._stopping.is_set():
+                try:
+                    await self._stop_cancelled_runs()
+                    for queued in await claim_runs(self.worker_id, self.concurrency - len(self._tasks)):
+                        self._start(queued)
+                except Exception as e:
+                    logger.error(f"Error polling run queue: {e}")
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=RUN_QUEUE_POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self._listener_task.cancel()
+            try:
+                await self._drain()
+            finally:
+                self._lease_task.cancel()
+
+    def _start(self, queued: QueuedRun) -> None:
+        # Lazy import to avoid cycles (api.runs imports this module)
+        from ..api.runs import active_runs, execute_run_async
+
+        kwargs = queued.kwargs
+        task = asyncio.create_task(
+            execute_run_async(
+                queued.run_id,
+                queued.thread_id,
+                kwargs["graph_id"],
+                queued.input,
+                queued.user,
+                config=queued.config,
+                context=queued.context,
+                stream_mode=kwargs.get("stream_mode"),
+                checkpoint=kwargs.get("checkpoint"),
+                command=kwargs.get("command"),
+                interrupt_before=kwargs.get("interrupt_before"),
+                interrupt_after=kwargs.get("interrupt_after"),
+                multitask_strategy=kwargs.get("multitask_strategy"),
+                subgraphs=kwargs.get("stream_subgraphs"),
+                recovered=queued.recovered,
+            )
+        )
+        self._tasks[queued.run_id] = task
+        active_runs[queued.run_id] = task
+        task.add_done_callback(lambda t, run_id=queued.run_id: self._on_done(run_id, t))
+        action = "Reclaimed" if queued.recovered else "Claimed"
+        logger.info(f"{action} run {queued.run_id} ({len(self._tasks)}/{self.concurrency} slots busy)")
+
+    def _on_done(self, run_id: str, task: asyncio.Task) -> None:
+        self._tasks.pop(run_id, None)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Run {run_id} failed: {task.exception()}")
+        # A slot is free again
+        self._wakeup.set()
+
+    async def _stop_cancelled_runs(self) -> None:
+        """Cancel local executions of runs stopped through the API of any process"""
+        for run_id in await get_stopped_runs(list(self._tasks)):
+            task = self._tasks.get(run_id)
+            if task and not task.done():
+                logger.info(f"Stopping run {run_id} at the API's request")
+                task.cancel()
+
+    async def _drain(self) -> None:
+        """Wait for in-flight runs, then hand those still executing back to the queue"""
+        tasks = list(self._tasks.values())
+        if not tasks:
+            return
+        logger.info(f"Waiting up to {RUN_WORKER_SHUTDOWN_TIMEOUT}s for {len(tasks)} runs to finish")
+        await asyncio.wait(tasks, timeout=RUN_WORKER_SHUTDOWN_TIMEOUT)
+        unfinished = {run_id: task for run_id, task in self._tasks.items() if not task.done()}
+        if not unfinished:
+            return
+        # Their executions stop without recording a final status...
+        _requeued_runs.update(unfinished)
+        try:
+            for task in unfinished.values():
+                task.cancel()
+            await asyncio.gather(*unfinished.values(), return_exceptions=True)
+            # ...and the next worker continues them from their last checkpoint
+            requeued = await requeue_runs(self.worker_id, list(unfinished))
+            logger.info(f"Handed {len(requeued)} unfinished runs back to the queue")
+        finally:
+            _requeued_runs.difference_update(unfinished)
+
+    async def _lease_loop(self) -> None:
+        """Renew the leases of in-flight runs so no other worker claims them"""
+        while True:
+            try:
+                await asyncio.sleep(RUN_QUEUE_LEASE_SECONDS / 3)
+                run_ids = [run_id for run_id, task in self._tasks.items() if not task.done()]
+                held = await renew_leases(self.worker_id, run_ids)
+                for run_id in set(run_ids) - held:
+                    task = self._tasks.get(run_id)
+                    if task is not None and not task.done():
+                        # Stopped through the API, or claimed by another
+                        # worker after renewals failed for a whole lease
+                        logger.warning(f"Worker {self.worker_id} no longer holds the lease of run {run_id}")
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Error renewing run leases: {e}")
+
+    async def _listen_loop(self) -> None:
+        """LISTEN for newly queued runs, reconnecting on failure; polling covers any gaps"""
+        dsn = db_manager.get_engine().url.set(drivername="postgresql").render_as_string(hide_password=False)
+        while True:
+            conn = None
+            try:
+                conn = await asyncpg.connect(dsn)
+                closed = asyncio.Event()
+                conn.add_termination_listener(lambda _conn: closed.set())
+                await conn.add_listener(RUN_QUEUE_CHANNEL, lambda *_args: self._wakeup.set())
+                await closed.wait()
+                logger.warning("Run queue LISTEN connection closed; reconnecting")
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.warning(f"Run queue LISTEN connection unavailable, polling only: {e}")
+            finally:
+                if conn is not None and not conn.is_closed():
+                    await conn.close()
+            await asyncio.sleep(RECONNECT_DELAY)
@@ -0,0 +1,40 @@
+"""Runs without a thread (``/runs/wait``, ``/runs/stream``, stateless batches).
+
+They execute on a copy of the graph without a checkpointer and leave no
+trace in the database: no thread, run, event or checkpoint rows. A
+stateless run lives as long as the request that started it; interrupts are
+not available since resuming needs a checkpoint.
+"""
+from typing import Any, Dict, Optional, Tuple
+
+from ..core.auth_ctx import with_auth_ctx
+from ..models import User
+from .langgraph_service import create_run_config, get_langgraph_service
+from .run_admission import RunTicket, run_admission
+
+
+async def get_stateless_run(
+    run_id: str, graph_id: str, user: User, config: Optional[Dict[str, Any]] = None
+) -> Tuple[Any, Dict[str, Any]]:
+    """Return the stateless graph and the run config to execute it with"""
+    graph = await get_langgraph_service().get_stateless_graph(graph_id)
+    run_config = create_run_config(run_id, None, user, config or {})
+    # There is no thread to scope checkpoints to
+    if run_config["configurable"].get("thread_id") is None:
+        run_config["configurable"].pop("thread_id", None)
+    return graph, run_config
+
+
+async def invoke_stateless(
+    ticket: RunTicket,
+    graph_id: str,
+    input_data: Dict[str, Any],
+    user: User,
+    config: Optional[Dict[str, Any]] = None,
+    context: Optional[Dict[str, Any]] = None,
+) -> Any:
+    """Execute a graph to completion once the ticket is admitted; returns the final values"""
+    async with run_admission.hold(ticket):
+        graph, run_config = await get_stateless_run(ticket.run_id, graph_id, user, config)
+        async with with_auth_ctx(user, []):
+            return await graph.ainvoke(input_data, config=run_config, context=context)
@@ -1,6 +1,7 @@
 """Streaming service for orchestrating SSE streaming"""
 import asyncio
 import logging
+from contextlib import aclosing
 from typing import Dict, AsyncIterator, Optional, Any
 
 from ..models import Run
@@ -8,9 +9,17 @@ from ..core.sse import (
     create_metadata_event, create_error_event
 )
 from ..utils import generate_event_id, extract_event_sequence
-from .event_store import event_store, store_sse_event
+from .event_store import EVENT_STORE_REPLAY_CHUNK_SIZE, event_store
 from .broker import broker_manager
+from .base_broker import BrokerResyncRequired, SlowConsumerDisconnected
 from .event_converter import EventConverter
+from .event_cache import event_cache
+from .values_delta import (
+    DELTA_TYPE,
+    EVENT_STORE_VALUES_DELTA,
+    ValuesDeltaDecoder,
+    ValuesDeltaEncoder,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -21,6 +30,8 @@ class StreamingService:
     def __init__(self):
         self.event_counters: Dict[str, int] = {}
         self.event_converter = EventConverter()
+        # Per-run state for delta-encoding stored values events (opt-in)
+        self.values_encoders: Dict[str, ValuesDeltaEncoder] = {}
     
     def _process_interrupt_updates(self, raw_event: Any, only_interrupt_updates: bool) -> tuple[Any, bool]:
         """Process interrupt updates logic - returns (processed_event, should_skip)"""
@@ -56,78 +67,45 @@ class StreamingService:
             pass  # Ignore format issues
         return self.event_counters.get(run_id, 0)
     
-    async def put_to_broker(self, run_id: str, event_id: str, raw_event: Any, only_interrupt_updates: bool = False):
-        """Put an event into the run's broker queue for live consumers"""
+    async def publish_event(self, run_id: str, event_id: str, raw_event: Any, only_interrupt_updates: bool = False):
+        """Serialize an event once, then deliver it to live consumers and store it for replay"""
         broker = broker_manager.get_or_create_broker(run_id)
+        if run_id not in self.event_counters:
+            # This worker produces the whole run, so it can cache all of it
+            event_cache.start_run(run_id)
         self._next_event_counter(run_id, event_id)
         
         processed_event, should_skip = self._process_interrupt_updates(raw_event, only_interrupt_updates)
         if should_skip:
             return
-            
-        await broker.put(event_id, processed_event)
+        
+        values_encoder = None
+        if EVENT_STORE_VALUES_DELTA:
+            values_encoder = self.values_encoders.setdefault(run_id, ValuesDeltaEncoder())
+        encoded = self.event_converter.encode_raw_event(event_id, processed_event, values_encoder)
+        if encoded is None:
+            return
+        if encoded.frame is not None:
+            await broker.put(event_id, encoded)
+        if encoded.stored_data is not None:
+            event_store.enqueue_encoded(run_id, event_id, encoded.stored_event, encoded.stored_data, encoded.frame)
+            # Replays of stored events can be served from memory
+            event_cache.append(run_id, self._extract_event_sequence(event_id), encoded.frame)
     
+    async def flush_stored_events(self, run_id: str):
+        """Wait until every event stored for a run so far is durable"""
+        await event_store.flush(run_id)
     
-    async def store_event_from_raw(self, run_id: str, event_id: str, raw_event: Any, only_interrupt_updates: bool = False):
-        """Convert raw event to stored format and store it"""
-        processed_event, should_skip = self._process_interrupt_updates(raw_event, only_interrupt_updates)
-        if should_skip:
-            return
-        
-        # Parse the processed event
-        node_path = None
-        stream_mode_label = None
-        event_payload = None
-
-        if isinstance(processed_event, tuple):
-            if len(processed_event) == 2:
-                stream_mode_label, event_payload = processed_event
-            elif len(processed_event) == 3:
-                node_path, stream_mode_label, event_payload = processed_event
-        else:
-            stream_mode_label = "values"
-            event_payload = processed_event
-
-        # Store based on stream mode
-        if stream_mode_label == "messages":
-            await store_sse_event(
-                run_id,
-                event_id,
-                "messages",
-                {
-                    "type": "messages_stream",
-                    "message_chunk": event_payload[0] if isinstance(event_payload, tuple) and len(event_payload) >= 1 else event_payload,
-                    "metadata": event_payload[1] if isinstance(event_payload, tuple) and len(event_payload) >= 2 else None,
-                    "node_path": node_path,
-                },
-            )
-        elif stream_mode_label == "values":
-            await store_sse_event(
-                run_id,
-                event_id,
-                "values",
-                {"type": "execution_values", "chunk": event_payload},
-            )
-        elif stream_mode_label == "updates":
-            await store_sse_event(
-                run_id,
-                event_id,
-                "values",
-                {"type": "execution_values", "chunk": event_payload},
-            )
-        elif stream_mode_label == "end":
-            await store_sse_event(
-                run_id,
-                event_id,
-                "end",
-                {"type": "run_complete", "status": event_payload.get("status", "completed"), "final_output": event_payload.get("final_output")},
-            )
-        # Add other stream modes as needed
+    def _next_signal_counter(self, run_id: str) -> int:
+        """Sequence of a run's final event; only tracked where the run executes"""
+        counter = self.event_counters.get(run_id, 0) + 1
+        if run_id in self.event_counters:
+            self.event_counters[run_id] = counter
+        return counter
     
     async def signal_run_cancelled(self, run_id: str):
         """Signal that a run was cancelled"""
-        counter = self.event_counters.get(run_id, 0) + 1
-        self.event_counters[run_id] = counter
+        counter = self._next_signal_counter(run_id)
         event_id = generate_event_id(run_id, counter)
         
         broker = broker_manager.get_or_create_broker(run_id)
@@ -138,8 +116,7 @@ class StreamingService:
     
     async def signal_run_error(self, run_id: str, error_message: str):
         """Signal that a run encountered an error"""
-        counter = self.event_counters.get(run_id, 0) + 1
-        self.event_counters[run_id] = counter
+        counter = self._next_signal_counter(run_id)
         event_id = generate_event_id(run_id, counter)
         
         broker = broker_manager.get_or_create_broker(run_id)
@@ -160,6 +137,8 @@ class StreamingService:
     ) -> AsyncIterator[str]:
         """Stream run execution with unified producer-consumer pattern"""
         run_id = run.run_id
+        broker = None
+        subscriber = None
         try:
             # Send metadata event first (sequence 0, not stored)
             if not last_event_id:
@@ -167,16 +146,22 @@ class StreamingService:
                 metadata_event = create_metadata_event(run_id, event_id)
                 yield metadata_event
             
+            # Subscribe before replaying so that events published while the
+            # replay runs (possibly by another worker) are retained
+            broker = broker_manager.get_or_create_broker(run_id)
+            subscriber = broker.subscribe()
+            
             # Replay stored events first
             last_sent_sequence = 0
             if last_event_id:
                 last_sent_sequence = self._extract_event_sequence(last_event_id)
             
-            async for sse_event in self._replay_stored_events(run_id, last_event_id):
-                yield sse_event
+            async for sequence, frames in self._replay_stored_chunks(run_id, last_event_id):
+                yield frames
+                last_sent_sequence = max(last_sent_sequence, sequence)
             
             # Stream live events if run is still active
-            async for sse_event in self._stream_live_events(run, last_sent_sequence):
+            async for sse_event in self._stream_live_events(run, last_sent_sequence, subscriber):
                 yield sse_event
                 
         except asyncio.CancelledError:
@@ -187,40 +172,137 @@ class StreamingService:
         except Exception as e:
             logger.error(f"Error in stream_run_execution for run {run_id}: {e}")
             yield create_error_event(str(e))
+        finally:
+            if subscriber is not None:
+                broker.unsubscribe(subscriber)
     
-    async def _replay_stored_events(self, run_id: str, last_event_id: Optional[str]) -> AsyncIterator[str]:
-        """Replay stored events"""
-        if last_event_id:
-            stored_events = await event_store.get_events_since(run_id, last_event_id)
-        else:
-            stored_events = await event_store.get_all_events(run_id)
+    async def _replay_stored_chunks(self, run_id: str, last_event_id: Optional[str]) -> AsyncIterator[tuple[int, str]]:
+        """Replay stored events as (last sequence, frames) pairs, many frames per chunk.
 
-        for ev in stored_events:
-            sse_event = self._stored_event_to_sse(run_id, ev)
+        Each chunk is one write to the response instead of one per event.
+        """
+        chunk: list[str] = []
+        size = 0
+        sequence = 0
+        async for sequence, sse_event in self._replay_stored_events(run_id, last_event_id):
+            chunk.append(sse_event)
+            size += len(sse_event)
+            if size >= EVENT_STORE_REPLAY_CHUNK_SIZE:
+                yield sequence, "".join(chunk)
+                chunk, size = [], 0
+        if chunk:
+            yield sequence, "".join(chunk)
+    
+    async def _replay_stored_events(self, run_id: str, last_event_id: Optional[str]) -> AsyncIterator[tuple[int, str]]:
+        """Replay stored events as (sequence, sse_event) pairs"""
+        last_seq = self._extract_event_sequence(last_event_id) if last_event_id else -1
+        cached = event_cache.get_since(run_id, last_seq)
+        if cached is not None:
+            for sequence, sse_event in cached:
+                yield sequence, sse_event
+            return
+        
+        values_decoder = ValuesDeltaDecoder()
+        primed_snapshot = None
+        async for ev in event_store.iter_events_since(run_id, last_seq):
+            sequence = self._extract_event_sequence(ev.id)
+            if ev.frame is not None:
+                # Stored wire frame: nothing to decode or format
+                yield sequence, ev.frame
+                continue
+            if (
+                ev.event == "values"
+                and (ev.data or {}).get("type") == DELTA_TYPE
+                and values_decoder.seq != ev.data["base_seq"]
+                and primed_snapshot != ev.data["snapshot_seq"]
+            ):
+                # Replay starts inside a delta chain (or skipped part of it
+                # via stored frames): load its base state first
+                primed_snapshot = ev.data["snapshot_seq"]
+                for base in await event_store.get_events_range(
+                    run_id, ev.data["snapshot_seq"], sequence - 1, event="values"
+                ):
+                    values_decoder.feed(self._extract_event_sequence(base.id), base.data)
+            sse_event = self._stored_event_to_sse(run_id, ev, values_decoder)
             if sse_event:
-                yield sse_event
+                yield sequence, sse_event
     
-    async def _stream_live_events(self, run: Run, last_sent_sequence: int) -> AsyncIterator[str]:
-        """Stream live events from broker"""
+    async def _stream_live_events(
+        self, run: Run, last_sent_sequence: int, subscriber: Optional[int] = None
+    ) -> AsyncIterator[str]:
+        """Stream live events from broker, starting at ``subscriber`` if given"""
         run_id = run.run_id
         broker = broker_manager.get_or_create_broker(run_id)
         
-        # If run finished and broker is done, nothing to stream
-        if run.status in ["completed", "failed", "cancelled", "interrupted"] and broker.is_finished():
+        # If run finished, everything was already replayed from the event store.
+        # The local broker may never be finished when the run executed on
+        # another worker, so don't wait on it.
+        if run.status in ["completed", "failed", "cancelled", "interrupted"]:
             return
         
-        # Stream live events
-        if broker:
-            async for event_id, raw_event in broker.aiter():
-                # Skip duplicates that were already replayed
-                current_sequence = self._extract_event_sequence(event_id)
-                if current_sequence <= last_sent_sequence:
-                    continue
+        # Stream live events; resubscribe after resyncing from the event store
+        # whenever this consumer fell behind the broker's bounded buffer
+        try:
+            while broker:
+                if subscriber is None:
+                    subscriber = broker.subscribe()
+                # Only the first event after (re)subscribing can follow a gap:
+                # from then on the subscriber's cursor keeps the events it has
+                # not read, so later sequence jumps are skipped events
+                check_gap = True
+                try:
+                    async for event_id, raw_event in broker.aiter(subscriber):
+                        # Skip duplicates that were already replayed
+                        current_sequence = self._extract_event_sequence(event_id)
+                        if current_sequence <= last_sent_sequence:
+                            continue
+                        if check_gap and current_sequence > last_sent_sequence + 1:
+                            # Events published after the replay read the store but
+                            # trimmed before subscribing: fetch them again
+                            async for sequence, sse_event in self._replay_missing_events(
+                                run_id, last_sent_sequence, current_sequence
+                            ):
+                                yield sse_event
+                                last_sent_sequence = sequence
+                        check_gap = False
 
-                sse_event = await self._convert_raw_to_sse(event_id, raw_event)
-                if sse_event:
-                    yield sse_event
-                    last_sent_sequence = current_sequence
+                        sse_event = await self._convert_raw_to_sse(event_id, raw_event)
+                        if sse_event:
+                            yield sse_event
+                            last_sent_sequence = current_sequence
+                    # A remote run's broker is also finished when its end was
+                    # seen in the database; send what its missed notifications had
+                    async for sequence, sse_event in self._replay_missing_events(run_id, last_sent_sequence):
+                        yield sse_event
+                        last_sent_sequence = sequence
+                    return
+                except BrokerResyncRequired:
+                    logger.info(f"Consumer of run {run_id} fell behind at sequence {last_sent_sequence}; resyncing from event store")
+                    # Subscribe before replaying, as for the initial replay
+                    subscriber = broker.subscribe()
+                    await event_store.flush(run_id)
+                    async for sequence, frames in self._replay_stored_chunks(
+                        run_id, generate_event_id(run_id, last_sent_sequence)
+                    ):
+                        yield frames
+                        last_sent_sequence = max(last_sent_sequence, sequence)
+                except SlowConsumerDisconnected:
+                    logger.warning(f"Disconnecting slow consumer of run {run_id} at sequence {last_sent_sequence}")
+                    return
+        finally:
+            if subscriber is not None:
+                broker.unsubscribe(subscriber)
+    
+    async def _replay_missing_events(
+        self, run_id: str, after: int, before: Optional[int] = None
+    ) -> AsyncIterator[tuple[int, str]]:
+        """Replay stored events with a sequence after ``after`` (and below ``before``, if given)"""
+        await event_store.flush(run_id)
+        async with aclosing(self._replay_stored_events(run_id, generate_event_id(run_id, after))) as events:
+            async for sequence, sse_event in events:
+                if before is not None and sequence >= before:
+                    break
+                yield sequence, sse_event
     
     def _cancel_background_task(self, run_id: str):
         """Cancel background task on disconnect"""
@@ -236,47 +318,38 @@ class StreamingService:
         """Convert a raw event from broker to SSE format"""
         return self.event_converter.convert_raw_to_sse(event_id, raw_event)
     
-    async def interrupt_run(self, run_id: str) -> bool:
-        """Interrupt a running execution"""
-        try:
+    async def signal_run_stopped(self, run_id: str, status: str):
+        """Signal that a run was stopped through the API (cancelled or interrupted)"""
+        if status == "interrupted":
             await self.signal_run_error(run_id, "Run was interrupted")
-            await self._update_run_status(run_id, "interrupted")
-            return True
-        except Exception as e:
-            logger.error(f"Error interrupting run {run_id}: {e}")
-            return False
-    
-    async def cancel_run(self, run_id: str) -> bool:
-        """Cancel a pending or running execution"""
-        try:
+        else:
             await self.signal_run_cancelled(run_id)
-            await self._update_run_status(run_id, "cancelled")
-            return True
-        except Exception as e:
-            logger.error(f"Error cancelling run {run_id}: {e}")
-            return False
-    
-    async def _update_run_status(self, run_id: str, status: str, output: Any = None, error: str = None):
-        """Update run status in database using the shared updater."""
-        try:
-            # Lazy import to avoid cycles
-            from ..api.runs import update_run_status
-            await update_run_status(run_id, status, output, error)
-        except Exception as e:
-            logger.error(f"Error updating run status for {run_id}: {e}")
     
     def is_run_streaming(self, run_id: str) -> bool:
         """Check if run is currently active (has a broker)"""
         broker = broker_manager.get_broker(run_id)
         return broker is not None and not broker.is_finished()
     
-    async def cleanup_run(self, run_id: str):
-        """Clean up streaming resources for a run"""
-        broker_manager.cleanup_broker(run_id)
+    def resume_run(self, run_id: str, last_sequence: int):
+        """Continue a run another process started; its earlier events are not cached here"""
+        self.event_counters[run_id] = last_sequence
+    
+    async def cleanup_run(self, run_id: str, finished: bool = True):
+        """Clean up streaming resources for a run whose events were flushed.
+
+        Unless the run ``finished``, its viewers are not told it ended, as
+        another process continues it.
+        """
+        if finished:
+            broker_manager.cleanup_broker(run_id)
+        else:
+            broker_manager.remove_broker(run_id)
+        self.values_encoders.pop(run_id, None)
+        self.event_counters.pop(run_id, None)
 
-    def _stored_event_to_sse(self, run_id: str, ev) -> Optional[str]:
+    def _stored_event_to_sse(self, run_id: str, ev, values_decoder: Optional[ValuesDeltaDecoder] = None) -> Optional[str]:
         """Convert stored event object to SSE string"""
-        return self.event_converter.convert_stored_to_sse(ev, run_id)
+        return self.event_converter.convert_stored_to_sse(ev, run_id, values_decoder)
 
 
 # Global streaming service instance
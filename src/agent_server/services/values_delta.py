@@ -0,0 +1,166 @@
+"""Delta encoding of stored "values" events.
+
+With ``values`` streaming every superstep carries the whole graph state, so a
+long conversation stores all of its messages again on every step. When
+enabled, the root graph's values events are stored as JSON-patch deltas
+against the previous one (item-wise appends/edits for lists, replace/remove
+for other top-level keys), with a full snapshot every ``EVENT_STORE_SNAPSHOT_INTERVAL``
+events. Replay rebuilds the full state, so clients always receive complete
+``values`` events.
+"""
+import logging
+import os
+from typing import Any, Optional, Union
+
+from ..core.sse import encode_json
+
+logger = logging.getLogger(__name__)
+
+EVENT_STORE_VALUES_DELTA = os.getenv("EVENT_STORE_VALUES_DELTA", "false").lower() == "true"
+EVENT_STORE_SNAPSHOT_INTERVAL = int(os.getenv("EVENT_STORE_SNAPSHOT_INTERVAL", "20"))
+
+DELTA_TYPE = "execution_values_delta"
+
+# Encoded top-level values: a JSON string, or the JSON strings of a list's items
+_Part = Union[str, list[str]]
+
+
+def _pointer(*tokens: str) -> str:
+    """RFC 6901 JSON pointer for the given reference tokens"""
+    return "".join("/" + t.replace("~", "~0").replace("/", "~1") for t in tokens)
+
+
+def _join(part: _Part) -> str:
+    return "[" + ",".join(part) + "]" if isinstance(part, list) else part
+
+
+class ValuesDeltaEncoder:
+    """Encodes the root-graph values events of one run as deltas.
+
+    Values are encoded key by key (and item by item for lists) so the full
+    payload and the delta are spliced from the same strings; comparing them
+    to the previous step is plain string comparison, which also catches
+    state that was mutated in place.
+    """
+
+    def __init__(self, snapshot_interval: int = EVENT_STORE_SNAPSHOT_INTERVAL):
+        self.snapshot_interval = snapshot_interval
+        self._parts: Optional[dict[str, _Part]] = None
+        self._seq: Optional[int] = None
+        self._snapshot_seq: Optional[int] = None
+        self._since_snapshot = 0
+
+    def encode(self, seq: int, values: Any) -> tuple[str, str]:
+        """Return (payload JSON, stored document JSON) for a values event"""
+        if not isinstance(values, dict) or not all(isinstance(k, str) for k in values):
+            # Only string-keyed mappings can be diffed; the next event snapshots
+            self._parts = None
+            payload_str = encode_json(values)
+            return payload_str, f'{{"type":"execution_values","chunk":{payload_str}}}'
+
+        parts: dict[str, _Part] = {
+            key: [encode_json(item) for item in value] if isinstance(value, list) else encode_json(value)
+            for key, value in values.items()
+        }
+        payload_str = "{" + ",".join(f"{encode_json(k)}:{_join(v)}" for k, v in parts.items()) + "}"
+
+        stored_str = None
+        if self._parts is not None and self._since_snapshot + 1 < self.snapshot_interval:
+            delta_str = (
+                f'{{"type":"{DELTA_TYPE}","base_seq":{self._seq},"snapshot_seq":{self._snapshot_seq},'
+                f'"patch":[{",".join(self._diff(self._parts, parts))}]}}'
+            )
+            # A delta that is not smaller than the state is not worth chaining
+            if len(delta_str) < len(payload_str):
+                stored_str = delta_str
+                self._since_snapshot += 1
+        if stored_str is None:
+            stored_str = f'{{"type":"execution_values","chunk":{payload_str},"snapshot":true}}'
+            self._snapshot_seq = seq
+            self._since_snapshot = 0
+
+        self._parts = parts
+        self._seq = seq
+        return payload_str, stored_str
+
+    def _diff(self, old: dict[str, _Part], new: dict[str, _Part]) -> list[str]:
+        """JSON-patch operations (as JSON strings) turning old into new"""
+        ops = []
+        for key in old:
+            if key not in new:
+                ops.append(f'{{"op":"remove","path":{encode_json(_pointer(key))}}}')
+        for key, part in new.items():
+            previous = old.get(key)
+            if previous == part:
+                continue
+            if isinstance(part, list) and isinstance(previous, list):
+                # Item-wise: usually just appends (add_messages), sometimes edits
+                common = min(len(part), len(previous))
+                for i in range(common):
+                    if part[i] != previous[i]:
+                        path = encode_json(_pointer(key, str(i)))
+                        ops.append(f'{{"op":"replace","path":{path},"value":{part[i]}}}')
+                for i in range(len(previous) - 1, common - 1, -1):
+                    ops.append(f'{{"op":"remove","path":{encode_json(_pointer(key, str(i)))}}}')
+                path = encode_json(_pointer(key, "-"))
+                ops.extend(f'{{"op":"add","path":{path},"value":{item}}}' for item in part[common:])
+            else:
+                op = "add" if previous is None else "replace"
+                ops.append(f'{{"op":"{op}","path":{encode_json(_pointer(key))},"value":{_join(part)}}}')
+        return ops
+
+
+def apply_patch(document: Any, patch: list[dict[str, Any]]) -> Any:
+    """Apply JSON-patch add/replace/remove operations in place"""
+    for op in patch:
+        tokens = [t.replace("~1", "/").replace("~0", "~") for t in op["path"].split("/")[1:]]
+        if not tokens:
+            document = op.get("value")
+            continue
+        parent = document
+        for token in tokens[:-1]:
+            parent = parent[int(token)] if isinstance(parent, list) else parent[token]
+        last = tokens[-1]
+        if isinstance(parent, list):
+            if op["op"] == "remove":
+                del parent[int(last)]
+            elif last == "-":
+                parent.append(op["value"])
+            elif op["op"] == "add":
+                parent.insert(int(last), op["value"])
+            else:
+                parent[int(last)] = op["value"]
+        elif op["op"] == "remove":
+            parent.pop(last, None)
+        else:
+            parent[last] = op["value"]
+    return document
+
+
+class ValuesDeltaDecoder:
+    """Rebuilds full values from stored snapshots and deltas during replay"""
+
+    def __init__(self) -> None:
+        self._seq: Optional[int] = None
+        self._state: Any = None
+
+    @property
+    def seq(self) -> Optional[int]:
+        """Sequence of the last state that was rebuilt"""
+        return self._seq
+
+    def feed(self, seq: int, data: dict[str, Any]) -> Any:
+        """Return the full values chunk for a stored values row.
+
+        Returns None for a delta whose base state was never fed.
+        """
+        if data.get("type") != DELTA_TYPE:
+            if data.get("snapshot"):
+                self._seq, self._state = seq, data.get("chunk")
+            return data.get("chunk")
+        if self._seq is None or self._seq != data.get("base_seq"):
+            logger.warning(f"Cannot rebuild values event {seq}: base event {data.get('base_seq')} is missing")
+            return None
+        self._state = apply_patch(self._state, data.get("patch", []))
+        self._seq = seq
+        return self._state
@@ -0,0 +1,76 @@
+"""Run worker process for Aegra (RUN_EXECUTION_MODE=queue).
+
+Executes runs queued by the API processes; start as many as needed against
+the same database:
+
+    python -m src.agent_server.worker
+"""
+import asyncio
+import logging
+import os
+import signal
+import sys
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Add graphs directory to Python path so react_agent can be imported
+current_dir = Path(__file__).parent.parent.parent  # Go up to aegra root
+graphs_dir = current_dir / "graphs"
+if str(graphs_dir) not in sys.path:
+    sys.path.insert(0, str(graphs_dir))
+
+from .core.database import db_manager
+from .services.run_queue import RUN_WORKER_CONCURRENCY, RunWorker, check_queue_config, queue_enabled
+
+logger = logging.getLogger(__name__)
+
+
+async def serve(concurrency: int = RUN_WORKER_CONCURRENCY) -> None:
+    """Initialize the same components as the API lifespan, then work the queue until stopped"""
+    if not queue_enabled():
+        logger.warning("RUN_EXECUTION_MODE is not 'queue'; API processes will execute their own runs")
+    check_queue_config()
+
+    await db_manager.initialize()
+
+    from .services.langgraph_service import get_langgraph_service
+    await get_langgraph_service().initialize()
+
+    from .services.event_store import event_store
+    await event_store.start_cleanup_task()
+
+    from .services.broker import broker_manager
+    await broker_manager.start()
+
+    from .services.run_completion import run_completion
+    await run_completion.start()
+
+    worker = RunWorker(concurrency)
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, worker.stop)
+
+    try:
+        await worker.run()
+    finally:
+        await broker_manager.stop()
+        await run_completion.stop()
+        await event_store.stop_cleanup_task()
+        await event_store.stop_writer()
+        await db_manager.close()
+
+
+def main() -> None:
+    logging.basicConfig(
+        level=os.getenv("LOG_LEVEL", "INFO").upper(),
+        format="%(asctime)s %(levelname)s [%(name)s] %(message)s",
+    )
+    asyncio.run(serve())
+
+
+if __name__ == "__main__":
+    main()
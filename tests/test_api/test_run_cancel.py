@@ -0,0 +1,144 @@
+"""
+Unit tests for stopping runs wherever they execute (stop_run, cancel_run_if_active).
+"""
+import asyncio
+
+import pytest
+
+from agent_server.api import runs
+
+
+class StatusSession:
+    """Session whose status lookup returns a fixed value"""
+
+    def __init__(self, status):
+        self.status = status
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def scalar(self, _stmt):
+        return self.status
+
+
+@pytest.fixture
+def recorded():
+    """Runs whose status was already recorded, so updating it is a no-op"""
+    return set()
+
+
+@pytest.fixture
+def stopped(monkeypatch, recorded):
+    """Status updates and stream signals, in order"""
+    updates = []
+
+    async def update_run_status(run_id, status, session=None):
+        updates.append((run_id, status))
+        return run_id not in recorded
+
+    async def signal_run_stopped(run_id, status):
+        updates.append((run_id, f"signalled {status}"))
+
+    monkeypatch.setattr(runs, "update_run_status", update_run_status)
+    monkeypatch.setattr(runs.streaming_service, "signal_run_stopped", signal_run_stopped)
+    return updates
+
+
+@pytest.fixture
+def remote(monkeypatch):
+    """Stop requests sent to other processes"""
+    requests = []
+    monkeypatch.setattr(runs.run_completion, "request_stop", lambda run_id, status: requests.append((run_id, status)))
+    monkeypatch.setattr(runs, "RUN_STOP_TIMEOUT", 0.05)
+    return requests
+
+
+def _status(monkeypatch, status):
+    monkeypatch.setattr(runs, "_get_session_maker", lambda: lambda: StatusSession(status))
+
+
+async def test_local_run_is_stopped_and_marked_cancelled(monkeypatch, stopped):
+    _status(monkeypatch, "pending")
+    task = asyncio.create_task(asyncio.sleep(10))
+    monkeypatch.setitem(runs.active_runs, "run-1", task)
+
+    await runs.cancel_run_if_active("run-1")
+
+    assert task.cancelled()
+    assert stopped == [("run-1", "cancelled"), ("run-1", "signalled cancelled")]
+
+
+async def test_finished_run_is_left_alone(monkeypatch, stopped):
+    _status(monkeypatch, "completed")
+
+    await runs.cancel_run_if_active("run-1")
+
+    assert stopped == []
+
+
+async def test_remote_run_records_the_status_itself(monkeypatch, stopped, remote, recorded):
+    monkeypatch.setattr(runs, "RUN_STOP_TIMEOUT", 10)
+    recorded.add("run-1")
+    # The executing process answers by announcing the run ended
+    asyncio.get_running_loop().call_later(0.01, runs.run_completion.publish, "run-1", "thread-1")
+
+    await asyncio.wait_for(runs.stop_run(StatusSession("running"), "run-1", "interrupted"), 1.0)
+
+    assert remote == [("run-1", "interrupted")]
+    # The execution recorded it; nothing left to signal here
+    assert stopped == [("run-1", "interrupted")]
+
+
+async def test_unanswered_stop_is_recorded_here(stopped, remote):
+    await runs.stop_run(StatusSession("running"), "run-1", "interrupted")
+
+    assert remote == [("run-1", "interrupted")]
+    assert stopped == [("run-1", "interrupted"), ("run-1", "signalled interrupted")]
+
+
+class TestStopRequests:
+    async def test_local_execution_is_cancelled_with_the_requested_status(self, monkeypatch):
+        task = asyncio.create_task(asyncio.sleep(10))
+        monkeypatch.setitem(runs.active_runs, "run-1", task)
+        monkeypatch.setattr(runs, "_stopping", {})
+
+        assert runs._stop_requested("run-1", "interrupted")
+        # A second request does not change the status it stops with
+        assert runs._stop_requested("run-1", "cancelled")
+        await asyncio.wait([task])
+
+        assert task.cancelled()
+        assert runs._stopping == {"run-1": "interrupted"}
+
+    async def test_finishing_execution_is_left_to_end(self, monkeypatch):
+        task = asyncio.create_task(asyncio.sleep(0.01))
+        monkeypatch.setitem(runs.active_runs, "run-1", task)
+        monkeypatch.setattr(runs, "_finishing", {"run-1"})
+
+        assert runs._stop_requested("run-1", "cancelled")
+        await task
+
+    def test_other_runs_are_not_ours(self):
+        assert not runs._stop_requested("elsewhere", "cancelled")
+
+    async def test_runs_stopped_unheard_are_found_by_polling(self, monkeypatch):
+        task = asyncio.create_task(asyncio.sleep(10))
+        monkeypatch.setitem(runs.active_runs, "run-1", task)
+        monkeypatch.setattr(runs, "_stopping", {})
+        monkeypatch.setattr(runs, "RUN_STOP_POLL_INTERVAL", 0.01)
+
+        async def get_stopped_runs(run_ids):
+            return {run_id: "interrupted" for run_id in run_ids if run_id == "run-1"}
+
+        monkeypatch.setattr(runs, "get_stopped_runs", get_stopped_runs)
+        watcher = asyncio.create_task(runs.watch_stopped_runs())
+        try:
+            await asyncio.wait_for(asyncio.wait([task]), 1.0)
+        finally:
+            watcher.cancel()
+
+        assert task.cancelled()
+        assert runs._stopping == {"run-1": "interrupted"}
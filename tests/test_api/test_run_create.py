@@ -0,0 +1,101 @@
+"""
+Unit tests for run creation (insert_run, start_run_task).
+
+These cover how insert_run reports each failed check; what INSERT_RUN_SQL
+itself does is tested against Postgres in test_integration/test_run_create_sql.py.
+"""
+from datetime import UTC, datetime
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+from agent_server.api import runs
+from agent_server.models import RunCreate, User
+
+
+class RowSession:
+    """Session whose single statement returns a fixed result row"""
+
+    def __init__(self, **row):
+        self.row = SimpleNamespace(**{"graph_id": "agent", "thread_status": "idle", "active_run_id": None,
+                                      "created": False, **row})
+        self.params = None
+
+    async def execute(self, _stmt, params):
+        self.params = params
+        row = self.row
+
+        class Result:
+            def one(self_inner):
+                return row
+        return Result()
+
+
+@pytest.fixture(autouse=True)
+def graphs(monkeypatch):
+    service = SimpleNamespace(list_graphs=lambda: {"agent": {}})
+    monkeypatch.setattr(runs, "get_langgraph_service", lambda: service)
+
+
+async def _insert(session, strategy="reject", **request):
+    request = request or {"input": {"x": 1}}
+    return await runs.insert_run(
+        session, "run-1", "thread-1", "asst-1", "pending",
+        RunCreate(assistant_id="asst-1", **request), User(identity="u"), strategy, datetime.now(UTC),
+    )
+
+
+class TestInsertRun:
+    async def test_returns_graph_when_created(self):
+        session = RowSession(created=True)
+        assert await _insert(session) == "agent"
+        assert session.params["allow_active"] is False
+        assert session.params["graph_ids"] == ["agent"]
+
+    async def test_enqueue_allows_active_runs(self):
+        session = RowSession(created=True)
+        await _insert(session, strategy="enqueue")
+        assert session.params["allow_active"] is True
+
+    @pytest.mark.parametrize(
+        "row, request_fields, status",
+        [
+            ({"graph_id": None}, {}, 404),
+            ({"graph_id": "gone"}, {}, 404),
+            ({"thread_status": None}, {}, 404),
+            ({"thread_status": "idle"}, {"command": {"resume": "yes"}}, 400),
+            ({"active_run_id": "run-0"}, {}, 409),
+        ],
+    )
+    async def test_reports_failed_check(self, row, request_fields, status):
+        with pytest.raises(HTTPException) as exc:
+            await _insert(RowSession(**row), **request_fields)
+        assert exc.value.status_code == status
+
+
+async def test_started_run_executes_its_request(monkeypatch):
+    calls = []
+
+    async def execute_run_async(*args, **kwargs):
+        calls.append((args, kwargs))
+
+    monkeypatch.setattr(runs, "execute_run_async", execute_run_async)
+    user = User(identity="u")
+    request = RunCreate(
+        assistant_id="asst-1", input={"x": 1}, config={"tags": ["t"]}, context={"c": 1}, stream_mode="updates",
+        checkpoint={"checkpoint_id": "cp-1"}, interrupt_before=["a"], interrupt_after="b", stream_subgraphs=True,
+    )
+    ticket = runs.run_admission.reserve("run-1", user.identity, "asst-1")
+
+    await runs.start_run_task(ticket, "run-1", "thread-1", "agent", request, user, "interrupt")
+
+    assert calls == [(
+        ("run-1", "thread-1", "agent", {"x": 1}, user),
+        {
+            "config": {"tags": ["t"]}, "context": {"c": 1}, "stream_mode": "updates",
+            "checkpoint": {"checkpoint_id": "cp-1"}, "command": None, "interrupt_before": ["a"],
+            "interrupt_after": "b", "multitask_strategy": "interrupt", "subgraphs": True,
+        },
+    )]
+
@@ -0,0 +1,16 @@
+"""
+Unit tests for run status transitions.
+
+What run_transition_statement does to runs and threads is tested against
+Postgres in test_integration/test_run_status_sql.py.
+"""
+from agent_server.api import runs
+
+
+def test_thread_status_mapping():
+    assert runs.THREAD_STATUS_FOR_RUN["running"] == "busy"
+    assert runs.THREAD_STATUS_FOR_RUN["interrupted"] == "interrupted"
+    for status in ("completed", "failed", "cancelled"):
+        assert runs.THREAD_STATUS_FOR_RUN[status] == "idle"
+    # Pending runs don't change their thread
+    assert "pending" not in runs.THREAD_STATUS_FOR_RUN
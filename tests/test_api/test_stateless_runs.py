@@ -0,0 +1,145 @@
+"""
+Endpoint tests for runs without a thread (/runs/wait, /runs/stream).
+"""
+import json
+from types import SimpleNamespace
+from typing import TypedDict
+
+import httpx
+import pytest
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.graph import StateGraph
+from starlette.requests import ClientDisconnect
+
+from agent_server.api import runs
+from agent_server.core.auth_deps import get_current_user
+from agent_server.core.orm import get_session
+from agent_server.models import User
+from agent_server.services import stateless_runs
+from agent_server.services.langgraph_service import LangGraphService
+from agent_server.services.run_admission import RunAdmissionController
+from tests.utils.test_helpers import DummySessionBase, create_test_app, make_client, override_get_session_dep
+
+
+class State(TypedDict):
+    n: int
+
+
+def _step(state: State) -> State:
+    return {"n": state["n"] + 1}
+
+
+@pytest.fixture
+def saver():
+    """Checkpointer of the persistent graph; stateless runs must leave it empty"""
+    return InMemorySaver()
+
+
+@pytest.fixture
+def writes():
+    """Statements the endpoints issued other than reading the assistant"""
+    return []
+
+
+@pytest.fixture
+def admission(monkeypatch):
+    controller = RunAdmissionController(max_concurrent=1, max_queued=0)
+    monkeypatch.setattr(runs, "run_admission", controller)
+    monkeypatch.setattr(stateless_runs, "run_admission", controller)
+    return controller
+
+
+@pytest.fixture
+def app(monkeypatch, saver, writes, admission):
+    builder = StateGraph(State)
+    builder.add_node("step", _step)
+    builder.set_entry_point("step")
+    builder.set_finish_point("step")
+    graph = builder.compile(checkpointer=saver)
+
+    service = LangGraphService()
+    service._graph_registry = {"agent": {"file_path": "agent.py"}}
+
+    async def get_graph(_graph_id):
+        return graph
+
+    monkeypatch.setattr(service, "get_graph", get_graph)
+    monkeypatch.setattr(runs, "get_langgraph_service", lambda: service)
+    monkeypatch.setattr(stateless_runs, "get_langgraph_service", lambda: service)
+
+    class Session(DummySessionBase):
+        async def scalar(self, _stmt):
+            return SimpleNamespace(assistant_id="asst-1", graph_id="agent")
+
+        def add(self, obj):
+            writes.append(obj)
+
+        async def execute(self, stmt, *_args):
+            writes.append(stmt)
+
+    app = create_test_app(include_runs=True, include_threads=False)
+    app.dependency_overrides[get_session] = override_get_session_dep(Session)
+    app.dependency_overrides[get_current_user] = lambda: User(identity="test-user")
+    return app
+
+
+@pytest.fixture
+def client(app):
+    return make_client(app)
+
+
+def _sse_events(body: str):
+    events = []
+    for frame in body.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in frame.splitlines() if ": " in line)
+        events.append((fields.get("event"), json.loads(fields["data"]) if "data" in fields else None))
+    return events
+
+
+def test_wait_returns_the_final_values_without_persisting(client, saver, writes, admission):
+    response = client.post("/runs/wait", json={"assistant_id": "asst-1", "input": {"n": 1}})
+
+    assert response.status_code == 200
+    assert response.json() == {"n": 2}
+    assert saver.storage == {}
+    assert writes == []
+    assert admission.get_metrics()["running"] == 0
+
+
+def test_stream_streams_the_final_values_without_persisting(client, saver, writes, admission):
+    response = client.post("/runs/stream", json={"assistant_id": "asst-1", "input": {"n": 1}})
+
+    assert response.status_code == 200
+    events = _sse_events(response.text)
+    assert events[0][0] == "metadata"
+    assert [data for event, data in events if event == "values"][-1] == {"n": 2}
+    assert saver.storage == {}
+    assert writes == []
+    assert admission.get_metrics()["running"] == 0
+
+
+async def test_stream_is_rejected_before_responding_when_full(app, admission):
+    # Tickets belong to the running loop, so the slot is taken on the app's own loop
+    admission.reserve("busy", "someone", "asst-1")
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.post("/runs/stream", json={"assistant_id": "asst-1", "input": {"n": 1}})
+
+    assert response.status_code == 429
+    assert admission.get_metrics()["queued"] == 0
+
+
+async def test_stream_gives_up_its_slot_if_never_streamed(admission):
+    ticket = admission.reserve("run-1", "test-user", "asst-1")
+    response = runs.AdmittedStreamingResponse(ticket, iter(()), media_type="text/event-stream")
+
+    async def receive():
+        return {"type": "http.disconnect"}
+
+    async def send(_message):
+        raise OSError("client went away")
+
+    with pytest.raises(ClientDisconnect):
+        await response({"type": "http", "asgi": {"spec_version": "2.4"}}, receive, send)
+    assert admission.get_metrics()["running"] == 0
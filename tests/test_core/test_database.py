@@ -0,0 +1,50 @@
+"""
+Unit tests for the pooled LangGraph checkpointer.
+"""
+import asyncio
+import contextlib
+
+from psycopg_pool import AsyncConnectionPool
+
+from agent_server.core import database
+
+
+def _pool() -> AsyncConnectionPool:
+    return AsyncConnectionPool("postgresql://localhost/unused", open=False)
+
+
+async def test_saver_lock_is_replaced_on_known_versions():
+    saver = database._pooled_saver(_pool())
+
+    assert isinstance(saver.lock, contextlib.nullcontext)
+
+
+async def test_saver_lock_is_kept_on_unknown_versions(monkeypatch):
+    monkeypatch.setattr(database.importlib.metadata, "version", lambda name: "4.0.0")
+
+    saver = database._pooled_saver(_pool())
+
+    assert isinstance(saver.lock, asyncio.Lock)
+
+
+
+def test_pooled_connection_removes_only_the_handlers_added_since_reset():
+    def log_notice(diagnostic):
+        pass
+
+    def keep(diagnostic):
+        pass
+
+    # Skip connecting: only the handler bookkeeping is exercised
+    conn = database.PooledConnection.__new__(database.PooledConnection)
+    conn._notice_handlers = [keep]
+    conn._added_notice_handlers = []
+
+    # SQLAlchemy adds its handler on every borrow
+    conn.add_notice_handler(log_notice)
+    conn.add_notice_handler(log_notice)
+    conn.remove_added_notice_handlers()
+
+    assert conn._notice_handlers == [keep]
+    conn.remove_added_notice_handlers()
+    assert conn._notice_handlers == [keep]
@@ -0,0 +1,83 @@
+"""
+Unit tests for read replica routing.
+"""
+import time
+
+from starlette.applications import Starlette
+from starlette.authentication import AuthCredentials, AuthenticationBackend, SimpleUser
+from starlette.middleware.authentication import AuthenticationMiddleware
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from agent_server.core.read_routing import WRITE_COOKIE, ReadRouter
+from agent_server.middleware import ReadYourWritesMiddleware
+
+
+class AllowAllBackend(AuthenticationBackend):
+    async def authenticate(self, conn):
+        return AuthCredentials(["authenticated"]), SimpleUser("alice")
+
+
+class TestReadRouter:
+    def test_routes_reads_to_replica_unless_user_just_wrote(self, monkeypatch):
+        monkeypatch.setattr("agent_server.core.read_routing.db_manager.has_replica", lambda: True)
+        router = ReadRouter(routes=frozenset({"threads.list"}), sticky_seconds=60)
+
+        assert router.use_replica("threads.list", "alice")
+        assert not router.use_replica("threads.get", "alice")
+
+        router.note_write("alice")
+        assert not router.use_replica("threads.list", "alice")
+        assert router.use_replica("threads.list", "bob")
+        assert router.get_metrics()["replica_reads"] == 2
+
+    def test_sticky_window_expires(self, monkeypatch):
+        monkeypatch.setattr("agent_server.core.read_routing.db_manager.has_replica", lambda: True)
+        router = ReadRouter(routes=frozenset({"threads.list"}), sticky_seconds=0)
+        router.note_write("alice")
+        assert router.use_replica("threads.list", "alice")
+
+    def test_without_replica_everything_reads_primary(self):
+        router = ReadRouter(routes=frozenset({"threads.list"}))
+        assert not router.use_replica("threads.list", "alice")
+
+    def test_write_through_another_process_is_seen_by_its_cookie(self, monkeypatch):
+        monkeypatch.setattr("agent_server.core.read_routing.db_manager.has_replica", lambda: True)
+        writer = ReadRouter(routes=frozenset({"threads.list"}), sticky_seconds=60)
+        reader = ReadRouter(routes=frozenset({"threads.list"}), sticky_seconds=60)
+
+        name, _, rest = writer.write_cookie().partition("=")
+        wrote_at = rest.split(";")[0]
+
+        assert name == WRITE_COOKIE
+        assert not reader.use_replica("threads.list", "alice", wrote_at)
+        assert reader.use_replica("threads.list", "alice", str(time.time() - 120))
+        assert reader.use_replica("threads.list", "alice", "garbage")
+
+
+class TestReadYourWritesMiddleware:
+    def _client(self):
+        async def write(request):
+            return PlainTextResponse("ok")
+
+        async def read(request):
+            request.scope.setdefault("state", {})["read_only"] = True
+            return PlainTextResponse("ok")
+
+        app = Starlette(routes=[Route("/write", write, methods=["POST"]), Route("/search", read, methods=["POST"])])
+        app.add_middleware(ReadYourWritesMiddleware)
+        app.add_middleware(AuthenticationMiddleware, backend=AllowAllBackend())
+        return TestClient(app)
+
+    def test_write_sets_the_cookie_for_other_processes(self, monkeypatch):
+        monkeypatch.setattr("agent_server.middleware.read_your_writes.db_manager.has_replica", lambda: True)
+        client = self._client()
+
+        assert WRITE_COOKIE not in client.post("/search").cookies
+        assert WRITE_COOKIE in client.post("/write").cookies
+
+    def test_no_cookie_without_replica(self, monkeypatch):
+        monkeypatch.setattr("agent_server.middleware.read_your_writes.db_manager.has_replica", lambda: False)
+
+        assert WRITE_COOKIE not in self._client().post("/write").cookies
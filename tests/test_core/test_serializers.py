@@ -0,0 +1,80 @@
+"""
+Unit tests for GeneralSerializer JSON encoding.
+"""
+import dataclasses
+import json
+from datetime import UTC, date, datetime
+from enum import Enum
+from uuid import UUID
+
+import pytest
+from langchain_core.messages import AIMessage
+
+from agent_server.core.serializers import GeneralSerializer
+
+
+class Color(Enum):
+    RED = "red"
+
+
+@dataclasses.dataclass
+class Point:
+    x: int
+    when: datetime
+
+
+DOCUMENT = {
+    "messages": [AIMessage(content="héllo ✓", id="m1")],
+    1: "one",
+    2.5: "float key",
+    False: "bool key",
+    None: "none key",
+    Color.RED: Color.RED,
+    date(2024, 1, 2): UUID(int=1),
+    "point": Point(1, datetime(2024, 1, 2, 3, 4, 5, 6, tzinfo=UTC)),
+    "tuple": ("a", 1.5, float("nan")),
+}
+
+
+@pytest.fixture
+def serializer():
+    return GeneralSerializer()
+
+
+class TestDumps:
+    def test_langchain_messages_and_non_string_keys(self, serializer):
+        decoded = json.loads(serializer.dumps(DOCUMENT))
+
+        assert decoded["messages"][0]["content"] == "héllo ✓"
+        assert decoded["messages"][0]["type"] == "ai"
+        assert decoded["1"] == "one"
+
+    def test_values_orjson_rejects_fall_back_to_stdlib(self, serializer):
+        assert serializer.dumps({"big": 2**70}) == '{"big":1180591620717411303424}'
+
+    def test_stdlib_fallback_writes_the_same_bytes(self, serializer):
+        fast = serializer.dumps(DOCUMENT)
+        # A 65-bit integer sends the whole document through the fallback
+        slow = serializer.dumps({**DOCUMENT, "big": 2**64})
+
+        assert slow == fast[:-1] + ',"big":18446744073709551616}'
+
+
+class TestTypeDispatch:
+    def test_handlers_are_resolved_per_class(self):
+        from collections import namedtuple
+
+        from langgraph.types import Interrupt
+
+        Task = namedtuple("Task", ["id", "name"])
+        serializer = GeneralSerializer()
+        data = [Task("t1", "agent"), ("a", "b"), Interrupt(value={"q": "?"}, id="i1"), {1, 2}, object]
+
+        first = serializer.serialize(data)
+        second = serializer.serialize(data)
+
+        assert first == second
+        assert first[:4] == [{"id": "t1", "name": "agent"}, ["a", "b"], {"value": {"q": "?"}, "id": "i1"}, [1, 2]]
+        assert first[4] == str(object)
+        assert GeneralSerializer._handlers[Task] is GeneralSerializer._serialize_namedtuple
+        assert GeneralSerializer._handlers[tuple] is GeneralSerializer._serialize_sequence
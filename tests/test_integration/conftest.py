@@ -0,0 +1,62 @@
+"""
+Fixtures for tests that run SQL against a real Postgres database.
+
+They need DATABASE_URL to point at a migrated database. Locally they are
+skipped without it; in CI (``CI`` set) they fail instead, so they can't
+silently stop running. Every test runs inside a transaction that is rolled
+back afterwards.
+"""
+import os
+from contextlib import asynccontextmanager
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+DATABASE_URL = os.getenv("DATABASE_URL")
+
+
+class ConnectionEngine:
+    """Stands in for db_manager: its transactions are savepoints of the test's connection"""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def get_engine(self):
+        return self
+
+    @asynccontextmanager
+    async def begin(self):
+        async with self.conn.begin_nested():
+            yield self.conn
+
+
+@pytest.fixture
+async def db_connection():
+    if not DATABASE_URL:
+        if os.getenv("CI"):
+            pytest.fail("DATABASE_URL is not set; CI must run the database tests")
+        pytest.skip("DATABASE_URL is not set")
+    engine = create_async_engine(DATABASE_URL)
+    try:
+        async with engine.connect() as conn:
+            transaction = await conn.begin()
+            try:
+                yield conn
+            finally:
+                await transaction.rollback()
+    finally:
+        await engine.dispose()
+
+
+@pytest.fixture
+async def db_session(db_connection):
+    session = AsyncSession(bind=db_connection, join_transaction_mode="create_savepoint")
+    try:
+        yield session
+    finally:
+        await session.close()
+
+
+@pytest.fixture
+def db_engine(db_connection):
+    return ConnectionEngine(db_connection)
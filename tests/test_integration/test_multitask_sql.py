@@ -0,0 +1,77 @@
+"""
+Runs the rollback strategy's checkpoint cleanup against Postgres.
+"""
+import json
+
+import pytest
+from langgraph.checkpoint.postgres.base import BasePostgresSaver
+from sqlalchemy import text
+
+from agent_server.services import multitask
+
+THREAD_ID = "it-thread"
+
+# (checkpoint_id, run_id, channel_versions)
+CHECKPOINTS = [
+    ("cp-1", "it-run-0", {"a": "1", "b": "1"}),
+    ("cp-2", "it-run-1", {"a": "2", "b": "1"}),
+    ("cp-3", "it-run-1", {"a": "3", "b": "1"}),
+]
+
+
+@pytest.fixture
+async def checkpoints(db_connection, db_engine, monkeypatch):
+    monkeypatch.setattr(multitask, "db_manager", db_engine)
+    # LangGraph creates its tables on startup; CONCURRENTLY cannot run in a transaction
+    for migration in BasePostgresSaver.MIGRATIONS:
+        if "CONCURRENTLY" not in migration:
+            await db_connection.exec_driver_sql(migration)
+    for checkpoint_id, run_id, versions in CHECKPOINTS:
+        await db_connection.execute(
+            text(
+                "INSERT INTO checkpoints (thread_id, checkpoint_id, checkpoint, metadata) "
+                "VALUES (:thread_id, :checkpoint_id, CAST(:checkpoint AS jsonb), CAST(:metadata AS jsonb))"
+            ),
+            {
+                "thread_id": THREAD_ID,
+                "checkpoint_id": checkpoint_id,
+                "checkpoint": json.dumps({"channel_versions": versions}),
+                "metadata": json.dumps({"run_id": run_id}),
+            },
+        )
+        await db_connection.execute(
+            text(
+                "INSERT INTO checkpoint_writes (thread_id, checkpoint_id, task_id, idx, channel, blob) "
+                "VALUES (:thread_id, :checkpoint_id, 'task', 0, 'a', '')"
+            ),
+            {"thread_id": THREAD_ID, "checkpoint_id": checkpoint_id},
+        )
+    for thread_id, channel, version in [
+        (THREAD_ID, "a", "1"), (THREAD_ID, "a", "2"), (THREAD_ID, "a", "3"), (THREAD_ID, "b", "1"),
+        ("it-other-thread", "a", "2"),
+    ]:
+        await db_connection.execute(
+            text(
+                "INSERT INTO checkpoint_blobs (thread_id, channel, version, type, blob) "
+                "VALUES (:thread_id, :channel, :version, 'json', '')"
+            ),
+            {"thread_id": thread_id, "channel": channel, "version": version},
+        )
+    return db_connection
+
+
+async def _rows(conn, sql):
+    return sorted(tuple(row) for row in (await conn.execute(text(sql))).fetchall())
+
+
+async def test_rollback_deletes_the_runs_checkpoints_writes_and_own_blobs(checkpoints):
+    await multitask.delete_run_checkpoints(THREAD_ID, "it-run-1")
+
+    assert await _rows(checkpoints, "SELECT checkpoint_id FROM checkpoints WHERE thread_id LIKE 'it-%'") == [("cp-1",)]
+    assert await _rows(checkpoints, "SELECT checkpoint_id FROM checkpoint_writes WHERE thread_id LIKE 'it-%'") == [
+        ("cp-1",)
+    ]
+    # b@1 is still referred to by the earlier run's checkpoint; other threads are untouched
+    assert await _rows(
+        checkpoints, "SELECT thread_id, channel, version FROM checkpoint_blobs WHERE thread_id LIKE 'it-%'"
+    ) == [("it-other-thread", "a", "2"), (THREAD_ID, "a", "1"), (THREAD_ID, "b", "1")]
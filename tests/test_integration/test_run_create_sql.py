@@ -0,0 +1,108 @@
+"""
+Runs INSERT_RUN_SQL (through insert_run) against Postgres.
+"""
+from datetime import UTC, datetime
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import select
+
+from agent_server.api import runs
+from agent_server.core.orm import Assistant, Run, Thread
+from agent_server.models import RunCreate, User
+
+ASSISTANT_ID = "it-asst"
+THREAD_ID = "it-thread"
+
+
+@pytest.fixture(autouse=True)
+def graphs(monkeypatch):
+    service = SimpleNamespace(list_graphs=lambda: {"agent": {}})
+    monkeypatch.setattr(runs, "get_langgraph_service", lambda: service)
+    monkeypatch.setattr(runs, "queue_enabled", lambda: True)
+
+
+@pytest.fixture
+async def session(db_session):
+    db_session.add(Assistant(assistant_id=ASSISTANT_ID, name="it", graph_id="agent", user_id="u"))
+    db_session.add(Thread(thread_id=THREAD_ID, status="idle", metadata_json={"owner": "me"}, user_id="u"))
+    await db_session.flush()
+    return db_session
+
+
+async def _insert(session, run_id="it-run-1", strategy="reject", assistant_id=ASSISTANT_ID,
+                  thread_id=THREAD_ID, **request):
+    request = request or {"input": {"x": 1}}
+    return await runs.insert_run(
+        session, run_id, thread_id, assistant_id, "pending",
+        RunCreate(assistant_id=assistant_id, **request), User(identity="u"), strategy, datetime.now(UTC),
+    )
+
+
+async def _status(session, model, key):
+    return (await session.execute(select(model).where(key))).scalar_one_or_none()
+
+
+class TestInsertRunSql:
+    async def test_creates_run_and_marks_thread_busy(self, session):
+        assert await _insert(session) == "agent"
+
+        thread = await _status(session, Thread, Thread.thread_id == THREAD_ID)
+        await session.refresh(thread)
+        assert thread.status == "busy"
+        assert thread.metadata_json == {"owner": "me", "assistant_id": ASSISTANT_ID, "graph_id": "agent"}
+        run = await _status(session, Run, Run.run_id == "it-run-1")
+        assert run.status == "pending"
+        assert run.input == {"x": 1}
+        assert run.kwargs["graph_id"] == "agent"
+
+    @pytest.mark.parametrize(
+        "overrides, status",
+        [
+            ({"assistant_id": "it-missing"}, 404),
+            ({"thread_id": "it-missing"}, 404),
+            ({"command": {"resume": "yes"}}, 400),
+        ],
+    )
+    async def test_failed_check_changes_nothing(self, session, overrides, status):
+        with pytest.raises(HTTPException) as exc:
+            await _insert(session, **overrides)
+        assert exc.value.status_code == status
+
+        thread = await _status(session, Thread, Thread.thread_id == THREAD_ID)
+        await session.refresh(thread)
+        assert thread.status == "idle"
+        assert thread.metadata_json == {"owner": "me"}
+        assert await _status(session, Run, Run.run_id == "it-run-1") is None
+
+    async def test_unavailable_graph_is_rejected(self, session):
+        session.add(Assistant(assistant_id="it-other", name="it", graph_id="gone", user_id="u"))
+        await session.flush()
+        with pytest.raises(HTTPException) as exc:
+            await _insert(session, assistant_id="it-other")
+        assert exc.value.status_code == 404
+        assert "Graph 'gone'" in exc.value.detail
+
+    async def test_active_run_rejects_unless_strategy_allows_it(self, session):
+        await _insert(session)
+        with pytest.raises(HTTPException) as exc:
+            await _insert(session, run_id="it-run-2")
+        assert exc.value.status_code == 409
+        assert "it-run-1" in exc.value.detail
+        assert await _status(session, Run, Run.run_id == "it-run-2") is None
+
+        assert await _insert(session, run_id="it-run-2", strategy="enqueue") == "agent"
+
+    async def test_command_resumes_an_interrupted_thread(self, session):
+        thread = await _status(session, Thread, Thread.thread_id == THREAD_ID)
+        thread.status = "interrupted"
+        await session.flush()
+
+        assert await _insert(session, command={"resume": "yes"}) == "agent"
+
+        await session.refresh(thread)
+        assert thread.status == "busy"
+        run = await _status(session, Run, Run.run_id == "it-run-1")
+        assert run.kwargs["command"] == {"resume": "yes"}
+
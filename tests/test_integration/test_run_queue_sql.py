@@ -0,0 +1,87 @@
+"""
+Runs the run queue's claim, lease and requeue statements against Postgres.
+"""
+from datetime import UTC, datetime, timedelta
+
+import pytest
+from sqlalchemy import select
+
+from agent_server.core.orm import Assistant, Run, Thread
+from agent_server.services import run_queue
+
+THREAD_ID = "it-thread"
+KWARGS = {"graph_id": "agent", "user": {"identity": "u"}}
+
+
+@pytest.fixture
+async def session(db_session, db_engine, monkeypatch):
+    monkeypatch.setattr(run_queue, "db_manager", db_engine)
+    db_session.add(Assistant(assistant_id="it-asst", name="it", graph_id="agent", user_id="u"))
+    db_session.add(Thread(thread_id=THREAD_ID, status="busy", user_id="u"))
+    await db_session.flush()
+    return db_session
+
+
+async def _add_run(session, run_id, minute, status="pending", claimed_by=None, lease=None):
+    now = datetime.now(UTC)
+    session.add(Run(
+        run_id=run_id, thread_id=THREAD_ID, assistant_id="it-asst", status=status, kwargs=KWARGS,
+        user_id="u", created_at=now + timedelta(minutes=minute), claimed_by=claimed_by,
+        lease_expires_at=None if lease is None else now + timedelta(seconds=lease),
+    ))
+    await session.flush()
+
+
+async def _run(session, run_id) -> Run:
+    return await session.scalar(select(Run).where(Run.run_id == run_id).execution_options(populate_existing=True))
+
+
+class TestRunLeases:
+    async def test_claim_leases_the_run_to_the_worker(self, session):
+        await _add_run(session, "it-run-1", 0)
+
+        claimed = await run_queue.claim_runs("w1", 10)
+
+        assert [(q.run_id, q.recovered) for q in claimed] == [("it-run-1", False)]
+        run = await _run(session, "it-run-1")
+        assert (run.status, run.claimed_by) == ("running", "w1")
+        assert run.lease_expires_at > datetime.now(UTC)
+
+    async def test_live_lease_holds_back_later_runs_on_the_thread(self, session):
+        await _add_run(session, "it-run-1", 0, status="running", claimed_by="w0", lease=30)
+        await _add_run(session, "it-run-2", 1)
+
+        assert await run_queue.claim_runs("w1", 10) == []
+
+    async def test_expired_lease_is_reclaimed_before_later_runs(self, session):
+        await _add_run(session, "it-run-1", 0, status="running", claimed_by="w0", lease=-30)
+        await _add_run(session, "it-run-2", 1)
+
+        claimed = await run_queue.claim_runs("w1", 10)
+
+        assert [(q.run_id, q.recovered) for q in claimed] == [("it-run-1", True)]
+        assert (await _run(session, "it-run-1")).claimed_by == "w1"
+        # The crashed worker cannot renew a lease it lost
+        assert await run_queue.renew_leases("w0", ["it-run-1"]) == set()
+        assert await run_queue.renew_leases("w1", ["it-run-1"]) == {"it-run-1"}
+
+    async def test_requeued_run_is_claimed_again_as_recovered(self, session):
+        await _add_run(session, "it-run-1", 0)
+        await run_queue.claim_runs("w1", 10)
+
+        assert await run_queue.requeue_runs("w1", ["it-run-1"]) == ["it-run-1"]
+        run = await _run(session, "it-run-1")
+        assert (run.status, run.lease_expires_at) == ("pending", None)
+
+        claimed = await run_queue.claim_runs("w2", 10)
+        assert [(q.run_id, q.recovered) for q in claimed] == [("it-run-1", True)]
+
+    async def test_requeue_leaves_runs_stopped_through_the_api(self, session):
+        await _add_run(session, "it-run-1", 0)
+        await run_queue.claim_runs("w1", 10)
+        run = await _run(session, "it-run-1")
+        run.status = "cancelled"
+        await session.flush()
+
+        assert await run_queue.requeue_runs("w1", ["it-run-1"]) == []
+        assert (await _run(session, "it-run-1")).status == "cancelled"
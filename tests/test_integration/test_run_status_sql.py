@@ -0,0 +1,98 @@
+"""
+Runs run status transitions (update_run_status, directly and via the cancel endpoint) against Postgres.
+"""
+import pytest
+from sqlalchemy import select
+
+from agent_server.api import runs
+from agent_server.core.orm import Assistant, Run, Thread
+from agent_server.models import User
+
+THREAD_ID = "it-thread"
+USER = User(identity="u")
+
+
+@pytest.fixture
+async def session(db_session, monkeypatch):
+    async def signal(*_args):
+        pass
+
+    monkeypatch.setattr(runs.streaming_service, "signal_run_cancelled", signal)
+    monkeypatch.setattr(runs.streaming_service, "signal_run_error", signal)
+    # No process executes these runs, so stops are never answered
+    monkeypatch.setattr(runs, "RUN_STOP_TIMEOUT", 0.01)
+    db_session.add(Assistant(assistant_id="it-asst", name="it", graph_id="agent", user_id="u"))
+    db_session.add(Thread(thread_id=THREAD_ID, status="busy", user_id="u"))
+    await db_session.flush()
+    for run_id in ("it-run-1", "it-run-2"):
+        db_session.add(Run(run_id=run_id, thread_id=THREAD_ID, assistant_id="it-asst", status="running",
+                           user_id="u"))
+    await db_session.commit()
+    return db_session
+
+
+@pytest.fixture
+def transitions(monkeypatch):
+    calls = []
+    update_run_status = runs.update_run_status
+
+    async def counting(run_id, status, *args, **kwargs):
+        calls.append((run_id, status))
+        return await update_run_status(run_id, status, *args, **kwargs)
+
+    monkeypatch.setattr(runs, "update_run_status", counting)
+    return calls
+
+
+async def _thread_status(session):
+    return await session.scalar(
+        select(Thread.status).where(Thread.thread_id == THREAD_ID).execution_options(populate_existing=True)
+    )
+
+
+async def _run(session, run_id):
+    return await session.scalar(
+        select(Run).where(Run.run_id == run_id).execution_options(populate_existing=True)
+    )
+
+
+async def _cancel(session, run_id, action="cancel"):
+    return await runs.cancel_run_endpoint(THREAD_ID, run_id, wait=0, action=action, user=USER, session=session)
+
+
+class TestRunTransitions:
+    async def test_thread_stays_busy_while_another_run_is_active(self, session, transitions):
+        run = await _cancel(session, "it-run-1")
+
+        assert run.status == "cancelled"
+        assert transitions == [("it-run-1", "cancelled")]
+        assert await _thread_status(session) == "busy"
+
+        await _cancel(session, "it-run-2")
+        assert await _thread_status(session) == "idle"
+
+    async def test_interrupt_marks_thread_interrupted_once_no_run_is_active(self, session, transitions):
+        await _cancel(session, "it-run-1")
+        run = await _cancel(session, "it-run-2", action="interrupt")
+
+        assert run.status == "interrupted"
+        assert transitions == [("it-run-1", "cancelled"), ("it-run-2", "interrupted")]
+        assert await _thread_status(session) == "interrupted"
+
+    @pytest.mark.parametrize("action, thread_status", [("cancel", "idle"), ("interrupt", "interrupted")])
+    async def test_second_transition_of_a_stopped_run_is_a_no_op(self, session, action, thread_status):
+        await _cancel(session, "it-run-1")
+        stopped = await _cancel(session, "it-run-2", action=action)
+        assert await _thread_status(session) == thread_status
+
+        # The execution finishing late, and a repeated stop through the API
+        assert not await runs.update_run_status("it-run-2", "completed", output={"late": True}, session=session)
+        assert not await runs.update_run_status("it-run-2", "failed", error="late", session=session)
+        assert not await runs.update_run_status("it-run-2", "running", session=session)
+        again = await _cancel(session, "it-run-2", action="interrupt" if action == "cancel" else "cancel")
+
+        assert again.status == stopped.status
+        run = await _run(session, "it-run-2")
+        assert (run.status, run.output, run.error_message) == (stopped.status, None, None)
+        assert run.updated_at == stopped.updated_at
+        assert await _thread_status(session) == thread_status
@@ -0,0 +1,178 @@
+"""
+Unit tests for the in-memory run broker.
+"""
+import asyncio
+
+import pytest
+
+from agent_server.services.base_broker import BrokerResyncRequired, SlowConsumerDisconnected
+from agent_server.services.broker import RunBroker
+
+
+async def _collect(broker: RunBroker) -> list:
+    return [item async for item in broker.aiter()]
+
+
+class TestRunBroker:
+    """Test event delivery and termination of RunBroker."""
+
+    async def test_delivers_events_in_order(self):
+        broker = RunBroker("run-1")
+        await broker.put("run-1_event_1", ("values", {"a": 1}))
+        await broker.put("run-1_event_2", ("values", {"a": 2}))
+        broker.mark_finished()
+
+        events = await _collect(broker)
+
+        assert [e[0] for e in events] == ["run-1_event_1", "run-1_event_2"]
+
+    async def test_idle_consumer_wakes_on_finish(self):
+        """A consumer blocked on an empty broker ends as soon as it is finished."""
+        broker = RunBroker("run-1")
+        consumer = asyncio.create_task(_collect(broker))
+        await asyncio.sleep(0)
+        assert not consumer.done()
+
+        broker.mark_finished()
+        events = await asyncio.wait_for(consumer, timeout=0.05)
+
+        assert events == []
+
+    async def test_end_event_finishes_broker(self):
+        broker = RunBroker("run-1")
+        consumer = asyncio.create_task(_collect(broker))
+        await asyncio.sleep(0)
+
+        await broker.put("run-1_event_1", ("end", {"status": "cancelled"}))
+        events = await asyncio.wait_for(consumer, timeout=0.05)
+
+        assert events == [("run-1_event_1", ("end", {"status": "cancelled"}))]
+        assert broker.is_finished()
+        assert broker.is_empty()
+
+    async def test_concurrent_subscribers_each_get_full_stream(self):
+        """Two viewers of one run both see every event (fan-out, not work-sharing)."""
+        broker = RunBroker("run-1")
+        first = asyncio.create_task(_collect(broker))
+        second = asyncio.create_task(_collect(broker))
+        await asyncio.sleep(0)
+
+        for i in range(1, 4):
+            await broker.put(f"run-1_event_{i}", ("values", {"i": i}))
+            await asyncio.sleep(0)
+        broker.mark_finished()
+
+        expected = [f"run-1_event_{i}" for i in range(1, 4)]
+        assert [e[0] for e in await first] == expected
+        assert [e[0] for e in await second] == expected
+
+    async def test_consumed_events_are_trimmed_beyond_replay_window(self):
+        broker = RunBroker("run-1", replay_window=2)
+        for i in range(1, 6):
+            await broker.put(f"run-1_event_{i}", ("values", {"i": i}))
+        broker.mark_finished()
+
+        # Without subscribers only the replay window is retained
+        events = await _collect(broker)
+
+        assert [e[0] for e in events] == ["run-1_event_4", "run-1_event_5"]
+
+
+class TestRunBrokerLateJoin:
+    """Test subscribers registered before they start reading, and late joiners."""
+
+    async def test_subscription_pins_events_before_iteration(self):
+        broker = RunBroker("run-1", replay_window=2)
+        subscriber = broker.subscribe()
+        for i in range(1, 6):
+            await broker.put(f"run-1_event_{i}", ("values", {"i": i}))
+        broker.mark_finished()
+
+        events = [item async for item in broker.aiter(subscriber)]
+
+        assert [e[0] for e in events] == [f"run-1_event_{i}" for i in range(1, 6)]
+        assert broker.subscriber_count() == 0
+
+    async def test_late_joiner_behind_trimmed_events_must_resync(self):
+        broker = RunBroker("run-1", replay_window=2)
+        for i in range(1, 6):
+            await broker.put(f"run-1_event_{i}", ("values", {"i": i}))
+
+        # Events 2 and 3 were trimmed before this subscriber joined
+        with pytest.raises(BrokerResyncRequired):
+            await broker.aiter(broker.subscribe(after_sequence=1)).__anext__()
+        assert broker.subscriber_count() == 0
+
+    async def test_late_joiner_within_replay_window_continues(self):
+        broker = RunBroker("run-1", replay_window=2)
+        for i in range(1, 6):
+            await broker.put(f"run-1_event_{i}", ("values", {"i": i}))
+        broker.mark_finished()
+
+        events = [item async for item in broker.aiter(broker.subscribe(after_sequence=3))]
+
+        assert [e[0] for e in events] == ["run-1_event_4", "run-1_event_5"]
+
+    async def test_unsubscribe_releases_pinned_events(self):
+        broker = RunBroker("run-1", replay_window=2)
+        subscriber = broker.subscribe()
+        for i in range(1, 6):
+            await broker.put(f"run-1_event_{i}", ("values", {"i": i}))
+        assert broker.buffered_count() == 5
+
+        broker.unsubscribe(subscriber)
+
+        assert broker.buffered_count() == 2
+
+
+class TestRunBrokerOverflow:
+    """Test bounded buffer overflow policies."""
+
+    async def _stalled_subscriber(self, broker: RunBroker):
+        """Subscribe, read one event and then stop reading."""
+        it = broker.aiter()
+        await broker.put("run-1_event_1", ("values", {"i": 1}))
+        assert (await it.__anext__())[0] == "run-1_event_1"
+        return it
+
+    async def test_resync_policy_drops_oldest_and_flags_subscriber(self):
+        broker = RunBroker("run-1", replay_window=1, max_buffer=2, overflow_policy="resync")
+        it = await self._stalled_subscriber(broker)
+
+        for i in range(2, 6):
+            await broker.put(f"run-1_event_{i}", ("values", {"i": i}))
+
+        assert broker.buffered_count() == 2
+        with pytest.raises(BrokerResyncRequired) as exc_info:
+            await it.__anext__()
+        assert exc_info.value.last_event_id == "run-1_event_1"
+        assert broker.metrics["resync"] == 1
+
+    async def test_disconnect_policy_evicts_slow_subscriber(self):
+        broker = RunBroker("run-1", replay_window=1, max_buffer=2, overflow_policy="disconnect")
+        it = await self._stalled_subscriber(broker)
+
+        for i in range(2, 6):
+            await broker.put(f"run-1_event_{i}", ("values", {"i": i}))
+
+        with pytest.raises(SlowConsumerDisconnected):
+            await it.__anext__()
+        assert broker.metrics["disconnect"] == 1
+        # The evicted subscriber no longer pins the buffer beyond the replay window
+        assert broker.buffered_count() == 1
+
+    async def test_block_policy_waits_for_subscriber(self):
+        broker = RunBroker("run-1", replay_window=1, max_buffer=2, overflow_policy="block")
+        it = await self._stalled_subscriber(broker)
+        await broker.put("run-1_event_2", ("values", {"i": 2}))
+        await broker.put("run-1_event_3", ("values", {"i": 3}))
+
+        producer = asyncio.create_task(broker.put("run-1_event_4", ("values", {"i": 4})))
+        await asyncio.sleep(0.01)
+        assert not producer.done()
+
+        assert (await it.__anext__())[0] == "run-1_event_2"
+        await asyncio.wait_for(producer, timeout=0.05)
+
+        assert broker.metrics["block"] == 1
+        assert [(await it.__anext__())[0] for _ in range(2)] == ["run-1_event_3", "run-1_event_4"]
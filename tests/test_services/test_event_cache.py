@@ -0,0 +1,99 @@
+"""
+Unit tests for the in-memory replay cache.
+"""
+from agent_server.services import streaming_service as streaming_module
+from agent_server.services.broker import BrokerManager
+from agent_server.services.event_cache import EventFrameCache
+from agent_server.services.streaming_service import StreamingService
+
+
+def _frame(seq: int, size: int = 10) -> str:
+    return f"{seq}".ljust(size, ".")
+
+
+class TestEventFrameCache:
+    def test_returns_frames_after_last_seq(self):
+        cache = EventFrameCache()
+        cache.start_run("run-1")
+        for seq in range(1, 5):
+            cache.append("run-1", seq, _frame(seq))
+
+        assert cache.get_since("run-1", -1) == [(seq, _frame(seq)) for seq in range(1, 5)]
+        assert cache.get_since("run-1", 2) == [(3, _frame(3)), (4, _frame(4))]
+
+    def test_run_joined_midway_only_covers_later_events(self):
+        cache = EventFrameCache()
+        cache.append("run-1", 5, _frame(5))
+
+        assert cache.get_since("run-1", -1) is None
+        assert cache.get_since("run-1", 4) == [(5, _frame(5))]
+
+    def test_unencodable_frame_ends_coverage(self):
+        cache = EventFrameCache()
+        cache.start_run("run-1")
+        cache.append("run-1", 1, _frame(1))
+        cache.append("run-1", 2, None)
+        cache.append("run-1", 3, _frame(3))
+
+        assert cache.get_since("run-1", 1) is None
+        assert cache.get_since("run-1", 2) == [(3, _frame(3))]
+
+    def test_per_run_limit_evicts_oldest_frames(self):
+        cache = EventFrameCache(max_bytes=1000, max_run_bytes=30)
+        cache.start_run("run-1")
+        for seq in range(1, 6):
+            cache.append("run-1", seq, _frame(seq))
+
+        assert cache.get_since("run-1", 0) is None
+        assert cache.get_since("run-1", 2) == [(3, _frame(3)), (4, _frame(4)), (5, _frame(5))]
+
+    def test_total_limit_evicts_least_recently_used_run(self):
+        cache = EventFrameCache(max_bytes=30, max_run_bytes=30)
+        for run_id in ("run-1", "run-2"):
+            cache.start_run(run_id)
+            cache.append(run_id, 1, _frame(1))
+        cache.get_since("run-1", 0)
+        cache.start_run("run-3")
+        cache.append("run-3", 1, _frame(1))
+        cache.append("run-3", 2, _frame(2))
+
+        assert cache.get_since("run-2", 0) is None
+        assert cache.get_since("run-1", 0) == [(1, _frame(1))]
+        assert cache.get_metrics()["bytes"] == 30
+
+
+async def test_replay_is_served_from_cache(monkeypatch):
+    cache = EventFrameCache()
+    monkeypatch.setattr(streaming_module, "event_cache", cache)
+
+    async def iter_events_since(run_id, last_seq=-1):
+        raise AssertionError("replay should not query the event store")
+        yield
+
+    monkeypatch.setattr(streaming_module.event_store, "iter_events_since", iter_events_since)
+    monkeypatch.setattr(streaming_module.event_store, "enqueue_encoded", lambda *args: None)
+    service = StreamingService()
+    for seq in range(1, 4):
+        await service.publish_event("run-1", f"run-1_event_{seq}", ("values", {"n": seq}))
+
+    frames = [frame async for _, frame in service._replay_stored_events("run-1", "run-1_event_1")]
+
+    assert len(frames) == 2
+    assert frames[0].startswith("event: values\ndata: {\"n\":2}")
+    assert cache.get_metrics()["hits"] == 1
+
+
+async def test_run_state_is_dropped_when_the_run_ends(monkeypatch):
+    monkeypatch.setattr(streaming_module, "event_cache", EventFrameCache())
+    monkeypatch.setattr(streaming_module, "broker_manager", BrokerManager())
+    monkeypatch.setattr(streaming_module.event_store, "enqueue_encoded", lambda *args: None)
+    service = StreamingService()
+    await service.publish_event("run-1", "run-1_event_1", ("values", {"n": 1}))
+    # Cancelling a run executing elsewhere leaves nothing behind either
+    await service.signal_run_cancelled("run-2")
+
+    await service.signal_run_cancelled("run-1")
+    await service.cleanup_run("run-1")
+
+    assert service.event_counters == {}
+    assert service.values_encoders == {}
@@ -0,0 +1,40 @@
+"""
+Unit tests for compressed event storage.
+"""
+from types import SimpleNamespace
+
+import pytest
+
+zstandard = pytest.importorskip("zstandard")
+
+from agent_server.services import event_compression  # noqa: E402
+from agent_server.services.event_compression import EventCodec  # noqa: E402
+from agent_server.services.event_store import EventStore  # noqa: E402
+
+
+def _row(data=None, data_compressed=None):
+    return SimpleNamespace(id="run-1_event_1", event="values", data=data, data_compressed=data_compressed, created_at=None)
+
+
+class TestEventCodec:
+    def test_round_trip_with_dictionary(self):
+        samples = [f'{{"type":"execution_values","chunk":{{"step":{i},"note":"sample {i}"}}}}'.encode() for i in range(200)]
+        dictionary = zstandard.train_dictionary(1024, samples).as_bytes()
+        codec = EventCodec("zstd", dictionary=dictionary)
+
+        blob = codec.compress('{"type":"execution_values","chunk":{"step":7}}')
+
+        assert codec.decompress(blob) == {"type": "execution_values", "chunk": {"step": 7}}
+
+    def test_disabled_codec_still_reads_compressed_rows(self, monkeypatch):
+        blob = EventCodec("zstd").compress('{"a":1}')
+        monkeypatch.setattr(event_compression, "event_codec", EventCodec("none"))
+
+        store = EventStore()
+
+        assert store._row_to_event(_row(data_compressed=blob)).data == {"a": 1}
+        assert store._row_to_event(_row(data={"b": 2})).data == {"b": 2}
+
+    def test_unknown_compression_is_rejected(self):
+        with pytest.raises(ValueError):
+            EventCodec("lz4")
@@ -0,0 +1,50 @@
+"""
+Unit tests for single-pass event encoding.
+The encoded frame and stored document must match the output of the
+per-consumer conversion paths they replace.
+"""
+import json
+from types import SimpleNamespace
+
+from langchain_core.messages import AIMessageChunk
+
+from agent_server.services.event_converter import EventConverter
+
+
+def _stored(encoded, event_id: str):
+    """Mimic a row read back from run_events"""
+    return SimpleNamespace(id=event_id, event=encoded.stored_event, data=json.loads(encoded.stored_data))
+
+
+class TestEncodeRawEvent:
+    def setup_method(self):
+        self.converter = EventConverter()
+
+    def test_messages_frame_and_replay_match_raw_conversion(self):
+        raw_event = ("messages", (AIMessageChunk(content="hel", id="m1"), {"langgraph_node": "agent"}))
+
+        encoded = self.converter.encode_raw_event("run-1_event_1", raw_event)
+
+        assert encoded.frame == self.converter.convert_raw_to_sse("run-1_event_1", raw_event)
+        assert self.converter.convert_stored_to_sse(_stored(encoded, "run-1_event_1")) == encoded.frame
+        assert json.loads(encoded.stored_data)["node_path"] is None
+
+    def test_updates_are_stored_as_values(self):
+        raw_event = ("updates", {"agent": {"count": 1}})
+
+        encoded = self.converter.encode_raw_event("run-1_event_2", raw_event)
+
+        assert encoded.frame.startswith("event: updates\n")
+        assert encoded.stored_event == "values"
+        assert json.loads(encoded.stored_data) == {"type": "execution_values", "chunk": {"agent": {"count": 1}}}
+
+    def test_unstored_modes_only_carry_a_frame(self):
+        encoded = self.converter.encode_raw_event("run-1_event_3", ("custom", {"progress": 0.5}))
+
+        assert encoded.frame == self.converter.convert_raw_to_sse("run-1_event_3", ("custom", {"progress": 0.5}))
+        assert encoded.stored_data is None
+
+    def test_broker_payload_converts_to_its_frame(self):
+        encoded = self.converter.encode_raw_event("run-1_event_4", ("values", {"a": 1}))
+
+        assert self.converter.convert_raw_to_sse("run-1_event_4", encoded) == encoded.frame
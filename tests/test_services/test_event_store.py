@@ -0,0 +1,315 @@
+"""
+Unit tests for the batched event store writer.
+Database writes are captured instead of executed.
+"""
+import asyncio
+from datetime import UTC, datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from agent_server.core.sse import SSEEvent
+from agent_server.services import event_store as event_store_module
+from agent_server.services import streaming_service as streaming_module
+from agent_server.services.broker import BrokerManager
+from agent_server.services.event_store import EventStore
+from agent_server.services.streaming_service import StreamingService
+
+
+def _enqueue(store: EventStore, run_id: str, seq: int) -> None:
+    store.enqueue_encoded(run_id, f"{run_id}_event_{seq}", "values", f'{{"chunk": {{"i": {seq}}}}}')
+
+
+@pytest.fixture
+def store(monkeypatch):
+    store = EventStore()
+    store.written = []
+
+    async def capture(batch):
+        if batch:
+            store.written.append([event.id for _, event in batch])
+
+    monkeypatch.setattr(store, "_write_batch", capture)
+    yield store
+    if store._writer_task:
+        store._writer_task.cancel()
+
+
+class TestBatchedWriter:
+    async def test_events_are_coalesced_into_one_batch(self, store):
+        for seq in range(1, 4):
+            _enqueue(store, "run-1", seq)
+        assert store.written == []
+
+        await asyncio.sleep(event_store_module.EVENT_STORE_FLUSH_INTERVAL * 3)
+
+        assert store.written == [[f"run-1_event_{seq}" for seq in range(1, 4)]]
+
+    async def test_full_batch_is_written_without_waiting_for_interval(self, store, monkeypatch):
+        monkeypatch.setattr(event_store_module, "EVENT_STORE_BATCH_SIZE", 2)
+        monkeypatch.setattr(event_store_module, "EVENT_STORE_FLUSH_INTERVAL", 60)
+
+        _enqueue(store, "run-1", 1)
+        _enqueue(store, "run-1", 2)
+        await asyncio.sleep(0.01)
+
+        assert store.written == [["run-1_event_1", "run-1_event_2"]]
+
+    async def test_flush_single_run_leaves_other_runs_buffered(self, store, monkeypatch):
+        monkeypatch.setattr(event_store_module, "EVENT_STORE_FLUSH_INTERVAL", 60)
+        _enqueue(store, "run-1", 1)
+        _enqueue(store, "run-2", 1)
+
+        await store.flush("run-1")
+
+        assert store.written == [["run-1_event_1"]]
+        assert list(store._pending) == ["run-2"]
+
+    async def test_published_events_reach_the_writer(self, store, monkeypatch):
+        monkeypatch.setattr(streaming_module, "event_store", store)
+        monkeypatch.setattr(streaming_module, "broker_manager", BrokerManager())
+        service = StreamingService()
+
+        await service.publish_event("run-1", "run-1_event_1", ("values", {"i": 1}))
+        await service.publish_event("run-1", "run-1_event_2", ("values", {"i": 2}))
+        await store.flush("run-1")
+        streaming_module.event_cache.discard("run-1")
+
+        assert store.written == [["run-1_event_1", "run-1_event_2"]]
+
+
+class TestWriterShutdown:
+    @pytest.fixture
+    def slow_store(self, store, monkeypatch):
+        """Store whose first write blocks until ``release`` is set"""
+        store.writing = asyncio.Event()
+        store.release = asyncio.Event()
+        capture = store._write_batch
+
+        async def slow(batch):
+            if not store.written:
+                store.writing.set()
+                await store.release.wait()
+            await capture(batch)
+
+        monkeypatch.setattr(store, "_write_batch", slow)
+        return store
+
+    async def test_stop_during_write_persists_every_event(self, slow_store):
+        for seq in range(1, 4):
+            _enqueue(slow_store, "run-1", seq)
+        await asyncio.wait_for(slow_store.writing.wait(), timeout=1)
+        _enqueue(slow_store, "run-1", 4)
+
+        stopping = asyncio.create_task(slow_store.stop_writer())
+        await asyncio.sleep(0.01)
+        slow_store.release.set()
+        await asyncio.wait_for(stopping, timeout=1)
+
+        assert slow_store.written == [[f"run-1_event_{seq}" for seq in range(1, 4)], ["run-1_event_4"]]
+        assert slow_store._writer_task.done()
+
+    async def test_cancelled_write_is_put_back_in_order(self, slow_store):
+        for seq in range(1, 3):
+            _enqueue(slow_store, "run-1", seq)
+        await asyncio.wait_for(slow_store.writing.wait(), timeout=1)
+        _enqueue(slow_store, "run-1", 3)
+
+        slow_store._writer_task.cancel()
+        await asyncio.sleep(0)
+        slow_store.release.set()
+        await slow_store.flush()
+
+        assert slow_store.written == [[f"run-1_event_{seq}" for seq in range(1, 4)]]
+        assert slow_store._pending_count == 0
+
+
+class TestStoredFrames:
+    async def test_frame_is_kept_only_when_enabled(self, store, monkeypatch):
+        monkeypatch.setattr(event_store_module, "EVENT_STORE_FLUSH_INTERVAL", 60)
+        store.enqueue_encoded("run-1", "run-1_event_1", "values", "{}", "event: values\ndata: {}\n\n")
+        monkeypatch.setattr(event_store_module, "EVENT_STORE_FRAMES", True)
+        store.enqueue_encoded("run-1", "run-1_event_2", "values", "{}", "event: values\ndata: {}\n\n")
+
+        assert [event.frame for event in store._pending["run-1"]] == [None, "event: values\ndata: {}\n\n"]
+
+    async def test_replay_sends_stored_frames_in_chunks(self, monkeypatch):
+        frames = [f"id: run-1_event_{seq}\nevent: values\ndata: {{}}\n\n" for seq in range(1, 6)]
+
+        async def iter_events_since(run_id, last_seq=-1):
+            for seq, frame in enumerate(frames, start=1):
+                # Data is not fetched for rows with a stored frame
+                yield SSEEvent(id=f"run-1_event_{seq}", event="values", data=None, frame=frame)
+
+        monkeypatch.setattr(streaming_module.event_store, "iter_events_since", iter_events_since)
+        monkeypatch.setattr(streaming_module, "EVENT_STORE_REPLAY_CHUNK_SIZE", len(frames[0]) * 2)
+
+        chunks = [chunk async for chunk in StreamingService()._replay_stored_chunks("run-1", None)]
+
+        assert chunks == [(2, "".join(frames[:2])), (4, "".join(frames[2:4])), (5, frames[4])]
+
+
+class FakeEngine:
+    """Answers the replay page query from an in-memory list of rows"""
+
+    def __init__(self, seqs):
+        now = datetime.now(UTC)
+        self.rows = [
+            SimpleNamespace(id=f"run-1_event_{seq}", seq=seq, event="values", created_at=now, frame=None,
+                            compressed=False, data={"i": seq}, data_compressed=None)
+            for seq in seqs
+        ]
+        self.queries = []
+
+    def begin(self):
+        engine = self
+
+        class Conn:
+            async def __aenter__(self):
+                return self
+
+            async def __aexit__(self, *exc):
+                return False
+
+            async def execute(self, _stmt, params):
+                engine.queries.append(params["last_seq"])
+                rows = [r for r in engine.rows if r.seq > params["last_seq"]][: params["limit"]]
+                return SimpleNamespace(fetchall=lambda: rows)
+
+        return Conn()
+
+
+class TestKeysetReplay:
+    @pytest.fixture
+    def replay(self, monkeypatch):
+        monkeypatch.setattr(event_store_module, "EVENT_STORE_REPLAY_PAGE_SIZE", 3)
+
+        async def run(seqs, last_seq=-1):
+            engine = FakeEngine(seqs)
+            monkeypatch.setattr(event_store_module.db_manager, "get_engine", lambda: engine)
+            events = [ev async for ev in EventStore().iter_events_since("run-1", last_seq)]
+            return [int(ev.id.rsplit("_", 1)[-1]) for ev in events], engine.queries
+
+        return run
+
+    async def test_pages_continue_after_the_last_sequence(self, replay):
+        seqs, queries = await replay(range(1, 8))
+
+        assert seqs == list(range(1, 8))
+        assert queries == [-1, 3, 6]
+
+    async def test_exact_multiple_of_page_size_ends_on_empty_page(self, replay):
+        seqs, queries = await replay(range(1, 7))
+
+        assert seqs == list(range(1, 7))
+        assert queries == [-1, 3, 6]
+
+    async def test_resumes_after_last_event_id(self, replay):
+        seqs, queries = await replay(range(1, 8), last_seq=4)
+
+        assert seqs == [5, 6, 7]
+        assert queries == [4, 7]
+
+    async def test_duplicate_rows_are_replayed_once(self, replay):
+        seqs, _ = await replay([1, 2, 2, 3, 4])
+
+        assert seqs == [1, 2, 3, 4]
+
+
+class FakeMaintenanceConnection:
+    """Records statements per transaction; statements containing ``fail_on`` raise"""
+
+    def __init__(self, partitions, fail_on=None):
+        self.partitions = partitions
+        self.fail_on = fail_on
+        self.transactions = []
+        self._current = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def scalar(self, stmt, params=None):
+        sql = str(stmt)
+        if "to_regclass" in sql:
+            return params["name"] in self.partitions
+        return True
+
+    async def commit(self):
+        pass
+
+    async def execute(self, stmt, params=None):
+        sql = " ".join(str(stmt).split())
+        if self.fail_on and self.fail_on in sql:
+            raise RuntimeError("updated partition constraint for default partition would be violated")
+        if self._current is not None:
+            self._current.append(sql)
+        return SimpleNamespace(fetchall=lambda: [(name,) for name in self.partitions])
+
+    def begin(self):
+        conn = self
+
+        class Transaction:
+            async def __aenter__(self):
+                conn._current = []
+
+            async def __aexit__(self, exc_type, *exc):
+                if exc_type is None and conn._current:
+                    conn.transactions.append(conn._current)
+                conn._current = None
+                return False
+
+        return Transaction()
+
+
+class TestPartitionMaintenance:
+    @pytest.fixture
+    def maintain(self, monkeypatch):
+        monkeypatch.setattr(event_store_module, "EVENT_STORE_PARTITIONS_AHEAD", 1)
+        monkeypatch.setattr(event_store_module, "EVENT_STORE_RETENTION_HOURS", 1)
+
+        async def run(conn):
+            monkeypatch.setattr(
+                event_store_module.db_manager, "get_engine", lambda: SimpleNamespace(connect=lambda: conn)
+            )
+            await EventStore()._maintain_partitions()
+            return conn.transactions
+
+        return run
+
+    @staticmethod
+    def _partition(hours: int) -> str:
+        hour = datetime.now(UTC).replace(minute=0, second=0, microsecond=0)
+        return event_store_module.PARTITION_PREFIX + (hour + timedelta(hours=hours)).strftime(
+            event_store_module.PARTITION_FORMAT
+        )
+
+    async def test_new_partition_takes_over_rows_from_default(self, maintain):
+        current = self._partition(0)
+        conn = FakeMaintenanceConnection(["run_events_default", current])
+
+        transactions = await maintain(conn)
+
+        create = transactions[0]
+        assert create[0].startswith("CREATE TEMP TABLE run_events_moved")
+        assert "DELETE FROM run_events_default" in create[1]
+        assert create[2].startswith(f"CREATE TABLE {self._partition(1)} PARTITION OF run_events")
+        assert create[3].startswith("INSERT INTO run_events (")
+        # The existing partition is left alone; the default's expired rows are a separate step
+        assert len(transactions) == 2
+        assert transactions[1][0].startswith("DELETE FROM run_events_default WHERE created_at <")
+
+    async def test_failed_create_does_not_block_retention(self, maintain):
+        expired = self._partition(-3)
+        conn = FakeMaintenanceConnection(
+            ["run_events_default", expired], fail_on=f"CREATE TABLE {self._partition(0)}"
+        )
+
+        transactions = await maintain(conn)
+
+        statements = [sql for transaction in transactions for sql in transaction]
+        assert not any(self._partition(0) in sql for sql in statements)
+        assert any(sql.startswith(f"CREATE TABLE {self._partition(1)}") for sql in statements)
+        assert [f"DROP TABLE IF EXISTS {expired}"] in transactions
@@ -0,0 +1,37 @@
+"""
+Unit tests for per-thread run serialization.
+"""
+import asyncio
+
+import pytest
+
+from agent_server.services.multitask import ThreadLocks, resolve_multitask_strategy
+
+
+class TestResolveMultitaskStrategy:
+    def test_defaults_to_reject(self):
+        assert resolve_multitask_strategy(None) == "reject"
+        assert resolve_multitask_strategy("enqueue") == "enqueue"
+
+    def test_rejects_unknown_strategy(self):
+        with pytest.raises(ValueError):
+            resolve_multitask_strategy("bogus")
+
+
+class TestThreadLocks:
+    async def test_serializes_same_thread_only(self):
+        locks = ThreadLocks(backend="memory")
+        order = []
+
+        async def create(thread_id: str, name: str, delay: float):
+            async with locks.hold(thread_id):
+                order.append(f"{name}:start")
+                await asyncio.sleep(delay)
+                order.append(f"{name}:end")
+
+        await asyncio.gather(create("t1", "a", 0.02), create("t1", "b", 0), create("t2", "c", 0))
+
+        assert order.index("a:end") < order.index("b:start")
+        assert order.index("c:start") < order.index("a:end")
+        # Locks are dropped once nobody holds them
+        assert locks._locks == {}
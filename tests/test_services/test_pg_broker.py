@@ -0,0 +1,186 @@
+"""
+Unit tests for cross-worker event relay in the Postgres broker.
+Notifications are passed between two managers directly, without a database.
+"""
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from agent_server.core.sse import EncodedEvent
+from agent_server.services import pg_broker
+from agent_server.services.pg_broker import (
+    PostgresBrokerManager,
+    decode_payload,
+    encode_payload,
+)
+
+
+def _relay(source: PostgresBrokerManager, target: PostgresBrokerManager) -> None:
+    """Hand every queued outbox message of source to target's listener callback."""
+    while not source._outbox.empty():
+        target._on_notification(None, 0, pg_broker.NOTIFY_CHANNEL, source._outbox.get_nowait())
+
+
+class TestPayloadEncoding:
+    def test_round_trip_preserves_nested_tuples(self):
+        payload = ("messages", ({"content": "hi"}, {"tags": ["a"]}))
+
+        assert decode_payload(encode_payload(payload)) == payload
+
+    def test_encoded_event_keeps_only_its_frame(self):
+        event = EncodedEvent(frame="event: values\ndata: {}\n\n", stored_event="values", stored_data="{}")
+
+        assert decode_payload(encode_payload(event)) == EncodedEvent(frame=event.frame)
+
+
+class TestPostgresBrokerRelay:
+    @pytest.fixture
+    def managers(self):
+        return PostgresBrokerManager(), PostgresBrokerManager()
+
+    async def test_remote_subscriber_receives_events_and_finish(self, managers, monkeypatch):
+        monkeypatch.setattr(pg_broker, "NOTIFY_CHUNK_SIZE", 16)  # force chunking
+        executing, viewing = managers
+        remote_broker = viewing.get_or_create_broker("run-1")
+        delivery = asyncio.create_task(viewing._delivery_loop())
+
+        broker = executing.get_or_create_broker("run-1")
+        await broker.put("run-1_event_1", ("values", {"messages": ["a long enough message"]}))
+        executing.cleanup_broker("run-1")
+        _relay(executing, viewing)
+
+        events = await asyncio.wait_for(
+            asyncio.ensure_future(_collect(remote_broker)), timeout=0.5
+        )
+        delivery.cancel()
+
+        assert events == [("run-1_event_1", ("values", {"messages": ["a long enough message"]}))]
+        assert remote_broker.is_finished()
+        assert viewing._partial == {}
+
+    async def test_own_notifications_are_ignored(self, managers):
+        executing, _ = managers
+        broker = executing.get_or_create_broker("run-1")
+        await broker.put("run-1_event_1", ("values", {}))
+        _relay(executing, executing)
+
+        assert executing._inbox.empty()
+
+
+class FakeEngine:
+    """Records executed parameters; status queries answer from ``statuses``"""
+
+    def __init__(self, statuses=None):
+        self.statuses = statuses or {}
+        self.executed = []
+
+    def get_engine(self):
+        return self
+
+    def begin(self):
+        engine = self
+
+        class Conn:
+            async def __aenter__(self):
+                return self
+
+            async def __aexit__(self, *exc):
+                return False
+
+            async def execute(self, _stmt, params):
+                engine.executed.append(params)
+                rows = [(run_id, engine.statuses[run_id]) for run_id in params.get("run_ids", [])
+                        if run_id in engine.statuses]
+                return SimpleNamespace(all=lambda: rows)
+        return Conn()
+
+
+@pytest.fixture
+async def listening():
+    """A manager that has listened long enough to know which runs are watched"""
+    manager = PostgresBrokerManager()
+    manager._listening = True
+    manager._listening_since = asyncio.get_running_loop().time() - pg_broker.WATCH_TTL
+    return manager
+
+
+class TestRemoteInterest:
+    async def test_unwatched_runs_are_not_published(self, listening):
+        broker = listening.get_or_create_broker("run-1")
+        await broker.put("run-1_event_1", ("values", {}))
+
+        assert listening._outbox.empty()
+
+    async def test_runs_are_published_once_another_worker_watches(self, listening, monkeypatch):
+        monkeypatch.setattr(pg_broker, "db_manager", FakeEngine({"run-1": "running"}))
+        viewing = PostgresBrokerManager()
+        viewing.get_or_create_broker("run-1").subscribe()
+        await viewing._refresh_watches()
+        _relay(viewing, listening)
+
+        await listening.get_or_create_broker("run-1").put("run-1_event_1", ("values", {}))
+
+        assert listening._outbox.get_nowait().startswith(f"E|{listening._origin}|run-1|run-1_event_1|")
+
+    async def test_everything_is_published_until_interest_is_known(self, listening):
+        listening._listening_since = asyncio.get_running_loop().time()
+        await listening.get_or_create_broker("run-1").put("run-1_event_1", ("values", {}))
+
+        assert not listening._outbox.empty()
+
+    async def test_publishing_does_not_need_the_local_listener(self, monkeypatch):
+        engine = FakeEngine()
+        flushed = []
+
+        async def flush(run_id):
+            flushed.append(run_id)
+
+        monkeypatch.setattr(pg_broker, "db_manager", engine)
+        monkeypatch.setattr(pg_broker.event_store, "flush", flush)
+        manager = PostgresBrokerManager()
+        await manager.get_or_create_broker("run-1").put("run-1_event_1", ("values", {}))
+        await manager.get_or_create_broker("run-1").put("run-1_event_2", ("values", {}))
+
+        publisher = asyncio.create_task(manager._publish_loop())
+        await asyncio.sleep(0.01)
+        publisher.cancel()
+
+        assert not manager._listening
+        assert [len(params["messages"]) for params in engine.executed] == [2]
+        # Stored events are made durable before a viewer can see the first live one
+        assert flushed == ["run-1"]
+
+
+class TestRemoteRunStatus:
+    async def test_ended_run_finishes_its_remote_broker(self, monkeypatch):
+        monkeypatch.setattr(pg_broker, "db_manager", FakeEngine({"run-1": "completed", "run-2": "running"}))
+        viewing = PostgresBrokerManager()
+        ended = viewing.get_or_create_broker("run-1")
+        ended.subscribe()
+        active = viewing.get_or_create_broker("run-2")
+        active.subscribe()
+
+        await viewing._refresh_watches()
+
+        assert ended.is_finished()
+        assert not active.is_finished()
+        assert viewing._outbox.get_nowait() == f"W|{viewing._origin}|run-2"
+        assert viewing._outbox.empty()
+
+    async def test_locally_produced_runs_are_not_polled(self, monkeypatch):
+        engine = FakeEngine({"run-1": "completed"})
+        monkeypatch.setattr(pg_broker, "db_manager", engine)
+        manager = PostgresBrokerManager()
+        broker = manager.get_or_create_broker("run-1")
+        broker.subscribe()
+        await broker.put("run-1_event_1", ("values", {}))
+
+        await manager._refresh_watches()
+
+        assert engine.executed == []
+        assert not broker.is_finished()
+
+
+async def _collect(broker) -> list:
+    return [item async for item in broker.aiter()]
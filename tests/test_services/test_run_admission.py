@@ -0,0 +1,69 @@
+"""
+Unit tests for run admission control.
+"""
+import asyncio
+
+import pytest
+
+from agent_server.services.run_admission import RunAdmissionController, RunAdmissionRejected
+
+
+async def _hold(controller, ticket, release: asyncio.Event, started: list):
+    async def execute():
+        started.append(ticket.run_id)
+        await release.wait()
+
+    await controller.run(ticket, execute)
+
+
+class TestRunAdmission:
+    async def test_queues_over_global_limit_and_rejects_when_full(self):
+        controller = RunAdmissionController(max_concurrent=1, max_queued=1)
+        release, started = asyncio.Event(), []
+        tasks = [
+            asyncio.create_task(_hold(controller, controller.reserve(f"run-{i}", "u", "a"), release, started))
+            for i in range(2)
+        ]
+        await asyncio.sleep(0)
+
+        with pytest.raises(RunAdmissionRejected):
+            controller.reserve("run-2", "u", "a")
+        assert started == ["run-0"]
+        assert controller.get_metrics()["queued"] == 1
+
+        release.set()
+        await asyncio.gather(*tasks)
+        assert started == ["run-0", "run-1"]
+        assert controller.get_metrics()["running"] == 0
+        assert controller.get_metrics()["rejected"] == 1
+
+    async def test_per_user_limit_does_not_block_other_users(self):
+        controller = RunAdmissionController(max_concurrent=10, max_per_user=1, max_queued=10)
+        release, started = asyncio.Event(), []
+        tasks = [
+            asyncio.create_task(_hold(controller, controller.reserve(run_id, user, "a"), release, started))
+            for run_id, user in [("run-0", "alice"), ("run-1", "alice"), ("run-2", "bob")]
+        ]
+        await asyncio.sleep(0)
+
+        assert started == ["run-0", "run-2"]
+
+        release.set()
+        await asyncio.gather(*tasks)
+        assert started == ["run-0", "run-2", "run-1"]
+
+    async def test_cancelled_queued_run_never_starts(self):
+        controller = RunAdmissionController(max_concurrent=1, max_queued=5)
+        release, started = asyncio.Event(), []
+        first = asyncio.create_task(_hold(controller, controller.reserve("run-0", "u", "a"), release, started))
+        queued = asyncio.create_task(_hold(controller, controller.reserve("run-1", "u", "a"), release, started))
+        await asyncio.sleep(0)
+
+        assert controller.cancel_queued("run-1")
+        with pytest.raises(asyncio.CancelledError):
+            await queued
+
+        release.set()
+        await first
+        assert started == ["run-0"]
+        assert controller.get_metrics()["queued"] == 0
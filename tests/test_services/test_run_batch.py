@@ -0,0 +1,51 @@
+"""
+Unit tests for batch run execution.
+"""
+import asyncio
+
+from agent_server.services.run_batch import batch_concurrency, iter_batch_results
+
+
+class TestIterBatchResults:
+    async def test_bounded_parallelism_and_completion_order(self):
+        running, peak = 0, 0
+
+        async def execute(index, item):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(item["delay"])
+            running -= 1
+            if item.get("fail"):
+                raise RuntimeError("boom")
+            return {"index": index, "status": "completed"}
+
+        inputs = [{"delay": 0.03}, {"delay": 0.01}, {"delay": 0.0, "fail": True}, {"delay": 0.0}]
+        results = [r async for r in iter_batch_results(inputs, execute, concurrency=2)]
+
+        assert peak == 2
+        assert [r["index"] for r in results] == [1, 2, 3, 0]
+        assert results[1]["status"] == "failed" and results[1]["error"] == "boom"
+
+    async def test_closing_cancels_items_in_flight(self):
+        cancelled = []
+
+        async def execute(index, item):
+            try:
+                await asyncio.sleep(0 if index == 0 else 10)
+            except asyncio.CancelledError:
+                cancelled.append(index)
+                raise
+            return {"index": index}
+
+        results = iter_batch_results([{}] * 3, execute, concurrency=3)
+        assert (await results.__anext__())["index"] == 0
+        await results.aclose()
+        assert sorted(cancelled) == [1, 2]
+
+
+def test_batch_concurrency_is_capped(monkeypatch):
+    monkeypatch.setattr("agent_server.services.run_batch.RUN_BATCH_MAX_CONCURRENCY", 4)
+    assert batch_concurrency(None) == 4
+    assert batch_concurrency(100) == 4
+    assert batch_concurrency(2) == 2
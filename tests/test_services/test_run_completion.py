@@ -0,0 +1,48 @@
+"""
+Unit tests for run completion notifications.
+"""
+import asyncio
+
+from agent_server.services.run_completion import RUN_DONE_CHANNEL, RUN_STOP_CHANNEL, RunCompletionNotifier
+
+
+class TestRunCompletionNotifier:
+    async def test_publish_wakes_run_and_thread_watchers(self):
+        notifier = RunCompletionNotifier()
+        with notifier.watch_run("run-1") as run_watch, notifier.watch_thread("thread-1") as thread_watch:
+            with notifier.watch_run("run-2") as other_watch:
+                asyncio.get_running_loop().call_later(0.01, notifier.publish, "run-1", "thread-1")
+
+                assert await run_watch.wait(1.0)
+                assert await thread_watch.wait(1.0)
+                assert not await other_watch.wait(0.01)
+        assert notifier.get_metrics()["waiters"] == 0
+
+    async def test_remote_notifications_wake_but_own_are_ignored(self):
+        notifier = RunCompletionNotifier()
+        with notifier.watch_run("run-1") as watch:
+            notifier._on_notification(None, 0, "", f"{notifier._origin}|run-1|thread-1")
+            assert not await watch.wait(0.01)
+
+            notifier._on_notification(None, 0, "", "elsewhere|run-1|thread-1")
+            assert await watch.wait(0.01)
+
+    async def test_stop_requests_reach_the_handler_of_other_processes(self):
+        notifier = RunCompletionNotifier()
+        requests = []
+        notifier.on_stop_request(lambda run_id, status: requests.append((run_id, status)) or True)
+
+        notifier._on_stop_notification(None, 0, "", f"{notifier._origin}|run-1|interrupted")
+        notifier._on_stop_notification(None, 0, "", "elsewhere|run-1|interrupted")
+
+        assert requests == [("run-1", "interrupted")]
+
+    async def test_stop_requests_share_the_outbox(self):
+        notifier = RunCompletionNotifier()
+        notifier._publisher_task = asyncio.get_running_loop().create_future()
+
+        notifier.publish("run-1", "thread-1")
+        notifier.request_stop("run-2", "cancelled")
+
+        assert [notifier._outbox.get_nowait()[0] for _ in range(2)] == [RUN_DONE_CHANNEL, RUN_STOP_CHANNEL]
+        notifier._publisher_task.cancel()
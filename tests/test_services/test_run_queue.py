@@ -0,0 +1,120 @@
+"""
+Unit tests for the run queue worker.
+Claims, leases and status lookups are faked instead of querying Postgres.
+"""
+import asyncio
+
+from agent_server.api import runs as runs_module
+from agent_server.services import run_queue as run_queue_module
+from agent_server.services.run_queue import QueuedRun, RunWorker
+
+
+def _queued(run_id: str) -> QueuedRun:
+    return QueuedRun(run_id, "thread-1", {}, None, None, {"graph_id": "agent", "user": {"identity": "u"}})
+
+
+class FakeQueue:
+    def __init__(self, run_ids):
+        self.pending = list(run_ids)
+        self.stopped = {}
+        self.claim_limits = []
+        self.renewed = []
+        self.requeued = []
+
+    async def claim_runs(self, worker_id, limit):
+        self.claim_limits.append(limit)
+        claimed, self.pending = self.pending[:limit], self.pending[limit:]
+        return [_queued(run_id) for run_id in claimed]
+
+    async def renew_leases(self, worker_id, run_ids):
+        self.renewed.append(sorted(run_ids))
+        return set(run_ids)
+
+    async def requeue_runs(self, worker_id, run_ids):
+        self.requeued.extend(run_ids)
+        return run_ids
+
+    async def get_stopped_runs(self, run_ids):
+        return {run_id: status for run_id, status in self.stopped.items() if run_id in run_ids}
+
+
+async def _start_worker(monkeypatch, queue: FakeQueue, concurrency: int):
+    release = asyncio.Event()
+    started, cancelled = [], []
+
+    async def execute_run_async(run_id, *args, **kwargs):
+        started.append(run_id)
+        try:
+            await release.wait()
+        except asyncio.CancelledError:
+            cancelled.append((run_id, run_queue_module.run_was_requeued(run_id)))
+            raise
+
+    async def listen_loop(self):
+        await asyncio.Event().wait()
+
+    monkeypatch.setattr(run_queue_module, "claim_runs", queue.claim_runs)
+    monkeypatch.setattr(run_queue_module, "get_stopped_runs", queue.get_stopped_runs)
+    monkeypatch.setattr(run_queue_module, "renew_leases", queue.renew_leases)
+    monkeypatch.setattr(run_queue_module, "requeue_runs", queue.requeue_runs)
+    monkeypatch.setattr(run_queue_module, "RUN_QUEUE_POLL_INTERVAL", 0.01)
+    monkeypatch.setattr(runs_module, "execute_run_async", execute_run_async)
+    monkeypatch.setattr(RunWorker, "_listen_loop", listen_loop)
+
+    worker = RunWorker(concurrency)
+    task = asyncio.create_task(worker.run())
+    await asyncio.sleep(0.05)
+    return worker, task, release, started, cancelled
+
+
+class TestRunWorker:
+    async def test_claims_no_more_than_concurrency(self, monkeypatch):
+        queue = FakeQueue(["run-1", "run-2", "run-3"])
+        worker, task, release, started, _ = await _start_worker(monkeypatch, queue, concurrency=2)
+
+        assert started == ["run-1", "run-2"]
+
+        release.set()
+        await asyncio.sleep(0.05)
+        assert started == ["run-1", "run-2", "run-3"]
+
+        worker.stop()
+        await task
+
+    async def test_runs_stopped_through_the_api_are_cancelled(self, monkeypatch):
+        queue = FakeQueue(["run-1", "run-2"])
+        worker, task, release, started, cancelled = await _start_worker(monkeypatch, queue, concurrency=2)
+
+        queue.stopped["run-1"] = "cancelled"
+        await asyncio.sleep(0.05)
+
+        assert cancelled == [("run-1", False)]
+        release.set()
+        worker.stop()
+        await task
+
+    async def test_leases_are_renewed_while_runs_execute(self, monkeypatch):
+        monkeypatch.setattr(run_queue_module, "RUN_QUEUE_LEASE_SECONDS", 0.06)
+        queue = FakeQueue(["run-1", "run-2"])
+        worker, task, release, _, _ = await _start_worker(monkeypatch, queue, concurrency=2)
+
+        await asyncio.sleep(0.05)
+
+        assert queue.renewed and queue.renewed[-1] == ["run-1", "run-2"]
+        release.set()
+        worker.stop()
+        await task
+
+    async def test_stopping_hands_unfinished_runs_back_to_the_queue(self, monkeypatch):
+        monkeypatch.setattr(run_queue_module, "RUN_WORKER_SHUTDOWN_TIMEOUT", 0.01)
+        queue = FakeQueue(["run-1"])
+        worker, task, _, started, cancelled = await _start_worker(monkeypatch, queue, concurrency=1)
+
+        worker.stop()
+        await task
+
+        assert started == ["run-1"]
+        # Stopped as a handover, not as a cancellation of the run
+        assert cancelled == [("run-1", True)]
+        assert queue.requeued == ["run-1"]
+        assert not run_queue_module.run_was_requeued("run-1")
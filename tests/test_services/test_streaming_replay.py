@@ -0,0 +1,139 @@
+"""
+Unit tests for replaying stored events and then following the live broker.
+The event store is replaced by an in-memory list of stored events.
+"""
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from agent_server.core.sse import SSEEvent
+from agent_server.services import streaming_service as streaming_module
+from agent_server.services.broker import BROKER_REPLAY_WINDOW, BrokerManager
+from agent_server.services.streaming_service import StreamingService
+
+RUN_ID = "run-1"
+
+
+def _frame(seq: int) -> str:
+    return f"id: {RUN_ID}_event_{seq}\nevent: values\ndata: {{}}\n\n"
+
+
+def _sequences(frames: list[str]) -> list[int]:
+    text = "".join(frames)
+    return [int(line.rsplit("_", 1)[-1]) for line in text.splitlines() if line.startswith("id: ")]
+
+
+@pytest.fixture
+def brokers(monkeypatch):
+    manager = BrokerManager()
+    monkeypatch.setattr(streaming_module, "broker_manager", manager)
+    monkeypatch.setattr(streaming_module.event_cache, "get_since", lambda run_id, last_seq: None)
+
+    async def flush(run_id):
+        pass
+
+    monkeypatch.setattr(streaming_module.event_store, "flush", flush)
+    return manager
+
+
+async def _publish(broker, first: int, last: int) -> None:
+    for seq in range(first, last + 1):
+        await broker.put(f"{RUN_ID}_event_{seq}", ("values", {"i": seq}))
+
+
+async def test_events_published_during_slow_replay_are_not_lost(brokers, monkeypatch):
+    stored = 10
+    live = BROKER_REPLAY_WINDOW + 50
+    broker = brokers.get_or_create_broker(RUN_ID)
+
+    async def iter_events_since(run_id, last_seq=-1):
+        for seq in range(last_seq + 1, stored + 1):
+            if seq == 1:
+                # The run keeps producing while this page is being read
+                await _publish(broker, stored + 1, stored + live)
+                broker.mark_finished()
+            yield SSEEvent(id=f"{RUN_ID}_event_{seq}", event="values", data=None, frame=_frame(seq))
+
+    monkeypatch.setattr(streaming_module.event_store, "iter_events_since", iter_events_since)
+    run = SimpleNamespace(run_id=RUN_ID, status="running")
+
+    frames = [frame async for frame in StreamingService().stream_run_execution(run, f"{RUN_ID}_event_0")]
+
+    assert _sequences(frames) == list(range(1, stored + live + 1))
+    assert broker.subscriber_count() == 0
+
+
+async def test_gap_before_first_live_event_is_fetched_from_store(brokers, monkeypatch):
+    total = BROKER_REPLAY_WINDOW + 40
+    broker = brokers.get_or_create_broker(RUN_ID)
+    # Published (and trimmed) before the viewer subscribed
+    await _publish(broker, 1, total)
+    broker.mark_finished()
+    durable = {"through": 5}
+
+    async def iter_events_since(run_id, last_seq=-1):
+        for seq in range(last_seq + 1, durable["through"] + 1):
+            yield SSEEvent(id=f"{RUN_ID}_event_{seq}", event="values", data=None, frame=_frame(seq))
+        # The store caught up once the first replay finished
+        durable["through"] = total
+
+    monkeypatch.setattr(streaming_module.event_store, "iter_events_since", iter_events_since)
+    run = SimpleNamespace(run_id=RUN_ID, status="running")
+
+    frames = [frame async for frame in StreamingService().stream_run_execution(run, f"{RUN_ID}_event_0")]
+
+    assert _sequences(frames) == list(range(1, total + 1))
+
+
+async def test_resync_resubscribes_and_continues(brokers, monkeypatch):
+    broker = brokers.get_or_create_broker(RUN_ID)
+    broker._max_buffer = 4
+    broker._replay_window = 1
+    stored_through = 0
+
+    async def iter_events_since(run_id, last_seq=-1):
+        for seq in range(last_seq + 1, stored_through + 1):
+            yield SSEEvent(id=f"{RUN_ID}_event_{seq}", event="values", data=None, frame=_frame(seq))
+
+    monkeypatch.setattr(streaming_module.event_store, "iter_events_since", iter_events_since)
+    run = SimpleNamespace(run_id=RUN_ID, status="running")
+    stream = StreamingService().stream_run_execution(run, f"{RUN_ID}_event_0")
+
+    frames = []
+    consumer = asyncio.create_task(_drain(stream, frames))
+    await asyncio.sleep(0)
+    # Overflow the stalled subscriber's buffer; the store has everything
+    stored_through = 20
+    await _publish(broker, 1, 20)
+    broker.mark_finished()
+    await asyncio.wait_for(consumer, timeout=1)
+
+    assert _sequences(frames) == list(range(1, 21))
+
+
+async def test_events_missed_before_a_finish_are_fetched_from_store(brokers, monkeypatch):
+    broker = brokers.get_or_create_broker(RUN_ID)
+    stored_through = 0
+
+    async def iter_events_since(run_id, last_seq=-1):
+        for seq in range(last_seq + 1, stored_through + 1):
+            yield SSEEvent(id=f"{RUN_ID}_event_{seq}", event="values", data=None, frame=_frame(seq))
+
+    monkeypatch.setattr(streaming_module.event_store, "iter_events_since", iter_events_since)
+    run = SimpleNamespace(run_id=RUN_ID, status="running")
+    frames = []
+    consumer = asyncio.create_task(_drain(StreamingService().stream_run_execution(run, f"{RUN_ID}_event_0"), frames))
+    await asyncio.sleep(0)
+    # Another worker ran the run to the end; only event 1 reached this one
+    await broker.put(f"{RUN_ID}_event_1", ("values", {}))
+    stored_through = 4
+    broker.mark_finished()
+    await asyncio.wait_for(consumer, timeout=1)
+
+    assert _sequences(frames) == [1, 2, 3, 4]
+
+
+async def _drain(stream, frames: list) -> None:
+    async for frame in stream:
+        frames.append(frame)
@@ -0,0 +1,98 @@
+"""
+Unit tests for delta-encoded values events.
+"""
+import json
+from types import SimpleNamespace
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+from agent_server.services import streaming_service as streaming_module
+from agent_server.services.event_converter import EventConverter
+from agent_server.services.streaming_service import StreamingService
+from agent_server.services.values_delta import (
+    DELTA_TYPE,
+    ValuesDeltaDecoder,
+    ValuesDeltaEncoder,
+)
+
+
+def _store(states: list, snapshot_interval: int = 20) -> list[SimpleNamespace]:
+    """Encode successive states as run_events rows would be read back"""
+    converter = EventConverter()
+    encoder = ValuesDeltaEncoder(snapshot_interval)
+    rows = []
+    for seq, state in enumerate(states, start=1):
+        event_id = f"run-1_event_{seq}"
+        encoded = converter.encode_raw_event(event_id, ("values", state), encoder)
+        assert encoded.frame == converter.convert_raw_to_sse(event_id, ("values", state))
+        rows.append(SimpleNamespace(id=event_id, event="values", data=json.loads(encoded.stored_data), frame=None))
+    return rows
+
+
+def _conversation(turns: int) -> list[dict]:
+    messages, states = [], []
+    for i in range(turns):
+        messages = messages + [HumanMessage(content=f"question {i} " * 10, id=f"h{i}"), AIMessage(content="answer " * 10, id=f"a{i}")]
+        states.append({"messages": messages, "step": i})
+    return states
+
+
+class TestValuesDelta:
+    def test_growing_message_list_is_stored_as_appends(self):
+        rows = _store(_conversation(3))
+
+        assert rows[0].data.get("snapshot") is True
+        assert rows[2].data["type"] == DELTA_TYPE
+        assert rows[2].data["base_seq"] == 2
+        assert [op["path"] for op in rows[2].data["patch"]] == ["/messages/-", "/messages/-", "/step"]
+
+    def test_replay_rebuilds_identical_frames(self):
+        states = _conversation(5)
+        converter = EventConverter()
+        rows = _store(states, snapshot_interval=3)
+        decoder = ValuesDeltaDecoder()
+
+        replayed = [converter.convert_stored_to_sse(row, values_decoder=decoder) for row in rows]
+
+        assert [row.data.get("snapshot", False) for row in rows] == [True, False, False, True, False]
+        assert replayed == [
+            converter.convert_raw_to_sse(f"run-1_event_{i}", ("values", state))
+            for i, state in enumerate(states, start=1)
+        ]
+
+    def test_in_place_mutation_is_detected(self):
+        state = {"messages": [HumanMessage(content="hi", id="h0")], "context": "background " * 50}
+        encoder = ValuesDeltaEncoder()
+        encoder.encode(1, state)
+        state["messages"][0].content = "edited"
+
+        _, stored = encoder.encode(2, state)
+
+        patch = json.loads(stored)["patch"]
+        assert [(op["op"], op["path"], op["value"]["content"]) for op in patch] == [
+            ("replace", "/messages/0", "edited")
+        ]
+
+    async def test_replay_from_mid_chain_loads_preceding_deltas(self, monkeypatch):
+        rows = _store(_conversation(4))
+
+        def _seq(row):
+            return int(row.id.rsplit("_", 1)[1])
+
+        async def iter_events_since(run_id, last_seq=-1):
+            for row in rows:
+                if _seq(row) > last_seq:
+                    yield row
+
+        async def get_events_range(run_id, first_seq, last_seq, event=None):
+            return [r for r in rows if first_seq <= _seq(r) <= last_seq]
+
+        monkeypatch.setattr(streaming_module.event_store, "iter_events_since", iter_events_since)
+        monkeypatch.setattr(streaming_module.event_store, "get_events_range", get_events_range)
+
+        frames = [
+            frame async for _, frame in StreamingService()._replay_stored_events("run-1", "run-1_event_2")
+        ]
+
+        assert len(frames) == 2
+        assert json.loads(frames[-1].split("data: ")[1].split("\n")[0])["step"] == 3
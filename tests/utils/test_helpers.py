@@ -39,6 +39,10 @@ class DummySessionBase:
     appropriate rows for a test. By default, returns empty data.
     """
 
+    @property
+    def info(self):
+        return {}
+
     async def __aenter__(self):
         return self
 